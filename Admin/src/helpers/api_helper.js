@@ -101,6 +101,15 @@ export async function get(url, config = {}) {
     return axiosApi.get(url, { ...config }).then(response => response.data);
 }
 
+// List endpoints are cursor-paginated ({ next, previous, results }).
+// Fetches one page as { results, next }; pass `next` back in for the following page
+// (null on the last one). A plain array response comes back as a single page.
+export async function getPage(url, config = {}, client = axiosApi) {
+    const { data } = await client.get(url, { ...config });
+    if (Array.isArray(data)) return { results: data, next: null };
+    return { results: data.results || [], next: data.next || null };
+}
+
 export async function put(url, data, config = {}) {
     return axiosApi.put(url, data, { ...config }).then(response => response.data);
 }
@@ -24,6 +24,7 @@ import jsPDF from "jspdf";
 import "jspdf-autotable";
 import FeatherIcon from "feather-icons-react";
 import axios from "axios";
+import { getPage } from "../../helpers/api_helper";
 import { toast } from 'react-toastify';
 import 'react-toastify/dist/ReactToastify.css';
 
@@ -210,6 +211,8 @@ const getLoanStatusBadgeColor = (status) => {
 function ApplicantListview() {
     const navigate = useNavigate();
     const [tableData, setTableData] = useState([]);
+    const [nextPageUrl, setNextPageUrl] = useState(null); // Cursor link to the next page, null on the last one
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
     const [isLoading, setIsLoading] = useState(true);
     const [error, setError] = useState(null);
 
@@ -229,13 +232,13 @@ function ApplicantListview() {
         }
 
         try {
-            const response = await axios.get(API_URL, {
+            const page = await getPage(API_URL, {
                 headers: {
                     'Authorization': `Bearer ${token}`
                 }
-            });
-            const data = response.data.results || response.data || [];
-            setTableData(data);
+            }, axios);
+            setTableData(page.results);
+            setNextPageUrl(page.next);
             setError(null);
         } catch (err) {
             console.error("Error fetching applicant data:", err);
@@ -258,6 +261,26 @@ function ApplicantListview() {
         fetchApplicantData();
     }, [fetchApplicantData]);
 
+    // Appends the next page of applicants; search and PDF export cover the rows loaded so far
+    const loadMoreApplicants = useCallback(async () => {
+        if (!nextPageUrl) return;
+        setIsLoadingMore(true);
+        try {
+            const page = await getPage(nextPageUrl, {
+                headers: {
+                    'Authorization': `Bearer ${getToken()}`
+                }
+            }, axios);
+            setTableData((prev) => [...prev, ...page.results]);
+            setNextPageUrl(page.next);
+        } catch (err) {
+            console.error("Error fetching more applicants:", err);
+            toast.error(err.response?.data?.detail || "Failed to load more applicants.");
+        } finally {
+            setIsLoadingMore(false);
+        }
+    }, [nextPageUrl, getToken]);
+
     const handleViewApplicant = useCallback((rowData) => {
         navigate(`/applicantstatus/${rowData.userID}`);
     }, [navigate]);
@@ -470,11 +493,20 @@ function ApplicantListview() {
                                         <strong>Error:</strong> {error}
                                     </Alert>
                                 ) : (
-                                    <Table
-                                        columns={columns}
-                                        data={tableData}
-                                        exportPDF={exportPDF}
-                                    />
+                                    <>
+                                        <Table
+                                            columns={columns}
+                                            data={tableData}
+                                            exportPDF={exportPDF}
+                                        />
+                                        {nextPageUrl && (
+                                            <div className="text-center mt-3">
+                                                <Button color="secondary" outline onClick={loadMoreApplicants} disabled={isLoadingMore}>
+                                                    {isLoadingMore && <Spinner size="sm" className="me-1" />} Load more
+                                                </Button>
+                                            </div>
+                                        )}
+                                    </>
                                 )}
                             </CardBody>
                         </Card>
@@ -1,5 +1,7 @@
-import React, { useState, useEffect, useMemo } from "react"; // Added useMemo
+import React, { useState, useEffect, useMemo, useCallback } from "react";
 import axios from "axios";
+import { getPage } from "../../helpers/api_helper";
+import { toast } from "react-toastify";
 import {
     Card, CardHeader, Container, CardBody, Col, Row,
     FormGroup, Form, Label, Button, Input, Table, Spinner, Alert
@@ -13,10 +15,11 @@ function Cashflow() {
     const [outgoingAmount, setOutgoingAmount] = useState("");
     
     // Data and UI states
-    const [cashflows, setCashflows] = useState([]); // Original data from API
-    const [filteredCashflows, setFilteredCashflows] = useState([]); // Data to display in table
+    const [cashflows, setCashflows] = useState([]); // Pages loaded so far, newest first
+    const [nextPageUrl, setNextPageUrl] = useState(null); // Cursor link to the next page, null on the last one
     const [showForm, setShowForm] = useState(false);
     const [loading, setLoading] = useState(false);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [error, setError] = useState(null);
     const [editingId, setEditingId] = useState(null);
 
@@ -24,7 +27,7 @@ function Cashflow() {
     const [filterStartDate, setFilterStartDate] = useState("");
     const [filterEndDate, setFilterEndDate] = useState("");
 
-    // Summary states
+    // Summary states (whole filtered ledger, summed by the API)
     const [totalIncome, setTotalIncome] = useState(0);
     const [totalOutgoing, setTotalOutgoing] = useState(0);
     const [netBalance, setNetBalance] = useState(0);
@@ -34,55 +37,64 @@ function Cashflow() {
     const API_BASE_URL = process.env.REACT_APP_API_BASE_URL;
     const cashflowURL = `${API_BASE_URL}api/cashflow/`; // Make sure this ends with a slash if your DRF urls do
 
-    // Fetch initial cashflows
-    useEffect(() => {
-        const fetchCashflows = async () => {
-            setLoading(true);
-            setError(null); // Reset error on new fetch
-            try {
-                const response = await axios.get(cashflowURL);
-                setCashflows(response.data);
-                setLoading(false);
-            } catch (error) {
-                console.error("Fetch error:", error);
-                setError("Failed to fetch cashflow data. " + (error.response?.data?.detail || error.message));
-                setLoading(false);
-            }
-        };
-        fetchCashflows();
-    }, [cashflowURL]); // cashflowURL is stable, so this runs once
-
-    // Apply filters when cashflows or filter dates change
-    useEffect(() => {
-        let filteredData = [...cashflows]; // Start with all cashflows
-
-        if (filterStartDate) {
-            filteredData = filteredData.filter(item => 
-                new Date(item.date) >= new Date(filterStartDate)
-            );
+    // Date filters go to the API, so the list and the totals cover the same entries
+    const filterParams = useMemo(() => {
+        const params = {};
+        if (filterStartDate) params.date__gte = filterStartDate;
+        if (filterEndDate) params.date__lte = filterEndDate;
+        return params;
+    }, [filterStartDate, filterEndDate]);
+
+    // Fetch the first page of cashflows
+    const fetchCashflows = useCallback(async () => {
+        setLoading(true);
+        setError(null); // Reset error on new fetch
+        try {
+            const page = await getPage(cashflowURL, { params: filterParams }, axios);
+            setCashflows(page.results);
+            setNextPageUrl(page.next);
+        } catch (error) {
+            console.error("Fetch error:", error);
+            setError("Failed to fetch cashflow data. " + (error.response?.data?.detail || error.message));
+        } finally {
+            setLoading(false);
         }
-        if (filterEndDate) {
-            filteredData = filteredData.filter(item => 
-                new Date(item.date) <= new Date(filterEndDate)
-            );
+    }, [cashflowURL, filterParams]);
+
+    // Totals of every matching entry, not just the loaded pages
+    const fetchTotals = useCallback(async () => {
+        try {
+            const response = await axios.get(`${cashflowURL}totals/`, { params: filterParams });
+            setTotalIncome(parseFloat(response.data.total_income));
+            setTotalOutgoing(parseFloat(response.data.total_outgoing));
+            setNetBalance(parseFloat(response.data.net_balance));
+        } catch (error) {
+            console.error("Totals fetch error:", error);
+            setError("Failed to fetch cashflow totals. " + (error.response?.data?.detail || error.message));
         }
-        setFilteredCashflows(filteredData.sort((a, b) => new Date(a.date) - new Date(b.date))); // Sort by date
-    }, [cashflows, filterStartDate, filterEndDate]);
+    }, [cashflowURL, filterParams]);
 
-    // Calculate summary when filteredCashflows change
+    // Refetch when the filters change
     useEffect(() => {
-        let incomeSum = 0;
-        let outgoingSum = 0;
-
-        filteredCashflows.forEach(item => {
-            incomeSum += parseFloat(item.income_amount || 0);
-            outgoingSum += parseFloat(item.outgoing_amount || 0);
-        });
+        fetchCashflows();
+        fetchTotals();
+    }, [fetchCashflows, fetchTotals]);
 
-        setTotalIncome(incomeSum);
-        setTotalOutgoing(outgoingSum);
-        setNetBalance(incomeSum - outgoingSum);
-    }, [filteredCashflows]);
+    // Appends the next page of entries below the rows already shown
+    const loadMoreCashflows = async () => {
+        if (!nextPageUrl) return;
+        setLoadingMore(true);
+        try {
+            const page = await getPage(nextPageUrl, {}, axios);
+            setCashflows((prev) => [...prev, ...page.results]);
+            setNextPageUrl(page.next);
+        } catch (error) {
+            console.error("Error fetching more cashflows:", error);
+            toast.error(error.response?.data?.detail || "Failed to load more entries.");
+        } finally {
+            setLoadingMore(false);
+        }
+    };
 
 
     const handleSubmit = async (event) => {
@@ -119,17 +131,15 @@ function Cashflow() {
         try {
             if (editingId) {
                 await axios.put(`${cashflowURL}${editingId}/`, formData);
-                // Update local state more reliably by re-fetching or by using the response
-                setCashflows((prev) =>
-                    prev.map((item) => (item.id === editingId ? { id: editingId, ...formData } : item))
-                );
                 toast.success("Entry updated successfully!");
             } else {
-                const response = await axios.post(cashflowURL, formData);
-                setCashflows([...cashflows, response.data]); // Add new entry to original list
+                await axios.post(cashflowURL, formData);
                 toast.success("Entry added successfully!");
             }
             resetForm();
+            // The entry may move in (or out of) the date order and the filtered totals
+            fetchCashflows();
+            fetchTotals();
         } catch (error) {
             console.error("Error submitting data:", error);
             const errorMessage = error.response?.data?.detail || error.response?.data?.message || "Failed to submit data.";
@@ -143,7 +153,8 @@ function Cashflow() {
         if (window.confirm("Are you sure you want to delete this entry?")) {
             try {
                 await axios.delete(`${cashflowURL}${id}/`);
-                setCashflows(cashflows.filter((item) => item.id !== id)); // Remove from original list
+                setCashflows(cashflows.filter((item) => item.id !== id)); // Remove from the loaded rows
+                fetchTotals();
                 toast.success("Entry deleted successfully!");
             } catch (error) {
                 console.error("Error deleting entry:", error);
@@ -285,11 +296,11 @@ function Cashflow() {
                     <Col md={10}> {/* Wider column for the table */}
                         <Card>
                             <CardHeader className="d-flex justify-content-between align-items-center bg-light">
-                                <h4 className="mb-0">Cashflow Records {filteredCashflows.length > 0 && `(${filteredCashflows.length})`}</h4>
+                                <h4 className="mb-0">Cashflow Records {cashflows.length > 0 && `(${cashflows.length}${nextPageUrl ? "+" : ""})`}</h4>
                                 {/* Optional: Add export button or other actions here */}
                             </CardHeader>
                             <CardBody>
-                                {filteredCashflows.length > 0 ? (
+                                {cashflows.length > 0 ? (
                                     <Table bordered hover responsive striped className="align-middle">
                                         <thead className="table-light">
                                             <tr>
@@ -300,7 +311,7 @@ function Cashflow() {
                                             </tr>
                                         </thead>
                                         <tbody>
-                                            {filteredCashflows.map((item) => (
+                                            {cashflows.map((item) => (
                                                 <tr key={item.id}>
                                                     <td>{new Date(item.date).toLocaleDateString('en-GB')}</td>
                                                     <td className="text-end text-success">
@@ -326,6 +337,13 @@ function Cashflow() {
                                         {loading ? <Spinner size="sm" /> : "No cashflow records found for the selected criteria."}
                                     </div>
                                 )}
+                                {nextPageUrl && (
+                                    <div className="text-center mt-3">
+                                        <Button color="secondary" outline onClick={loadMoreCashflows} disabled={loadingMore}>
+                                            {loadingMore && <Spinner size="sm" className="me-1" />} Load more
+                                        </Button>
+                                    </div>
+                                )}
                             </CardBody>
                         </Card>
                     </Col>
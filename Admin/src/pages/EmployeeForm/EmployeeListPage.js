@@ -1,6 +1,6 @@
 import React, { useEffect, useState, useMemo, useCallback } from "react";
 import {
-  get as apiGet,
+  getPage,
   del as apiDel,
   post as apiPost,
 } from "../../helpers/api_helper";
@@ -130,6 +130,8 @@ function EmployeeListPage() {
   const API_LIST_PROFILES_URL = `api/employees/manage-profiles/`;
   const navigate = useNavigate();
   const [tableData, setTableData] = useState([]);
+  const [nextPageUrl, setNextPageUrl] = useState(null); // Cursor link to the next page, null on the last one
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState(null);
   const [showDeleted, setShowDeleted] = useState(false);
@@ -141,8 +143,9 @@ function EmployeeListPage() {
       const url = showDeleted
         ? `${API_LIST_PROFILES_URL}?include_deleted=true`
         : API_LIST_PROFILES_URL;
-      const responseData = await apiGet(url);
-      setTableData(responseData || []);
+      const page = await getPage(url);
+      setTableData(page.results);
+      setNextPageUrl(page.next);
     } catch (err) {
       console.error("Error fetching employee profiles:", err);
       setError("Failed to load employee profiles.");
@@ -158,6 +161,22 @@ function EmployeeListPage() {
     fetchEmployeeProfiles();
   }, [fetchEmployeeProfiles]);
 
+  // Appends the next page of profiles below the rows already shown
+  const loadMoreEmployeeProfiles = useCallback(async () => {
+    if (!nextPageUrl) return;
+    setIsLoadingMore(true);
+    try {
+      const page = await getPage(nextPageUrl);
+      setTableData((prev) => [...prev, ...page.results]);
+      setNextPageUrl(page.next);
+    } catch (err) {
+      console.error("Error fetching more employee profiles:", err);
+      toast.error(err.response?.data?.detail || "Failed to load more employee profiles.");
+    } finally {
+      setIsLoadingMore(false);
+    }
+  }, [nextPageUrl]);
+
   const handleSoftDeleteEmployee = useCallback(async (profileId, employeeName) => {
     if (window.confirm(`Are you sure you want to deactivate employee: ${employeeName} (Profile ID: ${profileId})? This will set a leaving date.`)) {
       try {
@@ -389,10 +408,19 @@ function EmployeeListPage() {
                     <Button color="primary" onClick={fetchEmployeeProfiles}>Try Again</Button>
                   </div>
                 ) : (
-                  <TableComponent
-                    columns={columns}
-                    data={tableData}
-                  />
+                  <>
+                    <TableComponent
+                      columns={columns}
+                      data={tableData}
+                    />
+                    {nextPageUrl && (
+                      <div className="text-center mt-3">
+                        <Button color="secondary" outline onClick={loadMoreEmployeeProfiles} disabled={isLoadingMore}>
+                          {isLoadingMore && <Spinner size="sm" className="me-1" />} Load more
+                        </Button>
+                      </div>
+                    )}
+                  </>
                 )}
               </CardBody>
             </Card>
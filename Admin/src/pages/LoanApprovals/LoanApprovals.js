@@ -3,6 +3,7 @@ import React, { useState, useEffect, useCallback } from 'react';
 import { Container, Row, Col, Card, CardHeader, CardBody, CardTitle, Table, Button, Spinner, Alert, Badge } from 'reactstrap';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
+import { getPage } from '../../helpers/api_helper';
 import { toast } from 'react-toastify';
 import FeatherIcon from "feather-icons-react";
 
@@ -19,6 +20,8 @@ const getUserAuthData = () => {
 
 const LoanApproval = () => {
     const [loansToReview, setLoansToReview] = useState([]);
+    const [nextPageUrl, setNextPageUrl] = useState(null); // Cursor link to the next page, null on the last one
+    const [loadingMore, setLoadingMore] = useState(false);
     const [loading, setLoading] = useState(true); // Unified loading state for initial setup & fetching
     const [error, setError] = useState(null);
     
@@ -80,11 +83,13 @@ const LoanApproval = () => {
 
         try {
             console.log(`Fetching loans for role: ${roleToFetchFor}, status: ${statusToFetch}`);
-            const response = await axios.get(
+            const page = await getPage(
                 `${API_BASE_URL}api/loan-applications/loan-applications/?status=${statusToFetch}`,
-                { headers }
+                { headers },
+                axios
             );
-            setLoansToReview(Array.isArray(response.data) ? response.data : []);
+            setLoansToReview(page.results);
+            setNextPageUrl(page.next);
         } catch (err) {
             console.error(`Error fetching loans for ${roleToFetchFor}:`, err);
             const errorMsg = err.response?.data?.detail || `Failed to fetch loan applications for ${roleToFetchFor}.`;
@@ -95,6 +100,22 @@ const LoanApproval = () => {
         }
     }, []); // Empty dependency array as it gets role and token as arguments
 
+    // Appends the next page of the queue below the loans already shown
+    const loadMoreLoans = async () => {
+        if (!nextPageUrl) return;
+        setLoadingMore(true);
+        try {
+            const page = await getPage(nextPageUrl, { headers: { 'Authorization': `Bearer ${authData.token}` } }, axios);
+            setLoansToReview((prev) => [...prev, ...page.results]);
+            setNextPageUrl(page.next);
+        } catch (err) {
+            console.error("Error fetching more loans:", err);
+            toast.error(err.response?.data?.detail || "Failed to fetch more loan applications.");
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
 
     // Main effect for initialization and data fetching based on authentication and role
     useEffect(() => {
@@ -226,6 +247,13 @@ const LoanApproval = () => {
                                             </Table>
                                         </div>
                                     )}
+                                    {!loading && !error && nextPageUrl && (
+                                        <div className="text-center mt-3">
+                                            <Button color="secondary" outline onClick={loadMoreLoans} disabled={loadingMore}>
+                                                {loadingMore && <Spinner size="sm" className="me-1" />} Load more
+                                            </Button>
+                                        </div>
+                                    )}
                                 </CardBody>
                             </Card>
                         </Col>
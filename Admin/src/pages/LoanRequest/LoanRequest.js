@@ -1,5 +1,6 @@
 import React, { useState, useEffect, useCallback } from "react"; // Added useCallback
 import axios from "axios";
+import { getPage } from "../../helpers/api_helper";
 import {
   Card, CardHeader, Container, CardBody, Col, Row,
   Form, FormGroup, Label, Button, Input, Table, Spinner, Alert
@@ -24,6 +25,8 @@ function LoanRequest() {
   const [date, setDate] = useState(""); // Request Date
 
   const [loanRequests, setLoanRequests] = useState([]);
+  const [nextPageUrl, setNextPageUrl] = useState(null); // Cursor link to the next page, null on the last one
+  const [loadingMore, setLoadingMore] = useState(false);
   const [showForm, setShowForm] = useState(false);
   const [loading, setLoading] = useState(false); // For table loading
   const [submitting, setSubmitting] = useState(false); // For form submission
@@ -50,10 +53,11 @@ function LoanRequest() {
       return;
     }
     try {
-      const response = await axios.get(API_URL, {
+      const page = await getPage(API_URL, {
         headers: { 'Authorization': `Bearer ${token}` }
-      });
-      setLoanRequests(response.data);
+      }, axios);
+      setLoanRequests(page.results);
+      setNextPageUrl(page.next);
     } catch (err) {
       console.error("Error fetching loan requests:", err);
       const errorMsg = err.response?.data?.detail || err.message || "Failed to fetch loan request data.";
@@ -68,6 +72,24 @@ function LoanRequest() {
     fetchLoanRequests();
   }, [fetchLoanRequests]);
 
+  // Appends the next page of the list below the rows already shown
+  const loadMoreLoanRequests = async () => {
+    if (!nextPageUrl) return;
+    setLoadingMore(true);
+    try {
+      const page = await getPage(nextPageUrl, {
+        headers: { 'Authorization': `Bearer ${getToken()}` }
+      }, axios);
+      setLoanRequests((prev) => [...prev, ...page.results]);
+      setNextPageUrl(page.next);
+    } catch (err) {
+      console.error("Error fetching more loan requests:", err);
+      toast.error(err.response?.data?.detail || err.message || "Failed to fetch more loan requests.");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const validateEmail = () => {
     const emailRegex = /^[^\s@]+@[^\s@]+\.[^\s@]+$/;
     if (email && !emailRegex.test(email)) { // Only validate if email is not empty
@@ -126,7 +148,7 @@ function LoanRequest() {
         toast.success("Loan request updated successfully!");
       } else {
         const response = await axios.post(API_URL, requestFormData, { headers });
-        setLoanRequests((prev) => [...prev, response.data]);
+        setLoanRequests((prev) => [response.data, ...prev]); // Newest first, as the API lists them
         toast.success("Loan request added successfully!");
       }
       resetForm();
@@ -352,9 +374,9 @@ function LoanRequest() {
                         </tr>
                       </thead>
                       <tbody>
-                        {loanRequests.slice().reverse().map((item, index) => ( // Show newest first
+                        {loanRequests.map((item, index) => ( // The API lists newest first
                           <tr key={item.id}>
-                            <td>{loanRequests.length - index}</td>
+                            <td>{index + 1}</td>
                             <td>{item.name} {item.last_name || ''}</td>
                             <td>{item.email || '-'}</td>
                             <td>{item.phone}</td>
@@ -378,6 +400,13 @@ function LoanRequest() {
                     </Table>
                   </div>
                 )}
+                {!loading && !error && nextPageUrl && (
+                  <div className="text-center mt-3">
+                    <Button color="secondary" outline onClick={loadMoreLoanRequests} disabled={loadingMore}>
+                      {loadingMore && <Spinner size="sm" className="me-1" />} Load more
+                    </Button>
+                  </div>
+                )}
               </CardBody>
             </Card>
           </Col>
@@ -3,6 +3,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 
 from applicants.views import validate_applicant_view, user_profile_view 
+from core.views import cache_stats_view
 urlpatterns = [
     path('applicants/', include('applicants.urls')),  
     path('employees/', include('employees.urls')),
@@ -14,6 +15,7 @@ urlpatterns = [
     path('loanrequest/',include('loanrequest.urls')),
     path('user/profile/', user_profile_view, name='user-profile'),
     path('applicants/validate-applicant/', validate_applicant_view, name='validate-applicant'),
+    path('cache-stats/', cache_stats_view, name='cache-stats'),
     
      # --- Add JWT Authentication URLs ---
    
@@ -0,0 +1,49 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from applicants.models import Applicant
+from loanapp.cache import applicant_detail_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Links applicants to their login account (Applicant.user) by case-insensitive email match. "
+        "Idempotent: already linked applicants and users are left alone, ambiguous emails are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report the matches without saving them.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Applicants written per bulk UPDATE.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        linked_user_ids = set(Applicant.all_objects.filter(user__isnull=False).values_list('user_id', flat=True))
+
+        users_by_email = defaultdict(list)
+        for user_id, email in User.objects.exclude(email='').values_list('id', 'email'):
+            users_by_email[email.strip().lower()].append(user_id)
+
+        to_link, ambiguous = [], []
+        for applicant in Applicant.all_objects.filter(user__isnull=True).only('id', 'email', 'userID'):
+            user_ids = users_by_email.get((applicant.email or '').strip().lower(), [])
+            if len(user_ids) > 1:
+                ambiguous.append(applicant.userID)
+                continue
+            if user_ids and user_ids[0] not in linked_user_ids:
+                applicant.user_id = user_ids[0]
+                linked_user_ids.add(user_ids[0])
+                to_link.append(applicant)
+
+        for applicant_user_id in ambiguous:
+            self.stdout.write(self.style.WARNING(f"Skipped {applicant_user_id}: several users share its email."))
+
+        if options['dry_run']:
+            self.stdout.write(f"Would link {len(to_link)} applicants (dry run).")
+            return
+        with transaction.atomic():
+            Applicant.all_objects.bulk_update(to_link, ['user'], batch_size=options['batch_size'])
+        applicant_detail_cache.invalidate(*[applicant.userID for applicant in to_link])
+        self.stdout.write(self.style.SUCCESS(f"Linked {len(to_link)} applicants to user accounts."))
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applicants', '0024_applicant_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='applicant',
+            index=models.Index(fields=['-loanreg_date', '-id'], name='applicants_regdate_id_idx'),
+        ),
+    ]
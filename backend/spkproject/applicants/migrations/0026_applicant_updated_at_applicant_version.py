@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 21:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applicants', '0025_applicant_applicants_regdate_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='applicant',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='applicant',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-18 21:15
+
+import core.fields
+from core.fields import backfill_phone_numbers
+from django.db import migrations
+
+
+def normalize_phone_numbers(apps, schema_editor):
+    backfill_phone_numbers(apps.get_model('applicants', 'Applicant'), 'phone')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applicants', '0026_applicant_updated_at_applicant_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='applicant',
+            name='phone',
+            field=core.fields.PhoneNumberField(max_length=15, unique=True),
+        ),
+        migrations.RunPython(normalize_phone_numbers, migrations.RunPython.noop),
+    ]
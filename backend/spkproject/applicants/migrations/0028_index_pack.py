@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-18 21:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applicants', '0027_normalize_phone'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='applicant',
+            name='applicants_regdate_id_idx',
+        ),
+        migrations.AddIndex(
+            model_name='applicant',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-loanreg_date', '-id'], name='applicants_live_regdate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertydetails',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['applicant'], name='applicants_property_live_idx'),
+        ),
+    ]
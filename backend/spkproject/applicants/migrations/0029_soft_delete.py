@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 21:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applicants', '0028_index_pack'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='applicant',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='propertydetails',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
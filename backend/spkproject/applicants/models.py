@@ -1,18 +1,17 @@
 import uuid
+from django.conf import settings
 from django.db import models
 
-# --- Add this Manager ---
-class ActiveApplicantsManager(models.Manager):
-    def get_queryset(self):
-        return super().get_queryset().filter(is_deleted=False)
-# --- End Manager ---
+from core.fields import PhoneNumberField
+from core.mixins import FieldTrackerMixin
+from core.softdelete import SoftDeleteManager, SoftDeleteModel, live_index
 
 
 def generate_userID():
     """ Generates a unique applicant ID """
     return f"AP{uuid.uuid4().hex[:6].upper()}"
 
-class Applicant(models.Model):
+class Applicant(FieldTrackerMixin, SoftDeleteModel):
     """ Stores personal details of loan applicants. """
     userID = models.CharField(max_length=10, unique=True, editable=False, blank=False,default=generate_userID)
 
@@ -27,35 +26,39 @@ class Applicant(models.Model):
     gender = models.IntegerField(choices=GENDER_CHOICES, null=True, blank=True)
     maritalStatus = models.IntegerField(choices=MARITAL_STATUS_CHOICES, null=True, blank=True)
     email = models.EmailField(max_length=35, unique=True)
-    phone = models.CharField(max_length=15, unique=True,blank=False)
+    phone = PhoneNumberField(max_length=15, unique=True,blank=False)
     address = models.TextField(null=True, blank=True)
     city = models.CharField(max_length=40, null=True, blank=True)
     state = models.CharField(max_length=40, null=True, blank=True)
     postalCode = models.CharField(max_length=10, null=True, blank=True)
     profile_photo = models.ImageField(upload_to="uploads/images/customer/", null=True, blank=True, verbose_name="Profile Photo")
-    is_deleted = models.BooleanField(default=False)
     is_approved = models.BooleanField(default=False)
+    # Bumped on every change to the applicant or its nested rows (ETag source, see core.conditional)
+    version = models.PositiveIntegerField(default=1, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    version_field = 'version'
+    # Login account of the applicant, for self-service loan visibility (see link_applicant_users)
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='applicant_profile'
+    )
+
+    # Soft delete (core.softdelete): deleting an applicant also deletes its properties
+    soft_delete_cascade = ('properties',)
+    objects = SoftDeleteManager() # Live applicants; all_objects has the deleted ones too
 
-     # --- Add these Managers ---
-    objects = ActiveApplicantsManager() 
-    all_objects = models.Manager() 
-    # --- End Managers ---
+    class Meta:
+        indexes = [
+            # Keyset pagination of the (active) applicant list, see core.pagination
+            live_index('-loanreg_date', '-id', name='applicants_live_regdate_idx'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} - UserID: {self.userID}"
-    
-     # --- Optional: Add helper methods ---
-    def soft_delete(self):
-        """Marks the applicant as deleted."""
-        self.is_deleted = True
-        self.save(update_fields=['is_deleted'])
-       
-
-    def restore(self):
-        """Marks the applicant as not deleted."""
-        self.is_deleted = False
-        self.save(update_fields=['is_deleted'])
-    # --- End helper methods ---
+
 
 class ApplicantProof(models.Model):
     applicant = models.ForeignKey(Applicant, related_name='ApplicantProof', on_delete=models.CASCADE)
@@ -84,11 +87,7 @@ class EmploymentDetails(models.Model):
     def __str__(self):
         return f"{self.applicant.first_name} {self.applicant.last_name} - {self.jobTitle or 'N/A'}"
 
-class ActivePropertiesManager(models.Manager):
-    def get_queryset(self):
-        return super().get_queryset().filter(is_deleted=False)
-
-class PropertyDetails(models.Model):
+class PropertyDetails(SoftDeleteModel):
     PROPERTY_OWNERSHIP_CHOICES = [(1, 'Owned'), (2, 'Mortgaged')]
     PROPERTY_TYPE_CHOICES = [
         (1, "Agricultural Land"), (2, "Kutcha House (Mud/Clay)"),
@@ -103,19 +102,18 @@ class PropertyDetails(models.Model):
     propertyValue = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
     propertyAge = models.IntegerField(null=True, blank=True)
     propertyOwnership = models.IntegerField(choices=PROPERTY_OWNERSHIP_CHOICES, default=1)
-    is_deleted = models.BooleanField(default=False)
     remarks = models.TextField(null=True, blank=True)
 
-    objects = ActivePropertiesManager()
-    all_objects = models.Manager()
+    objects = SoftDeleteManager()
 
-    def delete(self, using=None, keep_parents=False): # Soft delete
-        self.is_deleted = True
-        self.save(update_fields=['is_deleted'])
+    class Meta:
+        indexes = [
+            # Active properties of a page of applicants (the prefetch goes through `objects`)
+            live_index('applicant', name='applicants_property_live_idx'),
+        ]
 
-    def restore(self):
-        self.is_deleted = False
-        self.save(update_fields=['is_deleted'])
+    def delete(self, using=None, keep_parents=False): # Soft delete
+        self.soft_delete()
 
     def __str__(self):
         return f"{self.get_propertyType_display()} at {self.property_address or 'N/A'} for {self.applicant.first_name}"
@@ -3,7 +3,9 @@ from decimal import Decimal
 from rest_framework import serializers
 from .models import Applicant, ApplicantProof, EmploymentDetails, PropertyDetails, BankingDetails
 from django.db import transaction, IntegrityError
+from django.db.models import OuterRef, Subquery
 from loanapp.models import LoanApplication
+from core.fieldsets import SparseFieldsetSerializerMixin
 import logging
 
 logger = logging.getLogger(__name__)
@@ -119,7 +121,24 @@ class BankingDetailsSerializer(serializers.ModelSerializer):
 
 # --- Parent Serializer ---
 
-class ApplicantSerializer(serializers.ModelSerializer):
+def latest_loan_annotation(field_name):
+    """ Correlated subquery for one column of an applicant's most recent loan (same ordering as the loan list). """
+    latest_loan = LoanApplication.objects.filter(
+        applicant_record_id=OuterRef('userID')
+    ).order_by('-LoanRegDate', '-id')
+    return Subquery(latest_loan.values(field_name)[:1])
+
+
+def latest_loan_annotations():
+    return {
+        'latest_loan_status_key': latest_loan_annotation('status'),
+        'latest_loan_loanID': latest_loan_annotation('loanID'),
+    }
+
+LOAN_STATUS_LABELS = dict(LoanApplication.LOAN_STATUS_CHOICES)
+
+
+class ApplicantSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     proofs = ApplicantProofSerializer(many=True, required=False, source='ApplicantProof')
     employment = EmploymentDetailsSerializer(many=True, required=False)
     properties = PropertyDetailsSerializer(many=True, required=False)
@@ -138,23 +157,49 @@ class ApplicantSerializer(serializers.ModelSerializer):
     class Meta:
         model = Applicant
         fields = '__all__'
+        expandable_fields = ('proofs', 'employment', 'properties', 'banking_details') # See core.fieldsets
         extra_kwargs = {
             'userID': {'read_only': True},
             'loan_id': {'read_only': True},
             'loanreg_date': {'read_only': True},
             # Make fields related to status read_only
             'is_deleted': {'read_only': True},
+            'deleted_at': {'read_only': True},
             'is_approved': {'read_only': True},
+            'user': {'read_only': True}, # Linked by the link_applicant_users command
         }
 
+    @classmethod
+    def setup_eager_loading(cls, queryset, relations=None):
+        """
+        Annotates the latest loan and prefetches the nested children, so a page of
+        applicants serializes in a constant number of queries. `relations` limits the
+        prefetches to those nested fields (e.g. what ?fields= asked for).
+        """
+        return queryset.annotate(**latest_loan_annotations()).prefetch_related(*[
+            config['model_related_name'] for field_name, config in cls.NESTED_HANDLERS_CONFIG.items()
+            if relations is None or field_name in relations
+        ])
+
+    def _latest_loan(self, obj):
+        # Querysets from setup_eager_loading() already carry these; anything else
+        # (e.g. a freshly created applicant) is looked up once and cached on obj.
+        if not hasattr(obj, 'latest_loan_status_key'):
+            latest_loan = LoanApplication.objects.filter(applicant_record=obj).order_by(
+                '-LoanRegDate', '-id'
+            ).values('status', 'loanID').first() or {}
+            obj.latest_loan_status_key = latest_loan.get('status')
+            obj.latest_loan_loanID = latest_loan.get('loanID')
+        return obj.latest_loan_status_key, obj.latest_loan_loanID
+
     def get_latest_loan_status(self, obj):
         # obj is the Applicant instance
-        latest_loan = LoanApplication.objects.filter(applicant_record=obj).order_by('-LoanRegDate', '-id').first()
-        return latest_loan.get_status_display() if latest_loan else "No Loan" # Or latest_loan.status if you want the raw key
+        status_key, _ = self._latest_loan(obj)
+        return LOAN_STATUS_LABELS.get(status_key, status_key) if status_key else "No Loan" # Or the raw key if you want it
 
     def get_latest_loan_id(self, obj):
-        latest_loan = LoanApplication.objects.filter(applicant_record=obj).order_by('-LoanRegDate', '-id').first()
-        return latest_loan.loanID if latest_loan else None
+        _, loan_id = self._latest_loan(obj)
+        return loan_id
 
     def _parse_nested_data(self, data, serializer_field_name, form_base_key):
         """Helper to parse fieldName[index][nestedFieldName] from QueryDict."""
@@ -269,7 +314,7 @@ class ApplicantSerializer(serializers.ModelSerializer):
             items_to_delete = current_items_qs.exclude(id__in=kept_ids)
             if items_to_delete.exists():
                 logger.info(f"Deleting {model_related_name} IDs: {list(items_to_delete.values_list('id', flat=True))}")
-                if hasattr(related_manager.model, 'is_deleted'): items_to_delete.update(is_deleted=True)
+                if hasattr(items_to_delete, 'bulk_soft_delete'): items_to_delete.bulk_soft_delete()
                 else: items_to_delete.delete()
         except Exception as e: logger.error(f"Error during deletion for {model_related_name}: {str(e)}", exc_info=True)
 
@@ -307,5 +352,7 @@ class ApplicantSerializer(serializers.ModelSerializer):
         for serializer_field_name, config in self.NESTED_HANDLERS_CONFIG.items():
             data_list_for_nested = nested_payloads.get(serializer_field_name)
             if data_list_for_nested is not None: self._handle_nested_objects(instance, data_list_for_nested, config['model_related_name'], config['child_serializer_class'])
+        if any(data is not None for data in nested_payloads.values()):
+            instance.touch() # Nested rows are part of the applicant's representation (and ETag)
         instance.refresh_from_db()
         return instance
\ No newline at end of file
@@ -1,3 +1,159 @@
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from loanapp.models import LoanApplication
+
+from .models import Applicant, PropertyDetails
+
+
+class ApplicantSoftDeleteTests(TestCase):
+    """ core.softdelete on applicants: set-based deletes that cascade to their properties. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.applicant = Applicant.objects.create(
+            first_name='Soft', last_name='Delete', email='soft-delete@example.com', phone='9100000000',
+        )
+
+    def test_soft_delete_is_set_based_and_cascades(self):
+        applicant = self.applicant
+        PropertyDetails.objects.bulk_create([PropertyDetails(applicant=applicant, propertyType=1) for _ in range(3)])
+        removed_earlier = PropertyDetails.objects.filter(applicant=applicant).first()
+        removed_earlier.soft_delete()
+
+        # One UPDATE for the properties, one for the applicants
+        with self.assertNumQueries(2):
+            self.assertEqual(Applicant.objects.filter(pk=applicant.pk).bulk_soft_delete(), 1)
+        self.assertFalse(Applicant.objects.filter(pk=applicant.pk).exists())
+        self.assertFalse(PropertyDetails.objects.filter(applicant=applicant).exists())
+
+        # Restore brings back the properties deleted with the applicant, not the one deleted before
+        with self.assertNumQueries(2):
+            self.assertEqual(Applicant.all_objects.filter(pk=applicant.pk).bulk_restore(), 1)
+        self.assertEqual(PropertyDetails.objects.filter(applicant=applicant).count(), 2)
+        self.assertTrue(PropertyDetails.all_objects.get(pk=removed_earlier.pk).is_deleted)
+        self.assertEqual(Applicant.objects.get(pk=applicant.pk).version, applicant.version + 2)
+
+
+class ApplicantBulkActionTests(TestCase):
+    """ bulk-delete / bulk-restore endpoints (core.bulk) on the applicant viewset. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('bulk-admin', 'bulk-admin@example.com', 'pass')
+        cls.staff = User.objects.create_user('bulk-staff', 'bulk-staff@example.com', 'pass')
+        cls.applicant = Applicant.objects.create(
+            first_name='Bulk', last_name='Action', email='bulk-action@example.com', phone='9100000001',
+        )
+
+    def setUp(self):
+        cache.clear() # Response caches outlive each test's rolled back rows
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_soft_delete_endpoint(self):
+        applicant = self.applicant
+        PropertyDetails.objects.create(applicant=applicant, propertyType=1)
+        ids = [applicant.userID, 'APNOSUCH', applicant.userID]
+        url = '/api/applicants/applicants/bulk-delete/'
+
+        # Savepoint, one locking SELECT, one UPDATE per model, release; whatever the batch size
+        with self.assertNumQueries(5):
+            response = self.client.post(url, {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [
+            {'id': applicant.userID, 'outcome': 'deleted'}, {'id': 'APNOSUCH', 'outcome': 'not_found'},
+        ])
+        self.assertFalse(PropertyDetails.objects.filter(applicant=applicant).exists())
+        self.assertEqual(self.client.post(url, {'ids': ids}, format='json').data['counts'], {'already_deleted': 1, 'not_found': 1})
+        self.assertEqual(self.client.post(url, {'ids': 'x'}, format='json').status_code, 400)
+
+        response = self.client.post('/api/applicants/applicants/bulk-restore/', {'ids': [applicant.userID]}, format='json')
+        self.assertEqual(response.data['counts'], {'restored': 1})
+        self.assertTrue(PropertyDetails.objects.filter(applicant=applicant).exists())
+
+        # Permissions are checked once for the batch: staff cannot delete applicants
+        self.client.force_authenticate(user=self.staff)
+        self.assertEqual(self.client.post(url, {'ids': [applicant.userID]}, format='json').status_code, 403)
+
+
+class ApplicantListQueryTests(TestCase):
+    """ The applicant list serializes a page in a fixed number of queries. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('list-admin', 'list-admin@example.com', 'pass')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _add_applicants(self, start, count):
+        for i in range(start, start + count):
+            applicant = Applicant.objects.create(
+                first_name=f'List{i}', last_name='Applicant', email=f'list{i}@example.com', phone=f'91100000{i:02d}',
+            )
+            PropertyDetails.objects.create(applicant=applicant, propertyType=1)
+            LoanApplication.objects.create(
+                applicant_record=applicant, first_name=applicant.first_name, phone=applicant.phone, amount='1000.00',
+                term=2, termType='months', interestRate='2', purpose='Business', repaymentSource='Salary',
+                agreeTerms=True, agreeCreditCheck=True, agreeDataSharing=True, startDate=date(2024, 1, 10), status='PENDING',
+            )
+
+    def _list_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/applicants/applicants/')
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        self._add_applicants(0, 2)
+        few = self._list_queries()
+        self._add_applicants(2, 8)
+        self.assertEqual(self._list_queries(), few)
+
+
+class LinkApplicantUsersCommandTests(TestCase):
+    """ manage.py link_applicant_users: case-insensitive email matching, ambiguity and --dry-run. """
+
+    def _applicant(self, email, phone):
+        return Applicant.objects.create(first_name='Link', last_name='Me', email=email, phone=phone)
+
+    def _run(self, *args):
+        out = StringIO()
+        call_command('link_applicant_users', *args, stdout=out)
+        return out.getvalue()
+
+    def test_links_unique_matches_only(self):
+        user = User.objects.create_user('link-one', 'One@Example.com', 'pass')
+        User.objects.create_user('link-twin-a', 'twin@example.com', 'pass')
+        User.objects.create_user('link-twin-b', 'TWIN@example.com', 'pass')
+        matched = self._applicant(' one@example.COM ', '9120000000')
+        ambiguous = self._applicant('twin@example.com', '9120000001')
+        unmatched = self._applicant('nobody@example.com', '9120000002')
+        duplicate = self._applicant('one@example.com', '9120000003') # The user can only be linked once
+
+        out = self._run('--dry-run')
+        self.assertIn('Would link 1 applicants (dry run).', out)
+        self.assertIn(f'Skipped {ambiguous.userID}', out)
+        self.assertFalse(Applicant.objects.filter(user__isnull=False).exists())
+
+        self.assertIn('Linked 1 applicants to user accounts.', self._run())
+        linked = dict(Applicant.objects.filter(user__isnull=False).values_list('pk', 'user_id'))
+        self.assertEqual(list(linked.values()), [user.pk])
+        self.assertIn(next(iter(linked)), (matched.pk, duplicate.pk))
+        self.assertNotIn(ambiguous.pk, linked)
+        self.assertNotIn(unmatched.pk, linked)
 
-# Create your tests here.
+        # Idempotent: a second run finds nothing new
+        self.assertIn('Linked 0 applicants', self._run())
@@ -6,12 +6,13 @@ from rest_framework.decorators import action, api_view, permission_classes
 from django.db import transaction # Not strictly used in the visible parts, but good to keep if other parts need it
 from django.shortcuts import get_object_or_404
 from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.functions import Lower
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth.models import User, Group # User is used in user_profile_view
 import logging
 
 from .models import Applicant
-from .serializers import ApplicantSerializer
+from .serializers import ApplicantSerializer, latest_loan_annotation
 # Import your specific permission classes from core.permissions
 from core.permissions import (
     IsAdminUser,
@@ -21,12 +22,23 @@ from core.permissions import (
     CanViewApplicantListAndDetails,
     CanDeleteRestoreApplicant
 )
+from core.roles import get_group_names, resolve_role
+from core.bulk import BulkSoftDeleteMixin
+from core.fieldsets import CompactListMixin, requested_relations
+from core.conditional import ConditionalRetrieveMixin
+from core.cache import request_variant
+from loanapp.cache import applicant_detail_cache
 
 logger = logging.getLogger(__name__)
 
 
-class ApplicantViewSet(viewsets.ModelViewSet):
+class ApplicantViewSet(ConditionalRetrieveMixin, CompactListMixin, BulkSoftDeleteMixin, viewsets.ModelViewSet):
     serializer_class = ApplicantSerializer
+    # ?view=compact list rows (see core.fieldsets); latest loan columns are the annotations
+    compact_fields = (
+        'id', 'userID', 'first_name', 'last_name', 'phone', 'email', 'city', 'loanreg_date',
+        'is_approved', 'latest_loan_status_key', 'latest_loan_loanID',
+    )
     parser_classes = [MultiPartParser, FormParser]
     permission_classes = [IsAuthenticated] # Default, overridden by get_permissions
 
@@ -41,10 +53,34 @@ class ApplicantViewSet(viewsets.ModelViewSet):
         """
         if self.action == 'list':
             # queryset = Applicant.objects.all().order_by('-loanreg_date') # Pazhaya line
-            return Applicant.objects.all().order_by('-loanreg_date') # Default manager (Active)
+            queryset = Applicant.objects.all() # Default manager (Active)
         else:
             # For retrieve, update, partial_update, destroy actions
-            return Applicant.all_objects.all().order_by('-loanreg_date') # All objects (including soft-deleted)
+            queryset = Applicant.all_objects.all() # All objects (including soft-deleted)
+        # Latest loan status/ID as subquery annotations + nested rows prefetched: no per-row queries.
+        # Nested rows left out by ?fields=/?expand= are not prefetched at all.
+        relations = requested_relations(self.request, ApplicantSerializer.Meta.expandable_fields)
+        queryset = ApplicantSerializer.setup_eager_loading(queryset, relations)
+        if self.action == 'retrieve':
+            queryset = queryset.annotate(latest_loan_updated_at=latest_loan_annotation('updated_at'))
+        return queryset.order_by('-loanreg_date', '-id')
+
+    def get_etag_parts(self, instance):
+        # The detail also shows the latest loan's status and ID
+        return [instance.pk, instance.version, instance.latest_loan_status_key, instance.latest_loan_loanID]
+
+    def get_last_modified(self, instance):
+        latest_loan_updated_at = getattr(instance, 'latest_loan_updated_at', None)
+        if latest_loan_updated_at is None:
+            return instance.updated_at
+        return max(instance.updated_at, latest_loan_updated_at)
+
+    def get_retrieve_data(self, instance, prefetch_lookups):
+        # Cached per applicant version; their loans' saves bump it too (see loanapp.cache)
+        build = super().get_retrieve_data
+        return applicant_detail_cache.get_or_set(
+            instance.userID, lambda: dict(build(instance, prefetch_lookups)), variant=request_variant(self.request)
+        )
 
 
     def get_permissions(self):
@@ -56,7 +92,7 @@ class ApplicantViewSet(viewsets.ModelViewSet):
             self.permission_classes = [IsAuthenticated, CanCreateUpdateApplicant]
         elif self.action in ['list', 'retrieve']:
             self.permission_classes = [IsAuthenticated, CanViewApplicantListAndDetails]
-        elif self.action in ['destroy', 'restore_applicant']: # destroy is a default action, restore_applicant is custom
+        elif self.action in ['destroy', 'restore_applicant', 'bulk_delete', 'bulk_restore']: # bulk_*: see core.bulk, checked once per batch
             self.permission_classes = [IsAuthenticated, CanDeleteRestoreApplicant]
         else:
             # Matha custom actions ku, default ah Admin mattum
@@ -161,15 +197,9 @@ def user_profile_view(request):
     if not user.is_authenticated: # Should be redundant due to @permission_classes
          return Response({"error": "Authentication required."}, status=status.HTTP_401_UNAUTHORIZED)
 
-    groups = list(user.groups.values_list('name', flat=True))
-    role = 'Unknown'
-    # Determine role based on groups, respecting hierarchy (Admin > Manager > Staff)
-    if 'Admin' in groups or user.is_superuser:
-        role = 'Admin'
-    elif 'Manager' in groups:
-        role = 'Manager'
-    elif 'Staff' in groups:
-        role = 'Staff'
+    groups = sorted(get_group_names(user))
+    # Role based on groups, respecting hierarchy (Admin > Manager > Staff)
+    role = resolve_role(user)
 
     data = {
         'id': user.id,
@@ -209,8 +239,9 @@ def validate_applicant_view(request):
 
     try:
        
-        applicant = Applicant.objects.get(
-            first_name__iexact=first_name.strip(),
+        # phone is normalized by PhoneNumberField and resolved by its unique index
+        applicant = Applicant.objects.alias(first_name_lower=Lower('first_name')).get(
+            first_name_lower=first_name.strip().lower(),
             phone=phone.strip()
         )
         
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0002_alter_cashflow_options_cashflow_is_deleted'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='cashflow',
+            options={'ordering': ['-date', '-id'], 'verbose_name': 'Cashflow Entry', 'verbose_name_plural': 'Cashflow Entries'},
+        ),
+        migrations.AddIndex(
+            model_name='cashflow',
+            index=models.Index(fields=['-date', '-id'], name='cashflow_date_id_idx'),
+        ),
+    ]
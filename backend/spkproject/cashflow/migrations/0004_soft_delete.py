@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-18 21:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0003_alter_cashflow_options_cashflow_cashflow_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='cashflow',
+            name='cashflow_date_id_idx',
+        ),
+        migrations.AddField(
+            model_name='cashflow',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='cashflow',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='cashflow',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-date', '-id'], name='cashflow_live_date_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-18 21:43
+
+import core.money
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0004_soft_delete'),
+    ]
+
+    operations = [
+        core.money.AlterFieldToPaise(
+            model_name='cashflow',
+            name='income_amount',
+            field=core.money.PaiseField(max_digits=10),
+        ),
+        core.money.AlterFieldToPaise(
+            model_name='cashflow',
+            name='outgoing_amount',
+            field=core.money.PaiseField(max_digits=10),
+        ),
+    ]
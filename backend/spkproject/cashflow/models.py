@@ -1,32 +1,28 @@
 from django.db import models
 
-class CashflowQuerySet(models.QuerySet):
-    def active(self):
-        return self.filter(is_deleted=False)
+from core.mixins import FieldTrackerMixin
+from core.money import PaiseField
+from core.softdelete import SoftDeleteModel, SoftDeleteQuerySet, live_index
 
-class Cashflow(models.Model):
+class Cashflow(FieldTrackerMixin, SoftDeleteModel):
     date = models.DateField()
-    income_amount = models.DecimalField(max_digits=10, decimal_places=2)
-    outgoing_amount = models.DecimalField(max_digits=10, decimal_places=2)
-    is_deleted = models.BooleanField(default=False, db_index=True)  # Index for performance
+    income_amount = PaiseField(max_digits=10)
+    outgoing_amount = PaiseField(max_digits=10)
 
-    objects = CashflowQuerySet.as_manager()
+    objects = SoftDeleteQuerySet.as_manager() # Every entry; .active() for the live ones
 
     def delete(self, *args, **kwargs):
         """Override delete method to perform a soft delete."""
-        self.is_deleted = True
-        self.save()
-
-    def restore(self):
-        """Restore a soft-deleted record."""
-        self.is_deleted = False
-        self.save()
+        self.soft_delete()
 
     def __str__(self):
         return f"Cashflow {self.date} - Income: {self.income_amount}, Outgoing: {self.outgoing_amount}"
 
     class Meta:
-        ordering = ["-date"]  # Order by latest date first
+        ordering = ["-date", "-id"]  # Order by latest date first, id keeps pages stable
+        indexes = [
+            live_index('-date', '-id', name='cashflow_live_date_idx'),  # Keyset pagination of the live entries
+        ]
         verbose_name = "Cashflow Entry"
         verbose_name_plural = "Cashflow Entries"
 
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from core.money import MoneyField
 from .models import Cashflow
 
 class CashflowSerializer(serializers.ModelSerializer):
@@ -6,3 +7,8 @@ class CashflowSerializer(serializers.ModelSerializer):
         model = Cashflow
         fields = ['id', 'date', 'income_amount', 'outgoing_amount', 'is_deleted']
         read_only_fields = ['is_deleted']  # Prevent users from manually modifying this field
+
+class CashflowTotalsSerializer(serializers.Serializer):
+    total_income = MoneyField(max_digits=15, read_only=True)
+    total_outgoing = MoneyField(max_digits=15, read_only=True)
+    net_balance = MoneyField(max_digits=15, read_only=True)
@@ -1,3 +1,59 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .models import Cashflow
+
+CASHFLOW_URL = '/api/cashflow/'
+
+
+class CashflowListTests(TestCase):
+    """ The ledger list is keyset-paginated on (-date, -id); its totals are summed in the database. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('cashflow-staff', 'cashflow-staff@example.com', 'pass')
+        # Two entries a day over five days, so pages break inside a date
+        cls.entries = Cashflow.objects.bulk_create([
+            Cashflow(date=date(2024, 3, 1) + timedelta(days=i // 2), income_amount=Decimal('100.50'), outgoing_amount=Decimal(i))
+            for i in range(10)
+        ])
+        Cashflow.objects.filter(pk=cls.entries[0].pk).bulk_soft_delete()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_pages_cost_the_same_and_never_overlap(self):
+        with self.assertNumQueries(1):
+            first = self.client.get(CASHFLOW_URL, {'page_size': 4}).data
+        seen = [row['id'] for row in first['results']]
+        page = first
+        while page['next']:
+            with self.assertNumQueries(1):
+                page = self.client.get(page['next']).data
+            seen += [row['id'] for row in page['results']]
+
+        live = Cashflow.objects.active().order_by('-date', '-id').values_list('id', flat=True)
+        self.assertEqual(seen, list(live))
+        self.assertNotIn(self.entries[0].pk, seen)
+
+    def test_date_range_and_totals(self):
+        params = {'date__gte': '2024-03-02', 'date__lte': '2024-03-03'}
+        rows = self.client.get(CASHFLOW_URL, params).data['results']
+        self.assertEqual(sorted(row['id'] for row in rows), [entry.pk for entry in self.entries[2:6]])
+
+        with self.assertNumQueries(1):
+            totals = self.client.get(f'{CASHFLOW_URL}totals/', params).data
+        self.assertEqual(totals, {'total_income': '402.00', 'total_outgoing': '14.00', 'net_balance': '388.00'})
 
-# Create your tests here.
+        # The whole ledger, without the deleted entry
+        totals = self.client.get(f'{CASHFLOW_URL}totals/').data
+        self.assertEqual(totals, {'total_income': '904.50', 'total_outgoing': '45.00', 'net_balance': '859.50'})
+        self.assertEqual(
+            self.client.get(f'{CASHFLOW_URL}totals/', {'date__gte': '2025-01-01'}).data,
+            {'total_income': '0.00', 'total_outgoing': '0.00', 'net_balance': '0.00'},
+        )
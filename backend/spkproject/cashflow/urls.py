@@ -1,7 +1,10 @@
 from django.urls import path
-from .views import CashflowListCreateView, CashflowRetrieveUpdateDeleteView
+from .views import CashflowBulkSoftDeleteView, CashflowListCreateView, CashflowRetrieveUpdateDeleteView, CashflowTotalsView
 
 urlpatterns = [
     path('', CashflowListCreateView.as_view(), name='cashflow-list-create'),
+    path('totals/', CashflowTotalsView.as_view(), name='cashflow-totals'),
     path('<int:id>/', CashflowRetrieveUpdateDeleteView.as_view(), name='cashflow-detail'),
+    path('bulk-delete/', CashflowBulkSoftDeleteView.as_view(), name='cashflow-bulk-delete'),
+    path('bulk-restore/', CashflowBulkSoftDeleteView.as_view(restore=True), name='cashflow-bulk-restore'),
 ]
@@ -1,23 +1,55 @@
+from django.db.models import Sum
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework import status
+from core.bulk import BulkSoftDeleteMixin
 from .models import Cashflow
-from .serializers import CashflowSerializer
+from .serializers import CashflowSerializer, CashflowTotalsSerializer
+
+# ?date__gte= / ?date__lte=, shared by the list and its totals so both cover the same entries
+DATE_RANGE_FILTERS = {'date': ['gte', 'lte']}
 
 class CashflowListCreateView(generics.ListCreateAPIView):
-    """View to list all non-deleted cashflows and create a new cashflow"""
-    queryset = Cashflow.objects.filter(is_deleted=False)
+    """View to list non-deleted cashflows (newest first, keyset-paginated on the live date index) and create a new cashflow"""
+    queryset = Cashflow.objects.active()
     serializer_class = CashflowSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = DATE_RANGE_FILTERS
+
+class CashflowTotalsView(generics.GenericAPIView):
+    """Total income, outgoing and net balance of the non-deleted cashflows, summed in the database"""
+    queryset = Cashflow.objects.active()
+    serializer_class = CashflowTotalsSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = DATE_RANGE_FILTERS
+
+    def get(self, request, *args, **kwargs):
+        totals = self.filter_queryset(self.get_queryset()).aggregate(
+            total_income=Sum('income_amount', default=0),
+            total_outgoing=Sum('outgoing_amount', default=0),
+        )
+        totals['net_balance'] = totals['total_income'] - totals['total_outgoing']
+        return Response(self.get_serializer(totals).data)
 
 class CashflowRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
     """View to retrieve, update, and soft delete a cashflow record"""
-    queryset = Cashflow.objects.filter(is_deleted=False)
+    queryset = Cashflow.objects.active()
     serializer_class = CashflowSerializer
     lookup_field = 'id'
 
     def destroy(self, request, *args, **kwargs):
         """Soft delete instead of hard delete"""
         instance = self.get_object()
-        instance.is_deleted = True
-        instance.save()
+        instance.soft_delete()
         return Response({"message": "Cashflow record soft deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
+
+
+class CashflowBulkSoftDeleteView(BulkSoftDeleteMixin, generics.GenericAPIView):
+    """Soft delete (or, with restore=True, restore) a list of cashflow ids in one request, see core.bulk"""
+    serializer_class = CashflowSerializer
+    lookup_field = 'id'
+    restore = False
+
+    def post(self, request, *args, **kwargs):
+        return self.bulk_soft_delete_response(request, restore=self.restore)
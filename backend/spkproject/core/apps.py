@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from . import roles  # noqa: F401 (registers the role cache invalidation signals)
+        from rest_framework.serializers import ModelSerializer
+        from .money import MoneyField, PaiseField
+        ModelSerializer.serializer_field_mapping[PaiseField] = MoneyField
@@ -0,0 +1,53 @@
+# core/authentication.py
+import logging
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import is_shared
+from .roles import get_permissions_version, remember_group_names
+from .serializers import USER_CLAIM_FIELDS, GROUPS_CLAIM, PERMISSIONS_VERSION_CLAIM
+
+logger = logging.getLogger(__name__)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that trusts the user claims stamped by ClaimsTokenObtainPairSerializer
+    while their permissions version is still current, so an authenticated request needs no
+    User or group query. Tokens without claims, or whose version is stale (groups or account
+    changed since issue), fall back to the stock database lookup. So does every token when
+    the cache is per process (core.cache.is_shared): a version bumped by another worker
+    would not be seen, and a deactivated user's token would keep working there.
+
+    The user built from claims is a real User instance with the remaining fields deferred:
+    it can be assigned to foreign keys, and reading any other field loads it on demand.
+    Role, groups and employee_id are also available on request.auth.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        claims_version = validated_token.get(PERMISSIONS_VERSION_CLAIM)
+        if (
+            not is_shared() or user_id is None or claims_version is None
+            or claims_version != get_permissions_version(user_id)
+        ):
+            return super().get_user(validated_token)
+        return self.user_from_claims(validated_token)
+
+    def user_from_claims(self, validated_token):
+        user_model = get_user_model()
+        claims = {field_name: validated_token.get(field_name) for field_name in USER_CLAIM_FIELDS}
+        claims[user_model._meta.pk.attname] = validated_token[api_settings.USER_ID_CLAIM]
+        claims['is_active'] = True # Deactivation bumps the version, so a current token means active
+
+        field_names, values = [], []
+        for field in user_model._meta.concrete_fields:
+            if field.attname in claims:
+                field_names.append(field.attname)
+                values.append(claims[field.attname])
+        user = user_model.from_db(DEFAULT_DB_ALIAS, field_names, values)
+        remember_group_names(user, validated_token.get(GROUPS_CLAIM) or [])
+        return user
@@ -0,0 +1,123 @@
+# core/bulk.py
+"""
+Batch soft delete / restore endpoints for soft-deletable models (core.softdelete).
+
+    POST .../bulk-delete/   {"ids": ["AP1A2B3C", "AP4D5E6F", ...]}
+    POST .../bulk-restore/  {"ids": [...]}
+
+The ids are values of the view's lookup_field (userID for applicants, id
+elsewhere). The view's permission classes are checked once for the whole batch,
+the rows are read and locked with one SELECT and changed with one UPDATE per
+model (plus the cascaded children), and the response reports each id:
+
+    {"status": "success", "message": "2 of 3 deleted.",
+     "results": [{"id": "AP1A2B3C", "outcome": "deleted"}, ...],
+     "counts": {"deleted": 2, "not_found": 1}}
+
+Outcomes: deleted / restored, already_deleted / already_active, not_found, invalid.
+"""
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+IDS_KEY = 'ids'
+
+
+class BulkSoftDeleteMixin:
+    """
+    For views of SoftDeleteModel models. ViewSets get bulk-delete / bulk-restore
+    actions; plain generic views call bulk_soft_delete_response() from post().
+    Rows are looked up in model.all_objects, narrowed by get_bulk_queryset().
+    """
+    bulk_lookup_field = None # Defaults to lookup_field
+
+    def get_bulk_queryset(self):
+        return self.get_serializer_class().Meta.model.all_objects.all()
+
+    def _parse_bulk_ids(self, request, field):
+        """ (ids in request order without duplicates, {raw id: python value}) or a 400 Response. """
+        ids = request.data.get(IDS_KEY) if hasattr(request.data, 'get') else None
+        max_ids = getattr(settings, 'BULK_ACTION_MAX_IDS', 5000)
+        if not isinstance(ids, list) or not ids:
+            return Response(
+                {'status': 'error', 'message': f"'{IDS_KEY}' must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(ids) > max_ids:
+            return Response(
+                {'status': 'error', 'message': f"At most {max_ids} ids per request."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        values = {}
+        for raw in ids:
+            raw = raw if isinstance(raw, (str, int)) else str(raw)
+            if raw in values:
+                continue
+            try:
+                values[raw] = field.to_python(raw)
+            except DjangoValidationError:
+                values[raw] = None
+        return list(values), values
+
+    def bulk_soft_delete_response(self, request, restore=False):
+        lookup = self.bulk_lookup_field or self.lookup_field
+        queryset = self.get_bulk_queryset()
+        model = queryset.model
+        field = model._meta.pk if lookup == 'pk' else model._meta.get_field(lookup)
+        parsed = self._parse_bulk_ids(request, field)
+        if isinstance(parsed, Response):
+            return parsed
+        ids, values = parsed
+        wanted = {value for value in values.values() if value is not None}
+
+        with transaction.atomic():
+            # Locked, so the outcomes reported are the ones the UPDATE acts on
+            found = dict(
+                queryset.select_for_update().filter(**{f"{lookup}__in": wanted}).values_list(lookup, 'is_deleted')
+            )
+            to_change = [value for value, is_deleted in found.items() if is_deleted == restore]
+            if to_change:
+                changed_rows = queryset.filter(**{f"{lookup}__in": to_change})
+                if restore:
+                    changed_rows.bulk_restore()
+                else:
+                    changed_rows.bulk_soft_delete()
+
+        done, unchanged = ('restored', 'already_active') if restore else ('deleted', 'already_deleted')
+        results = []
+        for raw in ids:
+            value = values[raw]
+            if value is None:
+                outcome = 'invalid'
+            elif value not in found:
+                outcome = 'not_found'
+            else:
+                outcome = done if found[value] == restore else unchanged
+            results.append({'id': raw, 'outcome': outcome})
+        counts = Counter(result['outcome'] for result in results)
+
+        logger.info(
+            f"Bulk {'restore' if restore else 'delete'} of {model._meta.label} by user "
+            f"{request.user.username}: {dict(counts)}"
+        )
+        return Response({
+            'status': 'success',
+            'message': f"{counts[done]} of {len(ids)} {done}.",
+            'results': results,
+            'counts': dict(counts),
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='bulk-delete', parser_classes=[JSONParser])
+    def bulk_delete(self, request, *args, **kwargs):
+        return self.bulk_soft_delete_response(request)
+
+    @action(detail=False, methods=['post'], url_path='bulk-restore', parser_classes=[JSONParser])
+    def bulk_restore(self, request, *args, **kwargs):
+        return self.bulk_soft_delete_response(request, restore=True)
@@ -0,0 +1,160 @@
+# core/cache.py
+"""
+Two-tier cache for rendered API payloads and lookups.
+
+Values live in a small in-process LRU in front of the shared Django cache
+(settings.CACHES['default']: Redis in production, LocMemCache otherwise and in
+tests). Every key embeds a version for its row (plus one for the whole
+namespace), read from the shared cache on each lookup and bumped on writes (see
+loanapp.cache for the signal receivers), so a stale local entry is never served;
+it simply ages out of the LRU.
+
+Cached values are shared between requests and must be treated as read-only.
+Hit/miss counters are per process; see stats() and core.views.cache_stats.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache as shared_cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+_MISSING = object()
+_registry = {}
+_PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared(alias='default'):
+    """
+    True if the cache is visible to every worker process (e.g. Redis). A LocMemCache
+    is private to its process, so an invalidation made by one worker is not seen by
+    the others; state that must not outlive such an invalidation can only be kept
+    per request there (see core.roles and core.authentication).
+    """
+    return not isinstance(caches[alias], _PROCESS_LOCAL_BACKENDS)
+
+
+def _new_version():
+    # Time based, so a version lost from the shared cache is never handed out again
+    return time.time_ns()
+
+
+class LocalLRUCache:
+    """ Thread-safe, size-bounded, process-local mapping. """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TieredCache:
+    """
+    A namespace of versioned entries, e.g. TieredCache('loan-detail').
+    Entries are addressed by (ident, variant): ident is the row the value depends
+    on (its version is what invalidate() bumps), variant distinguishes renderings
+    of the same row (query string, host).
+    """
+
+    def __init__(self, namespace, timeout=None, local_max_entries=None):
+        if namespace in _registry:
+            raise ValueError(f"Cache namespace '{namespace}' is already registered.")
+        self.namespace = namespace
+        self.timeout = timeout if timeout is not None else getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 600)
+        self.local = LocalLRUCache(
+            local_max_entries if local_max_entries is not None else getattr(settings, 'RESPONSE_CACHE_LOCAL_ENTRIES', 512)
+        )
+        self.counters = Counter()
+        _registry[namespace] = self
+
+    def _version_keys(self, ident):
+        return f"rc:{self.namespace}:version", f"rc:{self.namespace}:version:{ident}"
+
+    def get_version(self, ident):
+        namespace_key, row_key = self._version_keys(ident)
+        versions = shared_cache.get_many([namespace_key, row_key])
+        for key in (namespace_key, row_key):
+            if key not in versions:
+                shared_cache.add(key, _new_version(), None)
+                versions[key] = shared_cache.get(key)
+        return f"{versions[namespace_key]}.{versions[row_key]}"
+
+    def _key(self, ident, variant):
+        return f"rc:{self.namespace}:{ident}:{self.get_version(ident)}:{variant}"
+
+    def get_or_set(self, ident, build, variant=''):
+        """ Cached value for (ident, variant), calling build() and storing its result on a miss. """
+        key = self._key(ident, variant)
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self.counters['local_hits'] += 1
+            return value
+        value = shared_cache.get(key, _MISSING)
+        if value is not _MISSING:
+            self.counters['shared_hits'] += 1
+        else:
+            self.counters['misses'] += 1
+            value = build()
+            shared_cache.set(key, value, self.timeout)
+        self.local.set(key, value)
+        return value
+
+    def invalidate(self, *idents):
+        """ Makes every entry of these rows unreachable. """
+        if idents:
+            shared_cache.set_many({self._version_keys(ident)[1]: _new_version() for ident in idents}, None)
+            self.counters['invalidations'] += len(idents)
+
+    def invalidate_all(self):
+        shared_cache.set(self._version_keys(None)[0], _new_version(), None)
+        self.counters['invalidations'] += 1
+
+    def stats(self):
+        hits = self.counters['local_hits'] + self.counters['shared_hits']
+        lookups = hits + self.counters['misses']
+        return {
+            'local_hits': self.counters['local_hits'],
+            'shared_hits': self.counters['shared_hits'],
+            'misses': self.counters['misses'],
+            'invalidations': self.counters['invalidations'],
+            'hit_ratio': round(hits / lookups, 4) if lookups else None,
+            'local_entries': len(self.local),
+        }
+
+
+def request_variant(request):
+    """
+    Variant for payloads rendered for this request: absolute media URLs depend on the
+    host, and ?fields= / ?expand= change the body.
+    """
+    raw = f"{request.scheme}://{request.get_host()}?{request.GET.urlencode()}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def stats():
+    """ Counters of every registered namespace, for this process. """
+    return {namespace: tiered.stats() for namespace, tiered in sorted(_registry.items())}
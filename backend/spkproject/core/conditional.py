@@ -0,0 +1,117 @@
+# core/conditional.py
+"""
+Conditional requests for detail endpoints.
+
+retrieve answers with a strong ETag and Last-Modified. A matching If-None-Match
+(or, without one, an If-Modified-Since that is not older) gets 304 Not Modified
+after a single query: nested rows are only prefetched, and the object only
+serialized, when the body is actually sent. PUT/PATCH with If-Match lock the row
+and fail with 412 if the client's copy is stale.
+
+ETags are derived from a per-row version (FieldTrackerMixin.version_field) plus
+whatever else the representation depends on (get_etag_parts).
+"""
+import hashlib
+
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+WRITE_METHODS = ('PUT', 'PATCH')
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'This record was changed since you loaded it. Reload it and try again.'
+    default_code = 'precondition_failed'
+
+
+class ConditionalRetrieveMixin:
+    """ ViewSet mixin; override get_etag_parts() when the representation spans other rows. """
+
+    def get_etag_parts(self, instance):
+        return [instance.pk, getattr(instance, instance.version_field)]
+
+    def get_last_modified(self, instance):
+        return getattr(instance, 'updated_at', None)
+
+    def get_etag(self, instance):
+        # One ETag per resource state; ?fields= variants live at other URLs, so caches keep them apart
+        parts = ':'.join(str(part) for part in self.get_etag_parts(instance))
+        return '"%s"' % hashlib.sha1(parts.encode('utf-8')).hexdigest()
+
+    def _validator_headers(self, instance):
+        headers = {'ETag': self.get_etag(instance), 'Cache-Control': 'private, no-cache'}
+        last_modified = self.get_last_modified(instance)
+        if last_modified is not None:
+            headers['Last-Modified'] = http_date(last_modified.timestamp())
+        return headers
+
+    def retrieve(self, request, *args, **kwargs):
+        # Same lookup as get_object(), but nested rows are held back until we know a body is needed
+        queryset = self.filter_queryset(self.get_queryset())
+        prefetch_lookups = queryset._prefetch_related_lookups
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        instance = get_object_or_404(
+            queryset.prefetch_related(None), **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        self.check_object_permissions(request, instance)
+
+        headers = self._validator_headers(instance)
+        last_modified = self.get_last_modified(instance)
+        not_modified = get_conditional_response(
+            request._request,
+            etag=headers['ETag'],
+            last_modified=int(last_modified.timestamp()) if last_modified is not None else None,
+        )
+        if not_modified is not None and not_modified.status_code == status.HTTP_304_NOT_MODIFIED:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        return Response(self.get_retrieve_data(instance, prefetch_lookups), headers=headers)
+
+    def get_retrieve_data(self, instance, prefetch_lookups):
+        """ The body for a full retrieve; views override this to serve it from a cache. """
+        prefetch_related_objects([instance], *prefetch_lookups)
+        return self.get_serializer(instance).data
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in WRITE_METHODS and 'HTTP_IF_MATCH' in request.META:
+            # The row lock taken in get_object() is held until the write commits
+            with transaction.atomic():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_object(self):
+        if self.request.method not in WRITE_METHODS:
+            return super().get_object()
+        if 'If-Match' in self.request.headers:
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            model = self.get_queryset().model
+            list(model._base_manager.select_for_update().filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            ).values_list('pk'))
+        instance = super().get_object()
+        self.check_if_match(instance)
+        self._conditional_instance = instance
+        return instance
+
+    def check_if_match(self, instance):
+        if_match = self.request.headers.get('If-Match')
+        if not if_match or if_match.strip() == '*':
+            return
+        if self.get_etag(instance) not in parse_etags(if_match):
+            raise PreconditionFailed()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        instance = getattr(self, '_conditional_instance', None)
+        if instance is not None and response.status_code == status.HTTP_200_OK:
+            # The new validator, so the next write can send If-Match without another GET
+            for header, value in self._validator_headers(instance).items():
+                response[header] = value
+        return response
@@ -0,0 +1,80 @@
+# core/fields.py
+import logging
+import re
+
+from django.conf import settings
+from django.db import models
+
+logger = logging.getLogger(__name__)
+
+_NON_DIGITS = re.compile(r'\D')
+
+
+def normalize_phone(value):
+    """
+    Canonical form of a phone number: domestic numbers (settings.PHONE_COUNTRY_CODE)
+    as their bare national digits, e.g. '+91 98765-43210', '098765 43210' and
+    '919876543210' all become '9876543210'; other international numbers as '+' and
+    digits. Values without any digit are returned stripped, None as None.
+    """
+    if value is None:
+        return None
+    raw = str(value).strip()
+    digits = _NON_DIGITS.sub('', raw)
+    if not digits:
+        return raw
+
+    country_code = getattr(settings, 'PHONE_COUNTRY_CODE', '91')
+    national_digits = getattr(settings, 'PHONE_NATIONAL_DIGITS', 10)
+    international = raw.startswith('+') or raw.startswith('00')
+    if raw.startswith('00'):
+        digits = digits[2:]
+
+    if len(digits) == len(country_code) + national_digits and digits.startswith(country_code):
+        return digits[len(country_code):]
+    if international:
+        return f"+{digits}"
+    if len(digits) == national_digits + 1 and digits.startswith('0'):
+        return digits[1:] # Trunk prefix
+    return digits
+
+
+class PhoneNumberField(models.CharField):
+    """
+    CharField that stores phone numbers in canonical form (normalize_phone). Values
+    are normalized on save, in bulk/queryset updates and in exact/in lookups, so
+    filter(phone='+91 98765 43210') matches the stored '9876543210'.
+    """
+
+    def pre_save(self, model_instance, add):
+        value = normalize_phone(getattr(model_instance, self.attname))
+        setattr(model_instance, self.attname, value)
+        return value
+
+    def get_prep_value(self, value):
+        return normalize_phone(super().get_prep_value(value))
+
+
+def backfill_phone_numbers(model, field_name):
+    """
+    Rewrites stored numbers of `model.field_name` into canonical form, for data
+    migrations. For unique fields, a number whose canonical form is already taken is
+    left as it is and logged, rather than failing the migration.
+    """
+    field = model._meta.get_field(field_name)
+    rows = list(model._base_manager.exclude(**{f"{field_name}__isnull": True}).values_list('pk', field_name))
+    taken = {value for _, value in rows} if field.unique else set()
+    changed = []
+    for pk, value in rows:
+        normalized = normalize_phone(value)
+        if normalized == value:
+            continue
+        if field.unique:
+            if normalized in taken:
+                logger.warning(f"{model._meta.label} {pk}: '{value}' left as is, '{normalized}' is already in use.")
+                continue
+            taken.discard(value)
+            taken.add(normalized)
+        changed.append(model(pk=pk, **{field_name: normalized}))
+    model._base_manager.bulk_update(changed, [field_name], batch_size=1000)
+    return len(changed)
@@ -0,0 +1,117 @@
+# core/fieldsets.py
+"""
+Sparse fieldsets for read endpoints.
+
+  ?fields=id,loanID,status   render only these fields
+  ?expand=nominees           embed only these nested relations (Meta.expandable_fields)
+  ?view=compact              list rows straight from a .values() projection
+
+With ?fields= a nested relation is rendered only if it is named in fields or expand.
+Relations that are not rendered are not loaded either: views pass
+requested_relations() to their eager-loading helpers, so the prefetch queries are
+skipped too. Writes (and their responses) always use the full representation.
+"""
+from decimal import Decimal
+
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+VIEW_PARAM = 'view'
+COMPACT_VIEW = 'compact'
+
+
+def _name_set(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def parse_fieldset(request):
+    """ (fields, expand) from the query string; each is a set of names or None if not sent. """
+    if request is None or request.method not in SAFE_METHODS:
+        return None, None
+    fields = request.query_params.get(FIELDS_PARAM)
+    expand = request.query_params.get(EXPAND_PARAM)
+    return (
+        _name_set(fields) if fields is not None else None,
+        _name_set(expand) if expand is not None else None,
+    )
+
+
+def requested_relations(request, expandable_fields):
+    """ The subset of `expandable_fields` the response will render (all of them by default). """
+    fields, expand = parse_fieldset(request)
+    relations = set(expandable_fields)
+    if fields is not None:
+        relations &= fields | (expand or set())
+    elif expand is not None:
+        relations &= expand
+    return relations
+
+
+def _kept_names(request, names, expandable_fields):
+    requested, expand = parse_fieldset(request)
+    keep = set(names) if requested is None else requested | (expand or set())
+    return keep - (set(expandable_fields) - requested_relations(request, expandable_fields))
+
+
+def sparse_data(request, data, expandable_fields):
+    """ An already rendered representation (dict) narrowed to what ?fields= / ?expand= ask for. """
+    requested, expand = parse_fieldset(request)
+    if requested is None and expand is None:
+        return data
+    keep = _kept_names(request, data, expandable_fields)
+    return {name: value for name, value in data.items() if name in keep}
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    ModelSerializer mixin honouring ?fields= / ?expand= on GET requests. The request
+    comes from the serializer context; Meta.expandable_fields names the nested
+    relations that can be left out. Unknown names are ignored.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        requested, expand = parse_fieldset(request)
+        if requested is None and expand is None:
+            return fields
+
+        keep = _kept_names(request, fields, getattr(self.Meta, 'expandable_fields', ()))
+        return {name: field for name, field in fields.items() if name in keep}
+
+
+class CompactListMixin:
+    """
+    ViewSet mixin: ?view=compact on list returns plain rows from
+    queryset.values(*compact_fields), skipping model instances, serializers and
+    nested relations entirely. ?fields= narrows the columns within compact_fields.
+    Values are the stored ones (status codes rather than labels, decimals as strings).
+    """
+    compact_fields = ()
+
+    def get_compact_queryset(self):
+        # Prefetches only feed the serializer; .values() rows cannot use them
+        return self.filter_queryset(self.get_queryset()).prefetch_related(None)
+
+    def compact_row(self, row):
+        return {key: str(value) if isinstance(value, Decimal) else value for key, value in row.items()}
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get(VIEW_PARAM) != COMPACT_VIEW:
+            return super().list(request, *args, **kwargs)
+
+        requested, _ = parse_fieldset(request)
+        columns = [name for name in self.compact_fields if requested is None or name in requested]
+        queryset = self.get_compact_queryset()
+        get_ordering = getattr(self.paginator, 'get_ordering', None)
+        if get_ordering is not None:
+            # The keyset paginator reads the sort keys back from each row
+            columns += [key.lstrip('-') for key in get_ordering(queryset) if key.lstrip('-') not in columns]
+        queryset = queryset.values(*columns)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response([self.compact_row(row) for row in page])
+        return Response([self.compact_row(row) for row in queryset])
@@ -0,0 +1,54 @@
+# core/id_allocator.py
+"""
+Atomic allocation of human-readable business IDs (loanID, employee_id).
+
+Each prefix has a counter row in core.IdSequence. Allocating N numbers is a
+single UPDATE ... RETURNING, so concurrent approvals can never hand out the same
+number and no scan over existing IDs is needed. The first time a prefix is used
+its counter is seeded from the highest number already stored (`seed` callable).
+"""
+import logging
+
+from django.db import connection, transaction
+
+from .models import IdSequence
+
+logger = logging.getLogger(__name__)
+
+
+def _increment(prefix, count):
+    table = connection.ops.quote_name(IdSequence._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET last_value = last_value + %s WHERE prefix = %s RETURNING last_value",
+            [count, prefix],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def allocate_ids(prefix, count=1, seed=None):
+    """
+    Reserves `count` consecutive numbers for `prefix` and returns them as a range.
+
+    `seed` is an optional callable returning the highest number already used for
+    this prefix; it is only called when the prefix has no counter row yet.
+    """
+    if count < 1:
+        raise ValueError("count must be at least 1.")
+
+    with transaction.atomic():
+        last_value = _increment(prefix, count)
+        if last_value is None:
+            start_from = int(seed() or 0) if seed else 0
+            _, created = IdSequence.objects.get_or_create(prefix=prefix, defaults={'last_value': start_from})
+            if created:
+                logger.info(f"ID sequence '{prefix}' seeded at {start_from}.")
+            last_value = _increment(prefix, count)
+
+    return range(last_value - count + 1, last_value + 1)
+
+
+def allocate_id(prefix, seed=None):
+    """ Reserves and returns the next single number for `prefix`. """
+    return allocate_ids(prefix, 1, seed=seed)[0]
@@ -0,0 +1,188 @@
+import datetime
+import json
+import statistics
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+
+from applicants.models import Applicant, PropertyDetails
+from employees.models import EmployeeDetails
+from loanapp.models import EMISchedule, LoanApplication
+
+SEED_PREFIX = 'Bench'
+
+# The index pack (migrations applicants 0028, employees 0010, loanapp 0014) and the
+# indexes it replaced; "before" runs with the pack dropped and these recreated.
+INDEX_PACK = [
+    (LoanApplication, 'loanapp_status_regdate_idx'),
+    (LoanApplication, 'loanapp_applicant_regdate_idx'),
+    (EMISchedule, 'emischedule_loan_month_idx'),
+    (Applicant, 'applicants_live_regdate_idx'),
+    (PropertyDetails, 'applicants_property_live_idx'),
+    (EmployeeDetails, 'employees_active_created_idx'),
+]
+REPLACED_INDEXES = [
+    (LoanApplication, models.Index(fields=['applicant_record'], name='bench_loan_applicant_fk')),
+    (EMISchedule, models.Index(fields=['loan_application'], name='bench_emi_loan_fk')),
+    (Applicant, models.Index(fields=['-loanreg_date', '-id'], name='bench_applicant_regdate')),
+    (EmployeeDetails, models.Index(fields=['is_deleted'], name='bench_employee_is_deleted')),
+]
+
+
+def hot_queries():
+    """ (label, queryset) for the filters and orderings the pack is meant to serve. """
+    applicant = Applicant.objects.filter(first_name__startswith=SEED_PREFIX).order_by('id').values_list('userID', 'id').first()
+    loan_id = LoanApplication.objects.order_by('id').values_list('id', flat=True).first()
+    if applicant is None or loan_id is None:
+        raise CommandError("No data to benchmark; run with --seed first (on a scratch database).")
+    user_id, applicant_pk = applicant
+    applicant_page = list(Applicant.objects.order_by('-loanreg_date', '-id').values_list('id', flat=True)[:50])
+    return [
+        ("loans ?status=ACTIVE, first page",
+         LoanApplication.objects.filter(status='ACTIVE').order_by('-LoanRegDate', '-id')[:50]),
+        ("latest loan of an applicant",
+         LoanApplication.objects.filter(applicant_record_id=user_id).order_by('-LoanRegDate', '-id').values('status', 'loanID')[:1]),
+        ("EMI by (loan, month)",
+         EMISchedule.objects.filter(loan_application_id=loan_id, month=3)),
+        ("EMI schedule prefetch",
+         EMISchedule.objects.filter(loan_application_id__in=[loan_id]).order_by('month')),
+        ("active applicants, first page",
+         Applicant.objects.order_by('-loanreg_date', '-id')[:50]),
+        ("active properties of an applicant page",
+         PropertyDetails.objects.filter(applicant_id__in=applicant_page + [applicant_pk])),
+        ("active employees, first page",
+         EmployeeDetails.active_objects.order_by('-created_at', '-id')[:50]),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Shows EXPLAIN ANALYZE plans and latencies of the hot list/lookup queries with and without the "
+        "index pack. The 'before' run drops the pack inside a transaction that is rolled back, so the "
+        "schema is left as it is. --seed inserts a synthetic dataset first: use a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help="Seed this many loans (with applicants, EMIs, properties, employees).")
+        parser.add_argument('--repeat', type=int, default=20, help="Executions per query; the median is reported.")
+        parser.add_argument('--plans', action='store_true', help="Print the full plans, not only the top node.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("This benchmark needs PostgreSQL (partial indexes, EXPLAIN ANALYZE in JSON).")
+        if options['seed']:
+            self.seed(options['seed'])
+
+        queries = hot_queries()
+        with transaction.atomic():
+            with connection.schema_editor(atomic=False) as schema_editor:
+                for model, name in INDEX_PACK:
+                    schema_editor.remove_index(model, next(index for index in model._meta.indexes if index.name == name))
+                for model, index in REPLACED_INDEXES:
+                    schema_editor.add_index(model, index)
+            before = self.measure(queries, options['repeat'])
+            transaction.set_rollback(True)
+        after = self.measure(queries, options['repeat'])
+
+        for (label, _), (plan_before, ms_before), (plan_after, ms_after) in zip(queries, before, after):
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(f"  before: {ms_before:8.3f} ms  {self.describe(plan_before, options['plans'])}")
+            self.stdout.write(f"  after:  {ms_after:8.3f} ms  {self.describe(plan_after, options['plans'])}")
+
+    def measure(self, queries, repeat):
+        with connection.cursor() as cursor:
+            for model in {LoanApplication, EMISchedule, Applicant, PropertyDetails, EmployeeDetails}:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+            results = []
+            for _, queryset in queries:
+                sql, params = queryset.query.sql_with_params()
+                timings, plan = [], None
+                for _ in range(repeat):
+                    cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", params)
+                    explained = cursor.fetchone()[0]
+                    explained = json.loads(explained) if isinstance(explained, str) else explained
+                    plan = explained[0]['Plan']
+                    timings.append(explained[0]['Execution Time'])
+                results.append((plan, statistics.median(timings)))
+        return results
+
+    def describe(self, plan, full=False, depth=0):
+        node = plan['Node Type']
+        if plan.get('Index Name'):
+            node += f" using {plan['Index Name']}"
+        elif plan.get('Relation Name'):
+            node += f" on {plan['Relation Name']}"
+        if not full:
+            # The first node that reads a table tells which index (if any) was used
+            if not plan.get('Relation Name') and plan.get('Plans'):
+                return self.describe(plan['Plans'][0])
+            return node
+        lines = [f"\n{'    ' * (depth + 2)}-> {node} (rows={plan.get('Actual Rows')})"]
+        for child in plan.get('Plans', []):
+            lines.append(self.describe(child, full, depth + 1))
+        return ''.join(lines)
+
+    @transaction.atomic
+    def seed(self, loan_count):
+        """ Synthetic rows marked with SEED_PREFIX; about 10% of applicants/properties soft-deleted. """
+        today = datetime.date.today()
+        statuses = [code for code, _ in LoanApplication.LOAN_STATUS_CHOICES]
+        start = Applicant.all_objects.filter(first_name__startswith=SEED_PREFIX).count()
+        applicant_count = max(loan_count // 2, 1)
+
+        applicants = Applicant.all_objects.bulk_create([
+            Applicant(
+                userID=f"BN{n:08d}", first_name=f"{SEED_PREFIX}{n}", last_name='Seed', email=f"bench{n}@bench.invalid",
+                phone=f"7{n:09d}", is_deleted=(n % 10 == 0),
+            )
+            for n in range(start, start + applicant_count)
+        ], batch_size=1000)
+        PropertyDetails.all_objects.bulk_create([
+            PropertyDetails(applicant=applicant, propertyType=1 + i % 10, is_deleted=(i % 5 == 0))
+            for i, applicant in enumerate(applicants) for _ in range(2)
+        ], batch_size=1000)
+
+        loans = LoanApplication.objects.bulk_create([
+            LoanApplication(
+                applicant_record=applicants[i % applicant_count], first_name=applicants[i % applicant_count].first_name,
+                phone=applicants[i % applicant_count].phone, amount=Decimal('10000.00'), term=12, termType='Months',
+                interestRate=1.5, purpose='Seed', repaymentSource='Seed', status=statuses[i % len(statuses)],
+            )
+            for i in range(loan_count)
+        ], batch_size=1000)
+        EMISchedule.objects.bulk_create([
+            EMISchedule(
+                loan_application=loan, month=month, emiStartDate=today + datetime.timedelta(days=30 * (month - 6)),
+                emiTotalMonth=Decimal('900.00'), paymentAmount=Decimal('900.00') if month < 4 else Decimal('0.00'),
+            )
+            for loan in loans for month in range(1, 13)
+        ], batch_size=5000)
+
+        users = User.objects.bulk_create([
+            User(username=f"bench-user-{start + i}", email=f"bench-user-{start + i}@bench.invalid")
+            for i in range(max(applicant_count // 10, 1))
+        ], batch_size=1000)
+        EmployeeDetails.objects.bulk_create([
+            EmployeeDetails(
+                user=user, employee_id=f"BN{start + i:08d}", is_deleted=(i % 4 == 0),
+                leaving_date=today if i % 7 == 0 else None,
+            )
+            for i, user in enumerate(users)
+        ], batch_size=1000)
+
+        # auto_now_add gave every row today's date; spread them over ~3 years
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE loanapp_loanapplication SET "LoanRegDate" = CURRENT_DATE - (id %% 1000)::integer WHERE id >= %s',
+                [loans[0].pk],
+            )
+            cursor.execute(
+                'UPDATE applicants_applicant SET loanreg_date = CURRENT_DATE - (id %% 1000)::integer WHERE id >= %s',
+                [applicants[0].pk],
+            )
+        self.stdout.write(
+            f"Seeded {len(applicants)} applicants, {len(loans)} loans, {len(loans) * 12} EMIs, "
+            f"{len(applicants) * 2} properties and {len(users)} employees."
+        )
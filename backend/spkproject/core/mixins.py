@@ -0,0 +1,144 @@
+# core/mixins.py
+from django.db.models import F
+from django.db.models.base import DEFERRED
+from django.dispatch import Signal
+from django.utils import timezone
+
+# Sent with `instance` when rows an instance renders changed without a save() of
+# the instance itself (see FieldTrackerMixin.touch); caches listen to it.
+row_touched = Signal()
+
+
+class FieldTrackerMixin:
+    """
+    Remembers the values a model instance was loaded with, so callers can ask
+    has_changed('status') without re-reading the row, and so save() only writes
+    the columns that actually changed.
+
+    Usage: class MyModel(FieldTrackerMixin, models.Model). Must come before
+    models.Model so its save() wraps the real one.
+
+    Set version_field to the name of an integer column to have it incremented on
+    every write that changes something (used for ETags, see core.conditional). The
+    increment happens in SQL, so concurrent saves never write the same number; the
+    new value is read back the next time the attribute is accessed.
+    """
+    version_field = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._original_values = {
+            attname: value for attname, value in zip(field_names, values) if value is not DEFERRED
+        }
+        return instance
+
+    def _tracked_fields(self):
+        return [field for field in self._meta.concrete_fields if not field.primary_key]
+
+    def _snapshot(self, fields=None):
+        loaded = self.__dict__
+        original = getattr(self, '_original_values', None)
+        if original is None:
+            original = self._original_values = {}
+        for field in fields or self._tracked_fields():
+            if field.attname in loaded:
+                original[field.attname] = loaded[field.attname]
+
+    def _field_attname(self, field_name):
+        return self._meta.get_field(field_name).attname
+
+    def is_tracked(self, field_name):
+        """ True if the value this field was loaded with is known. """
+        return self._field_attname(field_name) in getattr(self, '_original_values', {})
+
+    def get_original(self, field_name, default=None):
+        """ The value `field_name` had when the instance was loaded (or last saved). """
+        return getattr(self, '_original_values', {}).get(self._field_attname(field_name), default)
+
+    def has_changed(self, field_name):
+        """ True if `field_name` differs from its loaded value. Untracked fields count as changed. """
+        attname = self._field_attname(field_name)
+        original = getattr(self, '_original_values', {})
+        if attname not in original:
+            return True
+        return self.__dict__.get(attname, original[attname]) != original[attname]
+
+    def get_dirty_fields(self):
+        """ Names of loaded fields whose value differs from the loaded one. """
+        original = getattr(self, '_original_values', {})
+        loaded = self.__dict__
+        return [
+            field.name for field in self._tracked_fields()
+            if field.attname in loaded and (field.attname not in original or loaded[field.attname] != original[field.attname])
+        ]
+
+    def _write_stamp_fields(self):
+        """ Columns refreshed on every real write: auto_now timestamps and the version. """
+        names = [field.name for field in self._tracked_fields() if getattr(field, 'auto_now', False)]
+        if self.version_field:
+            names.append(self.version_field)
+        return names
+
+    def _bump_version(self):
+        if self.version_field:
+            setattr(self, self.version_field, F(self.version_field) + 1)
+
+    def _expire_version(self):
+        """ Drops the in-memory version after an UPDATE incremented it; the next access reloads it. """
+        if self.version_field:
+            attname = self._field_attname(self.version_field)
+            self.__dict__.pop(attname, None)
+            getattr(self, '_original_values', {}).pop(attname, None)
+
+    def save(self, *args, **kwargs):
+        updating = not self._state.adding and not kwargs.get('force_insert') and not args
+        update_fields = kwargs.get('update_fields')
+        if updating and update_fields is None and getattr(self, '_original_values', None):
+            update_fields = self.get_dirty_fields()
+        if updating and update_fields:
+            # auto_now columns (e.g. updated_at) and the version move on every real write
+            update_fields = list(update_fields)
+            update_fields += [name for name in self._write_stamp_fields() if name not in update_fields]
+            self._bump_version()
+        elif updating and update_fields is None:
+            self._bump_version()  # Untracked instance: full save
+        if updating and update_fields is not None:
+            kwargs['update_fields'] = update_fields
+
+        super().save(*args, **kwargs)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self._snapshot()
+        elif update_fields:
+            self._snapshot([self._meta.get_field(name) for name in update_fields])
+        if updating and update_fields != []:
+            self._expire_version()
+
+    def touch(self):
+        """
+        Records a change to rows this one renders (e.g. nested children) with a single
+        UPDATE of the version and auto_now columns; nothing else is written.
+        """
+        now = timezone.now()
+        values = {}
+        for name in self._write_stamp_fields():
+            if name == self.version_field:
+                values[name] = F(name) + 1
+            else:
+                values[name] = now
+                setattr(self, self._meta.get_field(name).attname, now)
+        if not values:
+            return
+        type(self)._base_manager.filter(pk=self.pk).update(**values)
+        self._snapshot([self._meta.get_field(name) for name in values if name != self.version_field])
+        self._expire_version()
+        row_touched.send(sender=type(self), instance=self)
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None:
+            self._snapshot()
+        else:
+            self._snapshot([self._meta.get_field(name) for name in fields])
@@ -1,3 +1,17 @@
 from django.db import models
 
-# Create your models here.
+
+class IdSequence(models.Model):
+    """
+    One counter row per business-ID prefix (e.g. 'SPK', 'EMP25').
+    Only touched through core.id_allocator, which increments it atomically.
+    """
+    prefix = models.CharField(max_length=20, primary_key=True)
+    last_value = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "ID Sequence"
+        verbose_name_plural = "ID Sequences"
+
+    def __str__(self):
+        return f"{self.prefix}: {self.last_value}"
@@ -0,0 +1,154 @@
+# core/money.py
+"""
+Money stored as integer paise.
+
+PaiseField keeps amounts in a BIGINT column (Decimal('1234.50') is stored as
+123450), while the Python value stays a 2-place Decimal, so views, forms and
+serializers keep working in rupees and the API still shows "1234.50". Sums and
+comparisons in SQL are integer arithmetic; paise('field') reads the raw integers
+for array math and reports without creating a Decimal per value:
+
+    totals = np.fromiter(EMISchedule.objects.values_list(paise('emiTotalMonth'), flat=True), dtype=np.int64)
+
+ModelSerializers map PaiseField to MoneyField (registered in CoreConfig.ready()).
+Existing DecimalField columns move over with AlterFieldToPaise, which scales the
+stored values instead of truncating them:
+
+    AlterFieldToPaise(model_name='cashflow', name='income_amount', field=PaiseField(max_digits=10))
+
+Mixing a PaiseField with a DecimalField column in one SQL expression compares
+paise with rupees; convert related columns together.
+"""
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django import forms
+from django.core import validators
+from django.core.exceptions import ValidationError
+from django.db import connection, migrations, models
+from django.db.models import ExpressionWrapper, F
+from django.utils.functional import cached_property
+from rest_framework import serializers
+
+_PAISE_PER_RUPEE = Decimal('100')
+_ONE = Decimal('1')
+
+
+def to_paise(amount):
+    """ Integer paise of an amount in rupees (Decimal, str, int or float), rounded half up. None stays None. """
+    if amount is None:
+        return None
+    return int((Decimal(str(amount)) * _PAISE_PER_RUPEE).quantize(_ONE, rounding=ROUND_HALF_UP))
+
+
+def from_paise(value):
+    """ 2-place Decimal rupees of an integer paise value (int, or the numeric of a SQL sum). None stays None. """
+    if value is None:
+        return None
+    return Decimal(int(value)).scaleb(-2)
+
+
+def paise(field_name):
+    """ A PaiseField's raw integer paise, for values() / aggregates that skip the Decimal conversion. """
+    return ExpressionWrapper(F(field_name), output_field=models.BigIntegerField())
+
+
+class PaiseField(models.BigIntegerField):
+    """
+    Amount in rupees stored as integer paise, see the module docstring. `max_digits`
+    bounds values the way DecimalField(max_digits, decimal_places=2) did.
+    """
+    description = "Amount stored as integer paise"
+    default_error_messages = {
+        'invalid': '“%(value)s” value must be a decimal number.',
+    }
+
+    def __init__(self, *args, max_digits=None, **kwargs):
+        self.max_digits = max_digits
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.max_digits is not None:
+            kwargs['max_digits'] = self.max_digits
+        return name, path, args, kwargs
+
+    @cached_property
+    def validators(self):
+        # IntegerField's range checks are in paise; values here are rupees
+        lowest, highest = connection.ops.integer_field_range(self.get_internal_type())
+        if self.max_digits is not None:
+            bound = 10 ** self.max_digits - 1
+            lowest = -bound if lowest is None else max(lowest, -bound)
+            highest = bound if highest is None else min(highest, bound)
+        validators_ = [*self.default_validators, *self._validators]
+        if lowest is not None:
+            validators_.append(validators.MinValueValidator(from_paise(lowest)))
+        if highest is not None:
+            validators_.append(validators.MaxValueValidator(from_paise(highest)))
+        return validators_
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Decimal):
+            return value
+        try:
+            return Decimal(str(value))
+        except (InvalidOperation, ValueError):
+            raise ValidationError(self.error_messages['invalid'], code='invalid', params={'value': value})
+
+    def from_db_value(self, value, expression, connection):
+        return from_paise(value)
+
+    def get_prep_value(self, value):
+        value = models.Field.get_prep_value(self, value)
+        try:
+            return to_paise(value)
+        except (InvalidOperation, TypeError, ValueError) as e:
+            raise e.__class__(f"Field '{self.name}' expected an amount but got {value!r}.") from e
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(self, **{
+            'form_class': forms.DecimalField, 'max_digits': self.max_digits, 'decimal_places': 2, **kwargs,
+        })
+
+
+class MoneyField(serializers.DecimalField):
+    """ A PaiseField in the API: two-decimal rupees, e.g. "1234.50". """
+
+    def __init__(self, max_digits=None, decimal_places=2, **kwargs):
+        super().__init__(max_digits, decimal_places, **kwargs)
+
+
+class AlterFieldToPaise(migrations.AlterField):
+    """
+    AlterField between a 2-place DecimalField and a PaiseField (either way) that
+    converts the stored amounts, where a plain AlterField would cast 1234.50 to 1235.
+    Only the column type changes; keep the other options of the field as they were.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        to_model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, to_model):
+            return
+        from_model = from_state.apps.get_model(app_label, self.model_name)
+        from_field = from_model._meta.get_field(self.name)
+        to_field = to_model._meta.get_field(self.name)
+        into_paise = isinstance(to_field, PaiseField)
+        table = schema_editor.quote_name(to_model._meta.db_table)
+        column = schema_editor.quote_name(to_field.column)
+
+        if schema_editor.connection.vendor == 'postgresql':
+            # One table rewrite that scales while it casts
+            using = f"round({column} * 100)" if into_paise else f"{column} / 100.0"
+            schema_editor.execute(
+                f"ALTER TABLE {table} ALTER COLUMN {column} TYPE {to_field.db_type(schema_editor.connection)} USING {using}"
+            )
+            return
+        # Elsewhere scale on the side that holds the values exactly
+        if into_paise:
+            schema_editor.execute(f"UPDATE {table} SET {column} = {column} * 100")
+        schema_editor.alter_field(from_model, from_field, to_field)
+        if not into_paise:
+            schema_editor.execute(f"UPDATE {table} SET {column} = {column} / 100.0")
+
+    def describe(self):
+        return f"Convert {self.model_name}.{self.name} to integer paise"
@@ -0,0 +1,215 @@
+# core/pagination.py
+"""
+Keyset (cursor) pagination for every list endpoint.
+
+Pages are addressed by the sort-key values of the last row seen instead of an
+OFFSET, so page 50 costs the same as page 1 and rows inserted while a client is
+paging never shift or duplicate results. The keys are the queryset's own ordering
+(view.get_queryset().order_by(...), an OrderingFilter choice or Meta.ordering)
+with the primary key appended as a tiebreaker, so every position is unique.
+Each list ordering is backed by a matching (ordering, id) index.
+
+Response shape: {"next": <url|null>, "previous": <url|null>, "results": [...]}.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+    # Used only when neither the queryset nor the model defines an ordering
+    default_ordering = ('-pk',)
+
+    @property
+    def page_size(self):
+        return api_settings.PAGE_SIZE or 50
+
+    @property
+    def max_page_size(self):
+        return getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.base_url = request.build_absolute_uri()
+
+        values, self.reverse = self.decode_cursor(request)
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [_flip(key) for key in ordering]
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(_after_position(queryset.model, ordering, values))
+
+        # One extra row tells us whether there is another page, without a COUNT
+        rows = list(queryset[:self.limit + 1])
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = values is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, queryset):
+        query = queryset.query
+        ordering = list(query.order_by) or (list(query.get_meta().ordering) if query.default_ordering else [])
+        if not ordering:
+            ordering = list(self.default_ordering)
+        if not all(isinstance(key, str) and key != '?' for key in ordering):
+            raise ValueError(f"Keyset pagination needs field-name ordering, got {ordering!r}.")
+
+        pk_name = queryset.model._meta.pk.name
+        ordering = [key.replace('pk', pk_name) if key.lstrip('-') == 'pk' else key for key in ordering]
+        if not any(key.lstrip('-') == pk_name for key in ordering):
+            # Stable tiebreaker, in the direction of the last key so the index covers it
+            ordering.append(f"-{pk_name}" if ordering[-1].startswith('-') else pk_name)
+        return ordering
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            values, reverse = payload['v'], bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def encode_cursor(self, row, reverse):
+        payload = {'v': [_row_value(row, key.lstrip('-')) for key in self.ordering]}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, cls=DjangoJSONEncoder).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+def _flip(key):
+    return key[1:] if key.startswith('-') else f"-{key}"
+
+
+def _row_value(row, path):
+    if isinstance(row, dict):  # .values() querysets
+        return row[path]
+    value = row
+    for part in path.split('__'):
+        if value is None:
+            break
+        value = getattr(value, part)
+    return value
+
+
+def _is_nullable(model, path):
+    opts = model._meta
+    field = None
+    for part in path.split('__'):
+        try:
+            field = opts.get_field(part)
+        except FieldDoesNotExist:
+            return True  # Annotation or alias; assume the worst
+        if field.null:
+            return True
+        if field.is_relation and field.related_model:
+            opts = field.related_model._meta
+    return field is None or field.null
+
+
+def _strictly_after(model, key, value):
+    """
+    Rows that sort after `value` on a single key. PostgreSQL puts NULLs last for
+    ascending and first for descending order, so NULL handling depends on direction.
+    """
+    path, descending = key.lstrip('-'), key.startswith('-')
+    nullable = _is_nullable(model, path)
+    if value is None:
+        return Q(**{f"{path}__isnull": False}) if descending else Q(pk__in=[])
+    if descending:
+        return Q(**{f"{path}__lt": value})
+    after = Q(**{f"{path}__gt": value})
+    return after | Q(**{f"{path}__isnull": True}) if nullable else after
+
+
+def _equal(key, value):
+    path = key.lstrip('-')
+    return Q(**{f"{path}__isnull": True}) if value is None else Q(**{path: value})
+
+
+def _leading_bound(model, key, value):
+    """
+    k1 >= v1 (k1 <= v1 when descending): implied by the full condition, but unlike
+    the OR chain it gives the planner a range on the leading index column to start at.
+    """
+    path, descending = key.lstrip('-'), key.startswith('-')
+    if value is None:
+        return Q() if descending else Q(**{f"{path}__isnull": True})
+    bound = Q(**{f"{path}__lte" if descending else f"{path}__gte": value})
+    return bound | Q(**{f"{path}__isnull": True}) if _is_nullable(model, path) and not descending else bound
+
+
+def _after_position(model, ordering, values):
+    """ k1 >= v1 AND ((k1 > v1) OR (k1 = v1 AND k2 > v2) OR ...) with each comparison in its key's direction. """
+    condition = Q(pk__in=[])
+    prefix = Q()
+    for key, value in zip(ordering, values):
+        condition |= prefix & _strictly_after(model, key, value)
+        prefix &= _equal(key, value)
+    if ordering and values:
+        condition &= _leading_bound(model, ordering[0], values[0])
+    return condition
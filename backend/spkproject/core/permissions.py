@@ -1,18 +1,12 @@
 from rest_framework import permissions
-from django.contrib.auth.models import Group # Import Group if not already
+from .roles import has_group
 
 def _is_in_group(user, group_name):
     """
     Helper function to check if an authenticated user belongs to a specific group.
+    Group names come from core.roles, so they are loaded at most once per request.
     """
-    if user and user.is_authenticated:
-        # Check if the group exists first to avoid errors if it's misspelled or not created
-        try:
-            group = Group.objects.get(name=group_name)
-            return user.groups.filter(name=group.name).exists()
-        except Group.DoesNotExist:
-            return False # Group itself doesn't exist
-    return False
+    return has_group(user, group_name)
 
 class IsSuperUser(permissions.BasePermission):
     """
@@ -0,0 +1,160 @@
+# core/roles.py
+"""
+Role resolution shared by core.permissions and EmployeeDetails.role.
+
+A user's group names are read from the database at most once per request (memoized
+on the user object attached to the request). With a shared cache (core.cache.is_shared)
+they are also served across requests from the Django cache. Cache keys carry a
+version that is bumped whenever group membership changes (m2m_changed on
+User.groups), a Group is renamed/deleted or a user's account fields change, so
+stale entries are never read; they simply expire. The same version is stamped
+into access tokens by core.authentication.
+
+A per-process cache (LocMemCache) would only see the bumps made by its own
+process, so without a shared cache nothing is kept beyond the request.
+"""
+import logging
+import time
+
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import is_shared
+
+logger = logging.getLogger(__name__)
+
+ROLE_ADMIN = 'Admin'
+ROLE_MANAGER = 'Manager'
+ROLE_STAFF = 'Staff'
+ROLE_UNKNOWN = 'Unknown'
+ROLE_HIERARCHY = (ROLE_ADMIN, ROLE_MANAGER, ROLE_STAFF)  # Highest first
+
+ROLE_CACHE_TIMEOUT = 60 * 60  # Safety net only; invalidation is by version bump
+
+_GLOBAL_VERSION_KEY = 'roles:version'
+_USER_VERSION_KEY = 'roles:version:user:{pk}'
+_MEMO_ATTR = '_role_group_names'
+
+
+def _new_version():
+    # Time based, so a version lost from the cache is never handed out again
+    return time.time_ns()
+
+
+def _get_versions(user_pk):
+    user_key = _USER_VERSION_KEY.format(pk=user_pk)
+    versions = cache.get_many([_GLOBAL_VERSION_KEY, user_key])
+    for key in (_GLOBAL_VERSION_KEY, user_key):
+        if key not in versions:
+            cache.add(key, _new_version(), None)
+            versions[key] = cache.get(key)
+    return versions[_GLOBAL_VERSION_KEY], versions[user_key]
+
+
+def get_permissions_version(user_pk):
+    """
+    Opaque string that changes whenever this user's group membership (or the account
+    fields embedded in their access tokens) may have changed.
+    """
+    global_version, user_version = _get_versions(user_pk)
+    return f"{global_version}.{user_version}"
+
+
+def _group_names_cache_key(user_pk):
+    return f"roles:groups:{user_pk}:{get_permissions_version(user_pk)}"
+
+
+def _load_group_names(user_pk):
+    return frozenset(Group.objects.filter(user=user_pk).values_list('name', flat=True))
+
+
+def get_group_names(user):
+    """ frozenset of the user's group names (empty for anonymous users). """
+    if not user or not user.is_authenticated or user.pk is None:
+        return frozenset()
+    memo = getattr(user, _MEMO_ATTR, None)
+    if memo is not None:
+        return memo
+
+    if is_shared():
+        cache_key = _group_names_cache_key(user.pk)
+        group_names = cache.get(cache_key)
+        if group_names is None:
+            group_names = _load_group_names(user.pk)
+            cache.set(cache_key, group_names, ROLE_CACHE_TIMEOUT)
+    else:
+        group_names = _load_group_names(user.pk)
+    setattr(user, _MEMO_ATTR, group_names)
+    return group_names
+
+
+def remember_group_names(user, group_names):
+    """ Seeds the per-request memo, e.g. from token claims that are known to be current. """
+    setattr(user, _MEMO_ATTR, frozenset(group_names))
+
+
+def has_group(user, group_name):
+    return group_name in get_group_names(user)
+
+
+def resolve_role(user):
+    """ 'Admin', 'Manager', 'Staff' or 'Unknown' (superusers are always Admin). """
+    if not user or not user.is_authenticated:
+        return ROLE_UNKNOWN
+    if user.is_superuser:
+        return ROLE_ADMIN
+    group_names = get_group_names(user)
+    for role in ROLE_HIERARCHY:
+        if role in group_names:
+            return role
+    return ROLE_UNKNOWN
+
+
+def invalidate_user_roles(user_pks):
+    """ Bumps the role cache version of the given users. """
+    cache.set_many({_USER_VERSION_KEY.format(pk=pk): _new_version() for pk in user_pks}, None)
+
+
+def invalidate_all_roles():
+    cache.set(_GLOBAL_VERSION_KEY, _new_version(), None)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def _user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        # user.groups.add/remove/clear(...)
+        instance.__dict__.pop(_MEMO_ATTR, None)
+        invalidate_user_roles([instance.pk])
+    elif pk_set:
+        # group.user_set.add/remove(...)
+        invalidate_user_roles(pk_set)
+    else:
+        # group.user_set.clear(): members are no longer known
+        invalidate_all_roles()
+    logger.debug(f"Role cache invalidated after groups {action} on {instance!r}.")
+
+
+# User fields that are copied into access tokens (see core.authentication)
+TOKEN_USER_FIELDS = frozenset([
+    'username', 'email', 'first_name', 'last_name', 'is_staff', 'is_superuser', 'is_active', 'password',
+])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _user_changed(sender, instance, update_fields=None, **kwargs):
+    # last_login-only saves (every token obtain) must not invalidate the tokens just issued
+    if update_fields is not None and not TOKEN_USER_FIELDS.intersection(update_fields):
+        return
+    invalidate_user_roles([instance.pk])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def _group_changed(sender, instance, **kwargs):
+    # A renamed or deleted group changes the names every member resolves to
+    invalidate_all_roles()
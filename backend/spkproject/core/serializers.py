@@ -0,0 +1,52 @@
+# core/serializers.py
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .roles import get_group_names, get_permissions_version, resolve_role
+
+# Claims read back by core.authentication.ClaimsJWTAuthentication
+USER_CLAIM_FIELDS = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'is_superuser')
+ROLE_CLAIM = 'role'
+GROUPS_CLAIM = 'groups'
+EMPLOYEE_ID_CLAIM = 'employee_id'
+PERMISSIONS_VERSION_CLAIM = 'perms_version'
+
+
+def add_user_claims(token, user):
+    """ Stamps the user's account fields, role, groups and employee_id onto a token. """
+    for field_name in USER_CLAIM_FIELDS:
+        token[field_name] = getattr(user, field_name)
+    token[ROLE_CLAIM] = resolve_role(user)
+    token[GROUPS_CLAIM] = sorted(get_group_names(user))
+    profile = getattr(user, 'employee_details_profile', None) # Reverse one-to-one; None if missing
+    token[EMPLOYEE_ID_CLAIM] = profile.employee_id if profile else None
+    token[PERMISSIONS_VERSION_CLAIM] = get_permissions_version(user.pk)
+    return token
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """ Same as the stock pair serializer; the refresh (and so the access) token carries user claims. """
+
+    @classmethod
+    def get_token(cls, user):
+        return add_user_claims(super().get_token(user), user)
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """ Re-reads the user when minting an access token, so refreshed tokens carry current claims. """
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        user = get_user_model().objects.filter(
+            **{api_settings.USER_ID_FIELD: self.payload.get(api_settings.USER_ID_CLAIM)}
+        ).select_related('employee_details_profile').first()
+        if user is not None:
+            add_user_claims(access, user)
+        return access
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = ClaimsRefreshToken
@@ -0,0 +1,152 @@
+# core/softdelete.py
+"""
+Soft delete shared by Applicant, PropertyDetails, Cashflow and EmployeeDetails.
+
+A deleted row stays in its table with is_deleted=True and the time it was deleted.
+Live-row lists and lookups are backed by partial indexes over the live rows only
+(live_index), so they keep their size and their plans however many deleted rows
+pile up.
+
+Deleting or restoring is set-based: queryset.bulk_soft_delete() / bulk_restore()
+run one UPDATE for the rows and one per child relation listed in the model's
+soft_delete_cascade, whatever the number of rows, all in one transaction (the
+caller's, if there is one). Children deleted along with their
+parent get the parent's deleted_at, so restoring the parent brings back exactly
+those, not the ones that had been deleted on their own before.
+
+Usage:
+
+    class Applicant(FieldTrackerMixin, SoftDeleteModel):
+        soft_delete_cascade = ('properties',)
+        objects = SoftDeleteManager()  # Live rows; all_objects has every row
+"""
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.dispatch import Signal
+from django.utils import timezone
+
+LIVE = Q(is_deleted=False)
+
+# Sent with `deleted` (True/False) when bulk_soft_delete() / bulk_restore() changed
+# rows of `sender` with a queryset UPDATE (no save() signals); caches listen to it.
+rows_soft_deleted = Signal()
+
+
+def live_index(*fields, name, condition=LIVE):
+    """ Partial index over the live rows, for Meta.indexes. """
+    return models.Index(fields=list(fields), name=name, condition=condition)
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+
+    def active(self):
+        return self.filter(LIVE)
+
+    def deleted(self):
+        return self.filter(is_deleted=True)
+
+    def soft_delete_values(self, deleted_at):
+        """ Columns written on soft delete; querysets of models with more state extend it. """
+        return {'is_deleted': True, 'deleted_at': deleted_at}
+
+    def restore_values(self):
+        return {'is_deleted': False, 'deleted_at': None}
+
+    def _stamp_values(self, now):
+        # What FieldTrackerMixin.save() would move: auto_now columns and the version
+        values = {field.name: now for field in self.model._meta.concrete_fields if getattr(field, 'auto_now', False)}
+        version_field = getattr(self.model, 'version_field', None)
+        if version_field:
+            values[version_field] = F(version_field) + 1
+        return values
+
+    def _children(self, relation):
+        fk = relation.field
+        return relation.related_model.all_objects.using(self.db).filter(
+            **{f"{fk.name}__in": self.values(fk.target_field.attname)}
+        )
+
+    def before_soft_delete(self, deleted_at):
+        """ Runs before the rows of this queryset are marked deleted: cascades to the children. """
+        for relation in self.model.soft_delete_relations():
+            self._children(relation)._soft_delete(deleted_at)
+
+    def before_restore(self):
+        """ Runs before the rows of this queryset are restored: restores the children deleted with them. """
+        for relation in self.model.soft_delete_relations():
+            fk_name = relation.field.name
+            self._children(relation).filter(deleted_at=F(f"{fk_name}__deleted_at"))._restore()
+
+    def _soft_delete(self, deleted_at):
+        targets = self.filter(LIVE)
+        targets.before_soft_delete(deleted_at)
+        count = targets.update(**self.soft_delete_values(deleted_at), **self._stamp_values(deleted_at))
+        if count:
+            rows_soft_deleted.send(sender=self.model, deleted=True)
+        return count
+
+    def _restore(self):
+        targets = self.filter(is_deleted=True)
+        targets.before_restore()
+        count = targets.update(**self.restore_values(), **self._stamp_values(timezone.now()))
+        if count:
+            rows_soft_deleted.send(sender=self.model, deleted=False)
+        return count
+
+    def bulk_soft_delete(self, deleted_at=None):
+        """ Soft-deletes the live rows of this queryset and their children. Returns the number of rows deleted. """
+        with transaction.atomic(using=self.db, savepoint=False):
+            return self._soft_delete(deleted_at or timezone.now())
+
+    def bulk_restore(self):
+        """ Restores the deleted rows of this queryset and their children. Returns the number of rows restored. """
+        with transaction.atomic(using=self.db, savepoint=False):
+            return self._restore()
+
+
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """ Live rows only. """
+
+    def get_queryset(self):
+        return super().get_queryset().active()
+
+
+class SoftDeleteModel(models.Model):
+    """
+    Abstract base for soft-deletable models. Adds is_deleted / deleted_at and an
+    `all_objects` manager over every row; models pick their own default manager.
+    soft_delete_cascade names the reverse relations (related_name) whose rows are
+    soft-deleted and restored along with this one.
+    """
+    is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    soft_delete_cascade = ()
+
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def soft_delete_relations(cls):
+        return [cls._meta.get_field(name) for name in cls.soft_delete_cascade]
+
+    def _as_queryset(self):
+        return type(self).all_objects.using(self._state.db).filter(pk=self.pk)
+
+    def soft_delete(self, update_fields=()):
+        """ Marks the row (and its cascaded children) deleted; `update_fields` are saved along with it. """
+        with transaction.atomic(using=self._state.db):
+            if not self.is_deleted:
+                self.is_deleted, self.deleted_at = True, timezone.now()
+                self._as_queryset().before_soft_delete(self.deleted_at)
+            self.save(update_fields=['is_deleted', 'deleted_at', *update_fields])
+
+    def restore(self, update_fields=()):
+        """ Marks the row (and the children deleted with it) live again. """
+        with transaction.atomic(using=self._state.db):
+            if self.is_deleted:
+                self._as_queryset().before_restore()
+                self.is_deleted, self.deleted_at = False, None
+            self.save(update_fields=['is_deleted', 'deleted_at', *update_fields])
@@ -1,3 +1,278 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import date, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from applicants.models import Applicant
+
+from .authentication import ClaimsJWTAuthentication
+from .cache import is_shared
+from .id_allocator import allocate_id, allocate_ids
+from .models import IdSequence
+from .pagination import _after_position
+from .roles import get_group_names, get_permissions_version, resolve_role
+
+# A cache every process sees, as Redis is in production (LocMemCache, the default, is per process)
+SHARED_CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.path.join(tempfile.gettempdir(), 'spk-test-shared-cache'),
+}}
+
+
+class IdAllocatorTests(TestCase):
+    """ core.id_allocator: counter seeding and block allocation. """
+
+    def test_seeds_once_then_allocates_blocks(self):
+        seed = mock.Mock(return_value=41)
+        self.assertEqual(allocate_ids('TST', 3, seed=seed), range(42, 45))
+        self.assertEqual(allocate_id('TST', seed=seed), 45)
+        seed.assert_called_once_with() # Later calls use the counter row
+
+        # A block is one UPDATE ... RETURNING, whatever its size
+        with self.assertNumQueries(3): # Plus the savepoint and its release
+            self.assertEqual(allocate_ids('TST', 500), range(46, 546))
+        self.assertEqual(IdSequence.objects.get(prefix='TST').last_value, 545)
+
+    def test_unseeded_prefix_starts_at_one(self):
+        self.assertEqual(allocate_id('NEW'), 1)
+        self.assertEqual(allocate_ids('EMPTY', 2, seed=lambda: None), range(1, 3))
+        with self.assertRaises(ValueError):
+            allocate_ids('NEW', 0)
+
+
+class FieldTrackerMixinTests(TestCase):
+    """ core.mixins.FieldTrackerMixin, on Applicant (version_field plus an auto_now updated_at). """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pk = Applicant.objects.create(
+            first_name='Tracked', last_name='Row', email='tracked@example.com', phone='9200000000',
+        ).pk
+
+    def test_save_writes_only_dirty_fields_and_stamps(self):
+        applicant = Applicant.objects.get(pk=self.pk)
+        loaded_at = applicant.updated_at
+        applicant.is_approved = True
+        self.assertTrue(applicant.has_changed('is_approved'))
+        self.assertFalse(applicant.get_original('is_approved'))
+        self.assertEqual(applicant.get_dirty_fields(), ['is_approved'])
+
+        with CaptureQueriesContext(connection) as queries:
+            applicant.save()
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]['sql']
+        self.assertIn('"is_approved"', sql)
+        self.assertIn('"updated_at"', sql) # auto_now columns move with every real write
+        self.assertIn('"version" = ("applicants_applicant"."version" + 1)', sql)
+        self.assertNotIn('"first_name"', sql)
+        self.assertFalse(applicant.has_changed('is_approved')) # The saved value is the new original
+        self.assertGreater(applicant.updated_at, loaded_at)
+        self.assertEqual(applicant.version, 2) # Read back on first access
+
+    def test_no_op_save_is_skipped(self):
+        applicant = Applicant.objects.get(pk=self.pk)
+        applicant.first_name = 'Tracked'
+        with self.assertNumQueries(0):
+            applicant.save()
+        self.assertEqual(Applicant.objects.get(pk=self.pk).version, 1)
+
+    def test_concurrent_saves_both_bump_the_version(self):
+        first = Applicant.objects.get(pk=self.pk)
+        second = Applicant.objects.get(pk=self.pk)
+        first.first_name = 'First'
+        second.last_name = 'Second'
+        first.save()
+        second.save()
+
+        # Both writes count and neither overwrote the other's column
+        self.assertEqual(second.version, 3)
+        self.assertEqual(first.version, 3)
+        stored = Applicant.objects.get(pk=self.pk)
+        self.assertEqual((stored.first_name, stored.last_name, stored.version), ('First', 'Second', 3))
+
+        stored.touch()
+        self.assertEqual(stored.version, 4)
+
+
+class RoleCacheTests(TestCase):
+    """ core.roles: per-request memo, the shared cache behind it and its invalidation signals. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager_group = Group.objects.create(name='Manager')
+        cls.staff_group = Group.objects.create(name='Staff')
+        cls.user = User.objects.create_user('role-user', 'role-user@example.com', 'pass')
+        cls.user.groups.set([cls.staff_group])
+
+    def setUp(self):
+        cache.clear()
+
+    def _request_user(self):
+        """ A fresh User, as each request loads its own. """
+        return User.objects.get(pk=self.user.pk)
+
+    def test_one_group_query_per_request_without_shared_cache(self):
+        self.assertFalse(is_shared())
+        user = self._request_user()
+        with self.assertNumQueries(1):
+            self.assertEqual(resolve_role(user), 'Staff')
+            self.assertEqual(get_group_names(user), {'Staff'})
+        # Nothing outlives the request: another worker may change the groups
+        later_user = self._request_user()
+        with self.assertNumQueries(1):
+            get_group_names(later_user)
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_shared_cache_serves_later_requests(self):
+        cache.clear()
+        self.assertTrue(is_shared())
+        user, later_user = self._request_user(), self._request_user()
+        with self.assertNumQueries(1):
+            get_group_names(user)
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_role(later_user), 'Staff')
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_signals_invalidate_shared_entries(self):
+        cache.clear()
+        user = self.user
+        version = get_permissions_version(user.pk)
+        get_group_names(self._request_user())
+
+        def role_after(change):
+            nonlocal version
+            change()
+            new_version = get_permissions_version(user.pk)
+            self.assertNotEqual(new_version, version, change)
+            version = new_version
+            return resolve_role(self._request_user())
+
+        self.assertEqual(role_after(lambda: user.groups.add(self.manager_group)), 'Manager')
+        self.assertEqual(role_after(lambda: self.manager_group.user_set.remove(user)), 'Staff')
+        self.assertEqual(role_after(lambda: self.staff_group.user_set.clear()), 'Unknown')
+        self.assertEqual(role_after(lambda: user.groups.add(self.staff_group)), 'Staff')
+
+        def rename_group():
+            self.staff_group.name = 'Manager-renamed'
+            self.staff_group.save()
+        self.assertEqual(role_after(rename_group), 'Unknown')
+
+        def change_email():
+            user.email = 'role-user-2@example.com'
+            user.save()
+        role_after(change_email)
+
+        # A login only writes last_login; tokens issued with the current version stay valid
+        user.save(update_fields=['last_login'])
+        self.assertEqual(get_permissions_version(user.pk), version)
+
+
+class ClaimsAuthenticationTests(TestCase):
+    """ core.authentication.ClaimsJWTAuthentication and the claims stamped by core.serializers. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff_group = Group.objects.create(name='Staff')
+        cls.manager_group = Group.objects.create(name='Manager')
+        cls.user = User.objects.create_user('claims-user', 'claims-user@example.com', 'pass', first_name='Claims')
+        cls.user.groups.set([cls.staff_group])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.auth = ClaimsJWTAuthentication()
+
+    def _obtain(self):
+        response = self.client.post('/api/token/', {'username': 'claims-user', 'password': 'pass'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def _authenticate(self, access):
+        return self.auth.get_user(self.auth.get_validated_token(access))
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_current_claims_need_no_queries(self):
+        cache.clear()
+        tokens = self._obtain()
+        with self.assertNumQueries(0):
+            user = self._authenticate(tokens['access'])
+            self.assertEqual((user.pk, user.username, user.first_name), (self.user.pk, 'claims-user', 'Claims'))
+            self.assertEqual(resolve_role(user), 'Staff')
+        self.assertEqual(user.date_joined, self.user.date_joined) # Unclaimed fields load on demand
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_stale_claims_fall_back_and_refresh_restamps(self):
+        cache.clear()
+        tokens = self._obtain()
+        self.user.groups.add(self.manager_group)
+
+        # The version moved: the database decides, including the new role
+        with self.assertNumQueries(2): # User, then groups
+            user = self._authenticate(tokens['access'])
+            self.assertEqual(resolve_role(user), 'Manager')
+
+        response = self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        access = self.auth.get_validated_token(response.data['access'])
+        self.assertEqual((access['role'], access['groups']), ('Manager', ['Manager', 'Staff']))
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_role(self.auth.get_user(access)), 'Manager')
+
+        # Deactivation bumps the version, so the claims cannot vouch for an inactive user
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate(response.data['access'])
+
+    def test_claims_ignored_without_shared_cache(self):
+        self.assertFalse(is_shared())
+        tokens = self._obtain()
+        # Another worker may have deactivated the user: always read the row
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate(tokens['access'])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Plans are checked on PostgreSQL')
+class KeysetPlanTests(TestCase):
+    """ Deep keyset pages start with an index range on the leading sort key, not a filtered scan. """
+
+    ORDERING = ['-loanreg_date', '-id']
+
+    @classmethod
+    def setUpTestData(cls):
+        applicants = Applicant.objects.bulk_create([
+            Applicant(first_name=f'Page{i}', last_name='Deep', email=f'page{i}@example.com', phone=f'93000{i:05d}')
+            for i in range(300)
+        ])
+        # loanreg_date is auto_now_add; spread the rows over days with ties within each day
+        for i, applicant in enumerate(applicants):
+            applicant.loanreg_date = date(2024, 1, 1) + timedelta(days=i // 3)
+        Applicant.objects.bulk_update(applicants, ['loanreg_date'])
+
+    def _page_after(self, position):
+        values = [position.loanreg_date, position.pk]
+        return Applicant.objects.order_by(*self.ORDERING).filter(_after_position(Applicant, self.ORDERING, values))[:20]
+
+    def test_deep_page_uses_index_range(self):
+        ordered = list(Applicant.objects.order_by(*self.ORDERING))
+        position = ordered[250]
+        self.assertEqual(list(self._page_after(position)), ordered[251:271])
+
+        with connection.cursor() as cursor:
+            # Tiny tables would otherwise be scanned whole or bitmap-scanned and sorted
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_bitmapscan = off')
+            cursor.execute('ANALYZE applicants_applicant')
+        plan = self._page_after(position).explain()
+        self.assertIn('applicants_live_regdate_idx', plan)
+        self.assertRegex(plan, r'Index Cond: \(+"?loanreg_date"? <=')
+        self.assertNotIn('Sort', plan) # Read in index order, stopping after one page
@@ -1,3 +1,13 @@
-from django.shortcuts import render
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
-# Create your views here.
+from core import cache
+from core.permissions import IsAdminUser
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def cache_stats_view(request):
+    """ Hit/miss counters of the response caches, for the process that serves this request. """
+    return Response(cache.stats())
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0006_employeeidproof'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employeedetails',
+            index=models.Index(fields=['-created_at', '-id'], name='employees_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 21:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0007_employeedetails_employees_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employeedetails',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-18 21:15
+
+import core.fields
+from core.fields import backfill_phone_numbers
+from django.db import migrations
+
+
+def normalize_phone_numbers(apps, schema_editor):
+    backfill_phone_numbers(apps.get_model('employees', 'EmployeeDetails'), 'phone_number')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0008_employeedetails_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='employeedetails',
+            name='phone_number',
+            field=core.fields.PhoneNumberField(blank=True, max_length=15),
+        ),
+        migrations.RunPython(normalize_phone_numbers, migrations.RunPython.noop),
+    ]
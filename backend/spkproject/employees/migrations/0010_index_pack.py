@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-18 21:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0009_normalize_phone'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='employeedetails',
+            name='employees_e_user_id_23cee9_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='employeedetails',
+            name='employees_e_is_dele_65d689_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='employeedetails',
+            name='employees_e_employe_c5ff0c_idx',
+        ),
+        migrations.AddIndex(
+            model_name='employeedetails',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('leaving_date__isnull', True)), fields=['-created_at', '-id'], name='employees_active_created_idx'),
+        ),
+    ]
@@ -6,15 +6,47 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 import logging
 
-from django.db import transaction
+from django.db.models import Max, Q, Value
+from django.db.models.functions import Cast, Coalesce, Substr
+
+from core.fields import PhoneNumberField
+from core.id_allocator import allocate_id, allocate_ids
+from core.mixins import FieldTrackerMixin
+from core.roles import invalidate_user_roles, resolve_role
+from core.softdelete import SoftDeleteManager, SoftDeleteModel, SoftDeleteQuerySet, live_index
 logger = logging.getLogger(__name__)
 
-# --- Manager for EmployeeDetails if you need soft delete for these profiles ---
-class ActiveEmployeeDetailsManager(models.Manager): # Renamed manager
-    def get_queryset(self):
-        return super().get_queryset().filter(is_deleted=False, leaving_date__isnull=True)
+ACTIVE_EMPLOYEE = Q(is_deleted=False, leaving_date__isnull=True)
 
-class EmployeeDetails(models.Model): 
+
+class EmployeeDetailsQuerySet(SoftDeleteQuerySet):
+    """ Soft delete of a profile also sets its leaving date and deactivates the login account. """
+
+    def active(self):
+        return self.filter(ACTIVE_EMPLOYEE)
+
+    def soft_delete_values(self, deleted_at):
+        return {**super().soft_delete_values(deleted_at), 'leaving_date': Coalesce('leaving_date', Value(deleted_at.date()))}
+
+    def restore_values(self):
+        return {**super().restore_values(), 'leaving_date': None}
+
+    def before_soft_delete(self, deleted_at):
+        super().before_soft_delete(deleted_at)
+        self._set_users_active(False)
+
+    def before_restore(self):
+        super().before_restore()
+        self._set_users_active(True)
+
+    def _set_users_active(self, is_active):
+        user_pks = [pk for pk in self.values_list('user_id', flat=True) if pk is not None]
+        User.objects.filter(pk__in=user_pks).update(is_active=is_active)
+        # A queryset update sends no post_save: move the permissions version so issued tokens are re-checked
+        invalidate_user_roles(user_pks)
+
+
+class EmployeeDetails(FieldTrackerMixin, SoftDeleteModel): 
     
     user = models.OneToOneField(
         User,
@@ -36,38 +68,63 @@ class EmployeeDetails(models.Model):
     state_province = models.CharField(max_length=100, blank=True, verbose_name="State/Province")
     country = models.CharField(max_length=100, blank=True, verbose_name="Country")
     postal_code = models.CharField(max_length=20, blank=True, verbose_name="Postal Code")
-    phone_number = models.CharField(max_length=15, blank=True)
+    phone_number = PhoneNumberField(max_length=15, blank=True)
     date_of_birth_detail = models.DateField(null=True, blank=True) 
     employee_photo = models.ImageField(upload_to="uploads/images/employee_profiles/", null=True, blank=True)
     
     joining_date = models.DateField(null=True, blank=True, verbose_name="Joining Date")
     leaving_date = models.DateField(null=True, blank=True, verbose_name="Leaving Date")
    
-    # --- Soft delete for EmployeeDetails (optional) ---
-    is_deleted = models.BooleanField(default=False)
-    deleted_at = models.DateTimeField(null=True, blank=True)
+    # is_deleted / deleted_at: see core.softdelete
 
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped on every change to the profile or its ID proofs (ETag source, see core.conditional)
+    version = models.PositiveIntegerField(default=1, editable=False)
+    version_field = 'version'
 
     # Managers
-    objects = models.Manager() 
-    active_objects = ActiveEmployeeDetailsManager() 
+    objects = EmployeeDetailsQuerySet.as_manager()
+    all_objects = EmployeeDetailsQuerySet.as_manager()
+    active_objects = SoftDeleteManager.from_queryset(EmployeeDetailsQuerySet)() # Not deleted and not left
 
     class Meta:
         verbose_name = "Employee Detail" # Singular
         verbose_name_plural = "Employee Details" # Plural
         ordering = ['-created_at']
+        # employee_id and user already have their unique indexes
         indexes = [
-            models.Index(fields=['employee_id']),
-            models.Index(fields=['user']),
-            models.Index(fields=['is_deleted']),
             models.Index(fields=['joining_date']), # Added index
             models.Index(fields=['leaving_date']),
             models.Index(fields=['country', 'state_province', 'city_district']),
+            models.Index(fields=['-created_at', '-id'], name='employees_created_id_idx'), # Keyset pagination
+            # The same for active_objects, the default listing
+            live_index('-created_at', '-id', name='employees_active_created_idx', condition=ACTIVE_EMPLOYEE),
         ]
 
+    @staticmethod
+    def employee_id_prefix(year_yy):
+        return f"EMP{year_yy}"
+
+    @staticmethod
+    def format_employee_id(prefix_with_year, sequence_num):
+        return f"{prefix_with_year}{sequence_num:03d}"
+
+    @classmethod
+    def _max_employee_number(cls, prefix_with_year):
+        """ Highest sequence already issued for a year prefix; only used to seed the ID counter. """
+        return cls.objects.filter(employee_id__regex=rf'^{prefix_with_year}[0-9]+$').annotate(
+            sequence_num=Cast(Substr('employee_id', len(prefix_with_year) + 1), models.BigIntegerField())
+        ).aggregate(Max('sequence_num'))['sequence_num__max']
+
+    @classmethod
+    def allocate_employee_ids(cls, year_yy, count):
+        """ Pre-allocates `count` employee IDs for a year in one statement (bulk onboarding). """
+        prefix_with_year = cls.employee_id_prefix(year_yy)
+        numbers = allocate_ids(prefix_with_year, count, seed=lambda: cls._max_employee_number(prefix_with_year))
+        return [cls.format_employee_id(prefix_with_year, number) for number in numbers]
+
     def save(self, *args, **kwargs):
         is_new = not self.pk # Check if this is a new instance
 
@@ -78,35 +135,10 @@ class EmployeeDetails(models.Model):
 
             # Generate employee_id if it's not already set
             if not self.employee_id:
-                with transaction.atomic():
-                    current_year_yy = self.joining_date.strftime('%y') if self.joining_date else timezone.now().strftime('%y')
-                    prefix_with_year = f"EMP{current_year_yy}"
-
-                    while True:
-                        last_employee_for_year = EmployeeDetails.objects.filter(
-                            employee_id__startswith=prefix_with_year
-                        ).order_by('employee_id').last()
-
-                        next_sequence_num = 1
-                        if last_employee_for_year:
-                            try:
-                                last_sequence_str = last_employee_for_year.employee_id[len(prefix_with_year):]
-                                next_sequence_num = int(last_sequence_str) + 1
-                            except (ValueError, IndexError) as e:
-                                logger.error(
-                                    f"Could not parse sequence from existing employee_id: "
-                                    f"{last_employee_for_year.employee_id}. Error: {e}. Defaulting to 1 for {prefix_with_year}"
-                                )
-                                next_sequence_num = 1
-
-                        new_id_suffix = f"{next_sequence_num:03d}"
-                        generated_employee_id = f"{prefix_with_year}{new_id_suffix}"
-
-                        if not EmployeeDetails.objects.filter(employee_id=generated_employee_id).exists():
-                            self.employee_id = generated_employee_id
-                            break
-                        else:
-                            logger.warning(f"Generated employee_id {generated_employee_id} already exists. Retrying.")
+                current_year_yy = self.joining_date.strftime('%y') if self.joining_date else timezone.now().strftime('%y')
+                prefix_with_year = self.employee_id_prefix(current_year_yy)
+                next_sequence_num = allocate_id(prefix_with_year, seed=lambda: self._max_employee_number(prefix_with_year))
+                self.employee_id = self.format_employee_id(prefix_with_year, next_sequence_num)
         
         
         super().save(*args, **kwargs)
@@ -127,10 +159,7 @@ class EmployeeDetails(models.Model):
     @property
     def role(self):
         if not self.user_id: return 'Unknown' # Handle case where user might not be set yet
-        if self.user.is_superuser or self.user.groups.filter(name='Admin').exists(): return 'Admin'
-        if self.user.groups.filter(name='Manager').exists(): return 'Manager'
-        if self.user.groups.filter(name='Staff').exists(): return 'Staff'
-        return 'Unknown'
+        return resolve_role(self.user) # Cached group lookup, see core.roles
 
     @property
     def is_admin(self): return self.role == 'Admin'
@@ -139,28 +168,26 @@ class EmployeeDetails(models.Model):
     @property
     def is_staff(self): return self.role == 'Staff'
 
-    # Soft delete methods for EmployeeDetails (if needed)
+    # Soft delete of the profile (the login account follows it, see EmployeeDetailsQuerySet)
     def soft_delete_profile(self):
-        self.is_deleted = True
-        self.deleted_at = timezone.now()
         if not self.leaving_date: # If no explicit leaving date set, mark it as today
             self.leaving_date = timezone.now().date()
-
-        if self.user:
-                self.user.is_active = False
-                self.user.save(update_fields=['is_active'])
-                
-        self.save(update_fields=['is_deleted', 'deleted_at', 'leaving_date'])
+        if self.is_deleted: # soft_delete() skips the queryset hooks for an already deleted profile
+            self._as_queryset()._set_users_active(False)
+        self.soft_delete(update_fields=['leaving_date'])
+        self._cache_user_active(False)
 
     def restore_profile(self):
-        self.is_deleted = False
-        self.deleted_at = None
-        self.leaving_date = None 
-
-        if self.user:
-            self.user.is_active = True
-            self.user.save(update_fields=['is_active'])
-        self.save(update_fields=['is_deleted', 'deleted_at'])
+        self.leaving_date = None
+        if not self.is_deleted: # e.g. a live profile whose login was deactivated on its own
+            self._as_queryset()._set_users_active(True)
+        self.restore(update_fields=['leaving_date'])
+        self._cache_user_active(True)
+
+    def _cache_user_active(self, is_active):
+        # The row was updated by the queryset; keep a loaded user in step without another query
+        if EmployeeDetails.user.is_cached(self):
+            self.user.is_active = is_active
 
 # --- Signal to create EmployeeDetails when a User is created ---
 @receiver(post_save, sender=User)
@@ -4,6 +4,7 @@ from rest_framework import serializers
 from django.contrib.auth.models import User, Group
 from django.db import transaction, IntegrityError
 from .models import EmployeeDetails, EmployeeIDProof # Ensure EmployeeIDProof is imported
+from core.roles import get_group_names
 import logging
 from django.utils import timezone # For leaving_date logic if moved here
 
@@ -195,7 +196,7 @@ class EmployeeDetailsViewSerializer(serializers.ModelSerializer):
         )
 
     def get_groups(self, obj):
-        if obj.user: return list(obj.user.groups.values_list('name', flat=True))
+        if obj.user: return sorted(get_group_names(obj.user)) # Shares the role cache with obj.role
         return []
     
     def validate(self, attrs):
@@ -350,6 +351,9 @@ class EmployeeDetailsViewSerializer(serializers.ModelSerializer):
                 EmployeeIDProof.objects.bulk_create(new_documents_to_create)
                 logger.info(f"Created {len(new_documents_to_create)} new ID proof documents for employee {instance.id}.")
 
+            if document_ids_to_delete or new_documents_to_create:
+                instance.touch() # ID proofs are part of the profile's representation (and ETag)
+
             # 5. Handle leaving_date logic
             # Get the value of leaving_date *before* any potential modifications in this update method
             db_instance_before_save = EmployeeDetails.objects.get(pk=instance.pk)
@@ -1,3 +1,94 @@
-from django.test import TestCase
+import os
+import tempfile
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .models import EmployeeDetails
+
+# A cache every process sees, so tokens are checked from their claims (see core.authentication)
+SHARED_CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.path.join(tempfile.gettempdir(), 'spk-test-shared-cache'),
+}}
+PROFILE_URL = '/api/user/profile/'
+
+
+class EmployeeIdTests(TestCase):
+    """ Employee IDs come from the per-year core.id_allocator counter. """
+
+    def _employee_with_id(self, username, employee_id):
+        user = User.objects.create_user(username, f'{username}@example.com', 'pass') # Gets its profile from post_save
+        EmployeeDetails.objects.filter(user=user).update(employee_id=employee_id)
+
+    def test_counter_seeded_from_numeric_maximum(self):
+        # EMP25999 sorts after EMP251000 as text; the seed compares the numbers
+        self._employee_with_id('emp-a', 'EMP25999')
+        self._employee_with_id('emp-b', 'EMP251000')
+        self._employee_with_id('emp-c', 'EMP25OLD') # Not a number, ignored
+        self.assertEqual(EmployeeDetails.allocate_employee_ids('25', 2), ['EMP251001', 'EMP251002'])
+        self.assertEqual(EmployeeDetails.allocate_employee_ids('25', 1), ['EMP251003'])
+        self.assertEqual(EmployeeDetails.allocate_employee_ids('24', 2), ['EMP24001', 'EMP24002']) # Own counter per year
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class EmployeeSoftDeleteTests(TestCase):
+    """ Deleting an employee deactivates the login account and cuts off its issued tokens. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('leaver', 'leaver@example.com', 'pass')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def _bearer_status(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        return self.client.get(PROFILE_URL).status_code
+
+    def _access_token(self):
+        response = self.client.post('/api/token/', {'username': 'leaver', 'password': 'pass'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['access']
+
+    def test_deleted_employee_token_is_rejected(self):
+        access = self._access_token()
+        self.assertEqual(self._bearer_status(access), 200)
+
+        EmployeeDetails.objects.get(user=self.user).soft_delete_profile()
+        self.assertEqual(self._bearer_status(access), 401)
+
+        EmployeeDetails.all_objects.get(user=self.user).restore_profile()
+        self.assertEqual(self._bearer_status(access), 200)
+
+    def _user_updates(self, change):
+        with CaptureQueriesContext(connection) as queries:
+            change()
+        return [query['sql'] for query in queries if query['sql'].startswith('UPDATE "auth_user"')]
+
+    def test_profile_delete_and_restore_update_the_user_once(self):
+        profile = EmployeeDetails.objects.select_related('user').get(user=self.user)
+        self.assertEqual(len(self._user_updates(profile.soft_delete_profile)), 1)
+        self.assertFalse(profile.user.is_active) # The loaded user follows without a reload
+        self.assertEqual(len(self._user_updates(profile.restore_profile)), 1)
+        self.assertTrue(profile.user.is_active)
+        self.assertTrue(User.objects.get(pk=self.user.pk).is_active)
+
+        # A live profile whose login was deactivated on its own is still reactivated by a restore
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(len(self._user_updates(EmployeeDetails.objects.get(user=self.user).restore_profile)), 1)
+        self.assertTrue(User.objects.get(pk=self.user.pk).is_active)
+
+    def test_bulk_delete_rejects_tokens(self):
+        access = self._access_token()
+        self.assertEqual(EmployeeDetails.objects.filter(user=self.user).bulk_soft_delete(), 1)
+        self.assertFalse(User.objects.get(pk=self.user.pk).is_active)
+        self.assertEqual(self._bearer_status(access), 401)
+
+        self.assertEqual(EmployeeDetails.all_objects.filter(user=self.user).bulk_restore(), 1)
+        self.assertEqual(self._bearer_status(access), 200)
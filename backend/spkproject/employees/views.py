@@ -20,6 +20,8 @@ from core.permissions import (
     IsSuperUser,
     _is_in_group
 )
+from core.roles import get_group_names, get_permissions_version
+from core.conditional import ConditionalRetrieveMixin
 from django.db.models import Q 
 import logging
 logger = logging.getLogger(__name__)
@@ -286,7 +288,7 @@ def user_profile_view(request):
     role = 'Unknown'
     employee_id_val = None
     phone_number_val = None
-    groups = list(user.groups.values_list('name', flat=True)) # Get groups early
+    groups = sorted(get_group_names(user)) # Get groups early (cached, see core.roles)
 
     # Try to get profile and its details
     profile_instance = None
@@ -323,7 +325,8 @@ def user_profile_view(request):
     }
     return Response(profile_data, status=status.HTTP_200_OK)
 
-class EmployeeDetailsViewSet(viewsets.ModelViewSet):
+class EmployeeDetailsViewSet(ConditionalRetrieveMixin, viewsets.ModelViewSet):
+    """ retrieve is conditional (ETag / If-None-Match) and writes honour If-Match; see core.conditional. """
     serializer_class = EmployeeDetailsViewSerializer
     # Base permission: User must be authenticated. Specific actions have more granular permissions.
     # permission_classes = [permissions.IsAuthenticated] # Using get_permissions for action-specific
@@ -333,6 +336,10 @@ class EmployeeDetailsViewSet(viewsets.ModelViewSet):
     # Initialize it to something sensible.
     queryset = EmployeeDetails.objects.all().select_related('user').order_by('-created_at')
 
+    def get_etag_parts(self, instance):
+        # username/email/groups come from the User row; its role-cache version moves with them
+        return [instance.pk, instance.version, get_permissions_version(instance.user_id)]
+
     def get_permissions(self):
         """
         Instantiates and returns the list of permissions that this view requires,
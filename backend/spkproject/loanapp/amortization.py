@@ -0,0 +1,193 @@
+# loanapp/amortization.py
+"""
+Server-side EMI schedule engine.
+
+Mirrors the calculation done in the LoanProcess screen (one monthly installment
+per term unit, first EMI on the 5th of the following month, interestRate applied
+per installment) so schedules can be generated on the server for one loan or for
+a whole batch of loans at once.
+
+All money math is done on integer paise arrays with NumPy (the unit the money
+columns are stored in, see core.money), and only the final values are turned
+into Decimal, so rounding is exact and principal always adds up to the loan
+amount.
+"""
+from decimal import Decimal
+
+import numpy as np
+
+from core.money import from_paise, to_paise
+from .models import LoanApplication, EMISchedule
+
+INTEREST_TYPE_DIMINISHING = '1'
+INTEREST_TYPE_FLAT = '2'
+INTEREST_TYPES = (INTEREST_TYPE_DIMINISHING, INTEREST_TYPE_FLAT)
+
+# Same options as the LoanProcess form. The frontend raises one monthly
+# installment per term unit whatever the type, and so do we.
+TERM_TYPES = ('days', 'weeks', 'months', 'years')
+
+EMI_DUE_DAY = 5
+LATE_START_DAY = 28  # Loans starting after the 28th skip one extra month
+
+# Rates enter the integer math in ten-thousandths of a percent (1.5% -> 15000),
+# which keeps the flat-interest product of a max_digits amount within int64
+RATE_SCALE = 10 ** 4
+_RATE_DIVISOR = 100 * RATE_SCALE
+
+
+class ScheduleError(ValueError):
+    """ Raised when a loan does not have enough data to build a schedule. """
+    pass
+
+
+def _from_paise_array(values):
+    """ Converts an int64 paise array into a list of 2-place Decimals. """
+    return [from_paise(v) for v in values]
+
+
+def _divide_half_up(numerator, denominator):
+    """ numerator / denominator rounded half up, for non-negative int64 arrays. """
+    return (2 * numerator + denominator) // (2 * denominator)
+
+
+def _validate_loan_terms(amount, term, term_type, interest_rate, start_date):
+    if amount is None or term is None or interest_rate is None or start_date is None:
+        raise ScheduleError("amount, term, interestRate and startDate are required to build an EMI schedule.")
+    if int(term) <= 0:
+        raise ScheduleError(f"Invalid loan term '{term}'.")
+    if Decimal(str(amount)) <= 0:
+        raise ScheduleError(f"Invalid loan amount '{amount}'.")
+    if float(interest_rate) < 0:
+        raise ScheduleError(f"Invalid interest rate '{interest_rate}'.")
+    if (term_type or '').lower() not in TERM_TYPES:
+        raise ScheduleError(f"Invalid loan term type '{term_type}'.")
+
+
+def compute_schedule_arrays(amounts_paise, terms, rates, start_dates, interest_type=INTEREST_TYPE_DIMINISHING):
+    """
+    Vectorized schedule math for a batch of loans.
+
+    amounts_paise, terms and rates are 1-D sequences (one entry per loan), rates
+    being the percentage applied per installment. Returns a dict of 2-D arrays
+    shaped (loans, longest term); cells past a loan's own term are masked out by
+    the boolean 'mask' array. Money arrays are int64 paise.
+    """
+    if interest_type not in INTEREST_TYPES:
+        raise ScheduleError(f"Invalid interest type '{interest_type}'.")
+
+    amounts = np.asarray(amounts_paise, dtype=np.int64)
+    n = np.asarray(terms, dtype=np.int64)
+    # Integer rates keep interest rounding exact: 0.7% of 25.00 is 17.5 paise, which
+    # float math sees as 17.4999... and would round down
+    rate = np.rint(np.asarray(rates, dtype=np.float64) * RATE_SCALE).astype(np.int64)
+
+    max_term = int(n.max()) if n.size else 0
+    k = np.arange(max_term, dtype=np.int64)[None, :]
+    mask = k < n[:, None]
+    is_last = k == (n[:, None] - 1)
+
+    # Equal principal per installment; the last one absorbs the rounding remainder
+    # so principal always sums to the loan amount exactly.
+    base_principal = amounts // n
+    principal = np.where(mask, base_principal[:, None], 0)
+    principal = np.where(is_last, amounts[:, None] - base_principal[:, None] * (n[:, None] - 1), principal)
+
+    paid_to_date = np.cumsum(principal, axis=1)
+    remaining = np.where(mask, amounts[:, None] - paid_to_date, 0)
+    opening = remaining + principal
+
+    if interest_type == INTEREST_TYPE_DIMINISHING:
+        interest = _divide_half_up(opening * rate[:, None], _RATE_DIVISOR)
+    else:
+        # Flat: total interest of the diminishing plan, spread evenly over the term.
+        total_interest = _divide_half_up(amounts * rate * (n + 1), 2 * _RATE_DIVISOR)
+        base_interest = total_interest // n
+        interest = np.where(mask, base_interest[:, None], 0)
+        interest = np.where(is_last, total_interest[:, None] - base_interest[:, None] * (n[:, None] - 1), interest)
+    interest = np.where(mask, interest, 0)
+
+    # First EMI falls on the 5th of next month (or the month after for late starts).
+    starts = np.asarray(start_dates, dtype='datetime64[D]')
+    start_months = starts.astype('datetime64[M]')
+    start_day = (starts - start_months.astype('datetime64[D]')).astype(np.int64) + 1
+    first_month = start_months + 1 + (start_day > LATE_START_DAY).astype(np.int64)
+    due_dates = (first_month[:, None] + k).astype('datetime64[D]') + (EMI_DUE_DAY - 1)
+
+    return {
+        'mask': mask,
+        'emiTotalMonth': principal + interest,
+        'interest': interest,
+        'principalPaid': principal,
+        'remainingBalance': remaining,
+        'emiStartDate': due_dates,
+    }
+
+
+def build_emi_schedules(loans, interest_type=INTEREST_TYPE_DIMINISHING):
+    """
+    Builds unsaved EMISchedule instances for every loan in `loans`.
+
+    Returns one list of EMISchedule rows per loan, in the order given, ready
+    for bulk_create.
+    Raises ScheduleError if any loan lacks the fields needed for the math.
+    """
+    loans = list(loans)
+    if not loans:
+        return []
+    for loan in loans:
+        _validate_loan_terms(loan.amount, loan.term, loan.termType, loan.interestRate, loan.startDate)
+
+    arrays = compute_schedule_arrays(
+        [to_paise(loan.amount) for loan in loans],
+        [int(loan.term) for loan in loans],
+        [float(loan.interestRate) for loan in loans],
+        [loan.startDate for loan in loans],
+        interest_type=interest_type,
+    )
+
+    schedules = []
+    for row, loan in enumerate(loans):
+        term = int(loan.term)
+        emi_totals = _from_paise_array(arrays['emiTotalMonth'][row, :term])
+        interests = _from_paise_array(arrays['interest'][row, :term])
+        principals = _from_paise_array(arrays['principalPaid'][row, :term])
+        balances = _from_paise_array(arrays['remainingBalance'][row, :term])
+        due_dates = arrays['emiStartDate'][row, :term].tolist()
+
+        schedules.append([
+            EMISchedule(
+                loan_application_id=loan.pk,
+                month=month_index + 1,
+                emiStartDate=due_dates[month_index],
+                emiTotalMonth=emi_totals[month_index],
+                interest=interests[month_index],
+                principalPaid=principals[month_index],
+                remainingBalance=balances[month_index],
+                paymentAmount=Decimal('0.00'),
+                pendingAmount=emi_totals[month_index],
+            )
+            for month_index in range(term)
+        ])
+    return schedules
+
+
+def build_emi_schedule(loan, interest_type=INTEREST_TYPE_DIMINISHING):
+    """ Single-loan convenience wrapper around build_emi_schedules. """
+    return build_emi_schedules([loan], interest_type=interest_type)[0]
+
+
+def regenerate_emi_schedules(loans, interest_type=INTEREST_TYPE_DIMINISHING):
+    """
+    Replaces the stored schedule of every (saved) loan with a freshly computed one.
+    Meant for approvals / re-pricing batches; callers are responsible for wrapping
+    this in a transaction and for skipping loans that already have payments.
+    """
+    loans = [loan for loan in loans if loan.pk is not None]
+    schedules = build_emi_schedules(loans, interest_type=interest_type)
+    old_rows = EMISchedule.objects.filter(loan_application__in=loans)
+    old_rows._raw_delete(old_rows.db) # No per-row signals; the summary refresh moves each loan's version
+    rows = [emi for loan_rows in schedules for emi in loan_rows]
+    EMISchedule.objects.bulk_create(rows, batch_size=1000)
+    LoanApplication.objects.filter(pk__in=[loan.pk for loan in loans]).refresh_balance_summaries()
+    return rows
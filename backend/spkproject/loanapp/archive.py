@@ -0,0 +1,124 @@
+# loanapp/archive.py
+"""
+Hot/cold storage for closed loans.
+
+PAID, REJECTED and CANCELLED loans that have not changed for
+settings.LOAN_ARCHIVE_AFTER_DAYS move, with their nominees, EMIs and snapshot,
+into ArchivedLoan (`manage.py archive_loans`). Each batch is one transaction:
+the loans are locked, copied into archive rows and deleted from the hot tables,
+so LoanApplication, EMISchedule and their indexes only hold the live book.
+
+Archived loans stay readable: LoanApplicationViewSet.retrieve falls back to the
+archived rendering when the loan is not in the hot table. restore_loans() (also
+`archive_loans --restore` and the restore-archived action) puts the rows back
+under their original ids.
+"""
+import logging
+
+from django.core import serializers
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidate_loans
+from .models import CLOSED_LOAN_STATUSES, ArchivedLoan, EMISchedule, LoanApplication, LoanSnapshot, Nominee
+from .snapshots import render_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def _documents(objects):
+    return serializers.serialize('python', objects)
+
+
+def _snapshot_body(loan):
+    # The stored snapshot when it is current; rendering is the expensive part
+    snapshot = getattr(loan, 'snapshot', None)
+    if snapshot is not None and snapshot.version == loan.version:
+        return snapshot.body
+    return render_snapshot(loan).decode('utf-8')
+
+
+def _delete_rows(queryset):
+    # Plain DELETEs: .delete() would load every row to send the (cache) signals,
+    # which invalidate_loans() replaces with one write per cache
+    return queryset._raw_delete(queryset.db)
+
+
+def archive_loans(loan_ids):
+    """
+    Moves these loans (those still closed) to ArchivedLoan in one transaction. Loans
+    locked by another transaction are skipped. Returns the number archived.
+    """
+    with transaction.atomic():
+        loans = list(
+            LoanApplication.objects.with_details().select_related('snapshot')
+            .select_for_update(of=('self',), skip_locked=True)
+            .filter(pk__in=loan_ids, status__in=CLOSED_LOAN_STATUSES)
+        )
+        if not loans:
+            return 0
+        now = timezone.now()
+        ArchivedLoan.objects.bulk_create([
+            ArchivedLoan(
+                loan_pk=loan.pk, loanID=loan.loanID, applicant_record_id=loan.applicant_record_id,
+                status=loan.status, LoanRegDate=loan.LoanRegDate, closed_at=loan.updated_at,
+                version=loan.version, archived_at=now, loan=_documents([loan])[0],
+                nominees=_documents(loan.nominees.all()), emi_schedule=_documents(loan.emiSchedule.all()),
+                body=_snapshot_body(loan),
+            )
+            for loan in loans
+        ])
+        loan_pks = [loan.pk for loan in loans]
+        for model in (LoanSnapshot, EMISchedule, Nominee):
+            _delete_rows(model.objects.filter(loan_application_id__in=loan_pks))
+        _delete_rows(LoanApplication.objects.filter(pk__in=loan_pks))
+    invalidate_loans(loans)
+    return len(loans)
+
+
+def _insert_documents(documents, batch_size=1000):
+    """
+    Inserts serialized rows as they are, ids and auto_now / auto_now_add values
+    included: a raw insert, like loaddata's, which bulk_create has no option for.
+    """
+    objects = [item.object for item in serializers.deserialize('python', documents, ignorenonexistent=True)]
+    if not objects:
+        return objects
+    model = type(objects[0])
+    fields = model._meta.concrete_fields
+    with transaction.atomic(savepoint=False):
+        for offset in range(0, len(objects), batch_size):
+            model._base_manager._insert(objects[offset:offset + batch_size], fields=fields, raw=True)
+    return objects
+
+
+def restore_loans(loan_pks):
+    """ Moves archived loans back into the hot tables. Returns the number restored. """
+    with transaction.atomic():
+        archives = list(ArchivedLoan.objects.select_for_update().filter(pk__in=loan_pks))
+        if not archives:
+            return 0
+        loans = _insert_documents([
+            # The applicant link follows the archive row (SET_NULL if the applicant went away)
+            {**archive.loan, 'fields': {**archive.loan['fields'], 'applicant_record': archive.applicant_record_id}}
+            for archive in archives
+        ])
+        _insert_documents([document for archive in archives for document in archive.nominees])
+        _insert_documents([document for archive in archives for document in archive.emi_schedule])
+        LoanSnapshot.objects.bulk_create([
+            LoanSnapshot(loan_application_id=archive.pk, version=archive.version, body=archive.body, rendered_at=archive.archived_at)
+            for archive in archives
+        ])
+        ArchivedLoan.objects.filter(pk__in=[archive.pk for archive in archives]).delete()
+    invalidate_loans(loans)
+    return len(archives)
+
+
+def archive_closed_loans(older_than_days=None, batch_size=200, limit=None):
+    """ Archives every archivable loan, `batch_size` loans per transaction. Returns the number archived. """
+    loan_ids = list(LoanApplication.objects.archivable(older_than_days).order_by('pk').values_list('pk', flat=True)[:limit])
+    archived = 0
+    for offset in range(0, len(loan_ids), batch_size):
+        archived += archive_loans(loan_ids[offset:offset + batch_size])
+    logger.info(f"Archived {archived} of {len(loan_ids)} closed loans.")
+    return archived
@@ -0,0 +1,130 @@
+# loanapp/cache.py
+"""
+Response caches for the loan and applicant screens (see core.cache), and the
+receivers that invalidate them:
+
+  loan_detail_cache       serialized LoanApplication, per loan pk
+  loan_lookup_cache       validate-applicant (first name, phone) -> loan pk
+  applicant_detail_cache  serialized Applicant, per userID (it shows the latest loan)
+
+Writes that bypass save() signals (bulk_create/bulk_update, queryset.update())
+go through FieldTrackerMixin.touch(), LoanApplication.refresh_balance_summary(),
+invalidate_all_loans() or the soft-delete querysets (core.softdelete).
+
+A nominee or EMI saved or deleted on its own also moves its loan's version, which
+keys the loan's ETag and stored snapshot (see bump_loan_version).
+"""
+import hashlib
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.cache import TieredCache
+from core.fields import normalize_phone
+from core.mixins import row_touched
+from core.softdelete import rows_soft_deleted
+
+loan_detail_cache = TieredCache('loan-detail')
+loan_lookup_cache = TieredCache('loan-lookup')
+applicant_detail_cache = TieredCache('applicant-detail')
+
+
+def lookup_ident(first_name, phone):
+    """ Cache ident for a validate-applicant lookup (case-insensitive name, normalized phone). """
+    raw = f"{(first_name or '').strip().lower()}|{normalize_phone(phone) or ''}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _invalidate(invalidate):
+    # Now, for this transaction and tests; again after commit, so a read that raced
+    # the write cannot leave its stale copy under the new version
+    invalidate()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(invalidate)
+
+
+def invalidate_loan(loan):
+    lookups = {lookup_ident(loan.first_name, loan.phone)}
+    applicants = {loan.applicant_record_id}
+    if getattr(loan, '_original_values', None):
+        # A renamed / re-linked loan must also drop out of its old lookup and applicant
+        lookups.add(lookup_ident(loan.get_original('first_name'), loan.get_original('phone')))
+        applicants.add(loan.get_original('applicant_record'))
+    applicants.discard(None)
+
+    def invalidate():
+        loan_detail_cache.invalidate(loan.pk)
+        loan_lookup_cache.invalidate(*lookups)
+        applicant_detail_cache.invalidate(*applicants)
+    _invalidate(invalidate)
+
+
+def invalidate_loans(loans):
+    """ For loans added or removed in bulk (archive / restore): one write per cache. """
+    loans = list(loans)
+
+    def invalidate():
+        loan_detail_cache.invalidate(*[loan.pk for loan in loans])
+        loan_lookup_cache.invalidate(*{lookup_ident(loan.first_name, loan.phone) for loan in loans})
+        applicant_detail_cache.invalidate(*{loan.applicant_record_id for loan in loans if loan.applicant_record_id})
+    _invalidate(invalidate)
+
+
+def invalidate_loan_details(loan_pk):
+    """ Nominee / EMI changes: only the loan's own rendering moves. """
+    _invalidate(lambda: loan_detail_cache.invalidate(loan_pk))
+
+
+def bump_loan_version(row):
+    """ One UPDATE moving the version of the loan a nominee / EMI row belongs to. """
+    loan_model = type(row)._meta.get_field('loan_application').related_model
+    loan_model._base_manager.filter(pk=row.loan_application_id).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+def invalidate_all_loans():
+    """ For bulk status / summary updates over many loans. """
+    def invalidate():
+        loan_detail_cache.invalidate_all()
+        applicant_detail_cache.invalidate_all()
+    _invalidate(invalidate)
+
+
+@receiver(post_save, sender='loanapp.LoanApplication')
+@receiver(post_delete, sender='loanapp.LoanApplication')
+def _loan_changed(sender, instance, **kwargs):
+    invalidate_loan(instance)
+
+
+@receiver(post_save, sender='loanapp.EMISchedule')
+@receiver(post_delete, sender='loanapp.EMISchedule')
+@receiver(post_save, sender='loanapp.Nominee')
+@receiver(post_delete, sender='loanapp.Nominee')
+def _loan_detail_row_changed(sender, instance, **kwargs):
+    # Bulk writes skip this and move the version themselves (touch(), refresh_balance_summary())
+    bump_loan_version(instance)
+    invalidate_loan_details(instance.loan_application_id)
+
+
+@receiver(post_save, sender='applicants.Applicant')
+@receiver(post_delete, sender='applicants.Applicant')
+def _applicant_changed(sender, instance, **kwargs):
+    _invalidate(lambda: applicant_detail_cache.invalidate(instance.userID))
+
+
+@receiver(row_touched)
+def _row_touched(sender, instance, **kwargs):
+    label = sender._meta.label
+    if label == 'loanapp.LoanApplication':
+        invalidate_loan(instance)
+    elif label == 'applicants.Applicant':
+        _invalidate(lambda: applicant_detail_cache.invalidate(instance.userID))
+
+
+@receiver(rows_soft_deleted)
+def _rows_soft_deleted(sender, **kwargs):
+    # Set-based deletes don't say which rows; the applicant screen shows its properties
+    if sender._meta.label in ('applicants.Applicant', 'applicants.PropertyDetails'):
+        _invalidate(applicant_detail_cache.invalidate_all)
@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from loanapp.archive import archive_closed_loans, restore_loans
+from loanapp.models import ArchivedLoan, LoanApplication
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves closed (PAID/REJECTED/CANCELLED) loans unchanged for LOAN_ARCHIVE_AFTER_DAYS days, with their "
+        "nominees and EMIs, into the archive table in batched transactions. --restore puts archived loans back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=None, help="Overrides settings.LOAN_ARCHIVE_AFTER_DAYS.")
+        parser.add_argument('--batch-size', type=int, default=None, help="Loans per transaction (settings.LOAN_ARCHIVE_BATCH_SIZE).")
+        parser.add_argument('--limit', type=int, default=None, help="Archive at most this many loans in this run.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the loans that would be archived.")
+        parser.add_argument('--restore', nargs='+', metavar='LOAN', help="loanIDs (or ids) of archived loans to restore.")
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            return self.restore(options['restore'])
+
+        if options['dry_run']:
+            count = LoanApplication.objects.archivable(options['older_than_days']).count()
+            self.stdout.write(f"{count} closed loans would be archived.")
+            return
+
+        batch_size = options['batch_size'] or getattr(settings, 'LOAN_ARCHIVE_BATCH_SIZE', 200)
+        started = time.monotonic()
+        archived = archive_closed_loans(options['older_than_days'], batch_size=batch_size, limit=options['limit'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} loans in {elapsed:.2f}s."))
+
+    def restore(self, identifiers):
+        pks = [int(identifier) for identifier in identifiers if identifier.isdigit()]
+        loan_pks = list(
+            ArchivedLoan.objects.filter(Q(loanID__in=identifiers) | Q(pk__in=pks)).values_list('pk', flat=True)
+        )
+        if not loan_pks:
+            raise CommandError("None of these loans is archived.")
+        restored = restore_loans(loan_pks)
+        self.stdout.write(self.style.SUCCESS(f"Restored {restored} of {len(identifiers)} loans."))
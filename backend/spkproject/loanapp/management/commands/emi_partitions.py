@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+
+from loanapp import partitions
+from loanapp.models import CLOSED_LOAN_STATUSES, EMISchedule
+
+
+class Command(BaseCommand):
+    help = (
+        "Manages the yearly partitions of the EMI schedule (see loanapp/partitions.py). Without options, lists "
+        "them. --create-ahead creates the partitions of the coming years; --detach takes old years out of the "
+        "schedule (they stay as plain tables), --attach puts them back and --drop deletes detached ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--create-ahead', action='store_true', help="Create partitions through settings.EMI_PARTITION_YEARS_AHEAD, and for years found in the default partition.")
+        parser.add_argument('--detach', nargs='+', type=int, metavar='YEAR', help="Detach these years' partitions.")
+        parser.add_argument('--attach', nargs='+', type=int, metavar='YEAR', help="Attach these detached years again.")
+        parser.add_argument('--drop', nargs='+', type=int, metavar='YEAR', help="Drop these detached years' tables.")
+        parser.add_argument('--force', action='store_true', help="Detach even years holding installments of open loans.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql' or not partitions.is_partitioned():
+            raise CommandError("The EMI schedule is not partitioned (needs PostgreSQL and migration loanapp 0016).")
+        try:
+            if options['create_ahead']:
+                created = partitions.create_partitions(partitions.years_ahead() + partitions.years_in_default())
+                self.stdout.write(self.style.SUCCESS(f"Created {len(created)} partitions: {', '.join(created) or '-'}"))
+            for year in options['detach'] or ():
+                self.detach(year, options['force'])
+            for year in options['attach'] or ():
+                self.require(year, detached=True)
+                partitions.attach_partition(year)
+                self.stdout.write(self.style.SUCCESS(f"Attached {partitions.partition_name(year)}."))
+            for year in options['drop'] or ():
+                self.require(year, detached=True)
+                partitions.drop_partition(year)
+                self.stdout.write(self.style.SUCCESS(f"Dropped {partitions.partition_name(year)}."))
+            if any(options[name] for name in ('create_ahead', 'detach', 'attach')):
+                partitions.analyze()
+        except DatabaseError as e:
+            raise CommandError(str(e).strip())
+        self.list()
+
+    def require(self, year, detached):
+        name = partitions.partition_name(year)
+        names = partitions.detached_partitions() if detached else [name for name, _, _ in partitions.list_partitions()]
+        if name not in names:
+            raise CommandError(f"{name} is not {'a detached partition' if detached else 'attached'}.")
+
+    def detach(self, year, force):
+        self.require(year, detached=False)
+        # Pruned to that year's partition by the date bounds
+        open_loans = (
+            EMISchedule.objects.filter(emiStartDate__year=year)
+            .exclude(loan_application__status__in=CLOSED_LOAN_STATUSES)
+            .values('loan_application').distinct().count()
+        )
+        if open_loans and not force:
+            raise CommandError(
+                f"{partitions.partition_name(year)} holds installments of {open_loans} open loans; "
+                "archive or close them first, or pass --force."
+            )
+        partitions.detach_partition(year)
+        self.stdout.write(self.style.SUCCESS(f"Detached {partitions.partition_name(year)}."))
+
+    def list(self):
+        for name, bounds, rows in partitions.list_partitions():
+            self.stdout.write(f"{name:<32} {bounds:<60} ~{rows} rows")
+        for name in partitions.detached_partitions():
+            self.stdout.write(f"{name:<32} (detached)")
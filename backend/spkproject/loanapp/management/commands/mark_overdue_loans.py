@@ -0,0 +1,42 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from loanapp.models import LoanApplication
+
+
+class Command(BaseCommand):
+    help = (
+        "Flips ACTIVE loans with past-due unpaid EMIs to OVERDUE and cured OVERDUE loans back to ACTIVE, "
+        "using set-based UPDATE ... WHERE EXISTS statements over id-range chunks. Meant to run nightly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Width of each loan id range.")
+        parser.add_argument('--date', help="Evaluate as of this date (YYYY-MM-DD). Defaults to today.")
+
+    def handle(self, *args, **options):
+        today = datetime.date.fromisoformat(options['date']) if options['date'] else timezone.localdate()
+        chunk_size = options['chunk_size']
+        candidates = LoanApplication.objects.filter(status__in=['ACTIVE', 'OVERDUE'])
+        bounds = candidates.aggregate(low=Min('id'), high=Max('id'))
+
+        started = time.monotonic()
+        marked = cured = recounted = 0
+        if bounds['low'] is not None:
+            for range_start in range(bounds['low'], bounds['high'] + 1, chunk_size):
+                chunk = candidates.filter(id__gte=range_start, id__lt=range_start + chunk_size)
+                with transaction.atomic():
+                    marked += chunk.mark_overdue(today)
+                    cured += chunk.cure_overdue(today)
+                    recounted += chunk.refresh_overdue_counts(today)
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Overdue check as of {today}: {marked} loans marked OVERDUE, {cured} cured back to ACTIVE, "
+            f"{recounted} overdue counts refreshed in {elapsed:.2f}s."
+        ))
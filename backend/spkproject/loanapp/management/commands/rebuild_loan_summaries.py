@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from loanapp.models import LoanApplication
+
+
+class Command(BaseCommand):
+    help = "Recomputes the denormalized balance summary columns of LoanApplication from EMISchedule."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Loans refreshed per aggregate/UPDATE round trip.")
+        parser.add_argument('--status', nargs='*', help="Only rebuild loans in these statuses (default: all loans).")
+
+    def handle(self, *args, **options):
+        queryset = LoanApplication.objects.all()
+        if options['status']:
+            queryset = queryset.filter(status__in=options['status'])
+
+        started = time.monotonic()
+        refreshed = queryset.refresh_balance_summaries(batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt balance summary for {refreshed} loans in {elapsed:.2f}s."))
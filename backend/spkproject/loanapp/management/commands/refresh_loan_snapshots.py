@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from loanapp.models import LoanApplication
+from loanapp.snapshots import save_snapshots, stale_loans
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-renders the pre-rendered JSON snapshots (LoanSnapshot) of loans whose snapshot is missing "
+        "or older than the loan, e.g. after mark_overdue_loans or rebuild_loan_summaries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help="Loans loaded and rendered per round trip.")
+        parser.add_argument('--all', action='store_true', help="Re-render every loan, not only stale ones.")
+
+    def handle(self, *args, **options):
+        queryset = LoanApplication.objects.all() if options['all'] else stale_loans()
+        loan_ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+        batch_size = options['batch_size']
+
+        started = time.monotonic()
+        for offset in range(0, len(loan_ids), batch_size):
+            # Three queries to load a batch with its nominees and EMIs, one upsert to store it
+            save_snapshots(LoanApplication.objects.with_details().filter(pk__in=loan_ids[offset:offset + batch_size]))
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Rendered snapshots for {len(loan_ids)} loans in {elapsed:.2f}s."))
@@ -0,0 +1,98 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:44
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min, Q, Sum, Value
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+SUMMARY_FIELDS = [
+    'total_scheduled', 'total_paid', 'outstanding_amount', 'next_due_month', 'next_due_date', 'overdue_installments',
+]
+
+
+def backfill_balance_summaries(apps, schema_editor):
+    """
+    Fills the new columns of existing loans from their EMIs, so filtering and
+    ordering on them is right as soon as this migration ran. The summary math of
+    LoanApplication.refresh_balance_summary, frozen here against the models of this
+    migration (the live method uses columns added later).
+    """
+    LoanApplication = apps.get_model('loanapp', 'LoanApplication')
+    EMISchedule = apps.get_model('loanapp', 'EMISchedule')
+    zero = Decimal('0.00')
+    money = models.DecimalField(max_digits=12, decimal_places=2)
+    unpaid = Q(paymentAmount__lt=F('emiTotalMonth'))
+    principal_repaid = Least(
+        Greatest(F('paymentAmount') - F('interest'), Value(zero, output_field=money)), F('principalPaid'), output_field=money,
+    )
+    rows = (
+        EMISchedule.objects.values('loan_application').order_by('loan_application').annotate(
+            total_scheduled=Sum('emiTotalMonth'),
+            total_paid=Sum('paymentAmount'),
+            principal_scheduled=Sum('principalPaid'),
+            principal_repaid=Sum(principal_repaid),
+            next_due_month=Min('month', filter=unpaid),
+            next_due_date=Min('emiStartDate', filter=unpaid),
+            overdue_installments=Count('id', filter=unpaid & Q(emiStartDate__lt=timezone.localdate())),
+        )
+    )
+    loans = []
+    for row in rows.iterator(chunk_size=2000):
+        loans.append(LoanApplication(
+            pk=row['loan_application'],
+            total_scheduled=row['total_scheduled'] or zero,
+            total_paid=row['total_paid'] or zero,
+            outstanding_amount=max((row['principal_scheduled'] or zero) - (row['principal_repaid'] or zero), zero),
+            next_due_month=row['next_due_month'],
+            next_due_date=row['next_due_date'],
+            overdue_installments=row['overdue_installments'],
+        ))
+        if len(loans) == 500:
+            LoanApplication.objects.bulk_update(loans, SUMMARY_FIELDS)
+            loans = []
+    if loans:
+        LoanApplication.objects.bulk_update(loans, SUMMARY_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loanapp', '0008_alter_emischedule_emitotalmonth'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loanapplication',
+            name='next_due_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='loanapplication',
+            name='next_due_month',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='loanapplication',
+            name='outstanding_amount',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='loanapplication',
+            name='overdue_installments',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='loanapplication',
+            name='total_paid',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='loanapplication',
+            name='total_scheduled',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        # Loans without EMIs keep the defaults, which are already right for them
+        migrations.RunPython(backfill_balance_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applicants', '0025_applicant_applicants_regdate_id_idx'),
+        ('loanapp', '0009_loanapplication_balance_summary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['-LoanRegDate', '-id'], name='loanapp_regdate_id_idx'),
+        ),
+    ]
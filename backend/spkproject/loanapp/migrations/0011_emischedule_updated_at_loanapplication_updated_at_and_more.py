@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 21:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loanapp', '0010_loanapplication_loanapp_regdate_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emischedule',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='loanapplication',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='loanapplication',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
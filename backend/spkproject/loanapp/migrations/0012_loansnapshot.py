@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 21:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loanapp', '0011_emischedule_updated_at_loanapplication_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanSnapshot',
+            fields=[
+                ('loan_application', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='loanapp.loanapplication')),
+                ('version', models.PositiveIntegerField()),
+                ('body', models.TextField()),
+                ('rendered_at', models.DateTimeField()),
+            ],
+        ),
+    ]
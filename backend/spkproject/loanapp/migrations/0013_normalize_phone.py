@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-18 21:15
+
+import core.fields
+from core.fields import backfill_phone_numbers
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+def normalize_phone_numbers(apps, schema_editor):
+    backfill_phone_numbers(apps.get_model('loanapp', 'LoanApplication'), 'phone')
+    backfill_phone_numbers(apps.get_model('loanapp', 'Nominee'), 'phone')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applicants', '0027_normalize_phone'),
+        ('loanapp', '0012_loansnapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='loanapplication',
+            name='phone',
+            field=core.fields.PhoneNumberField(max_length=15),
+        ),
+        migrations.AlterField(
+            model_name='nominee',
+            name='phone',
+            field=core.fields.PhoneNumberField(max_length=15),
+        ),
+        migrations.RunPython(normalize_phone_numbers, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(models.F('phone'), django.db.models.functions.text.Lower('first_name'), models.OrderBy(models.F('LoanRegDate'), descending=True), models.OrderBy(models.F('id'), descending=True), include=('first_name',), name='loanapp_phone_name_idx'),
+        ),
+    ]
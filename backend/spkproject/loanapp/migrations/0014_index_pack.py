@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-18 21:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applicants', '0028_index_pack'),
+        ('loanapp', '0013_normalize_phone'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emischedule',
+            name='loan_application',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='emiSchedule', to='loanapp.loanapplication'),
+        ),
+        migrations.AlterField(
+            model_name='loanapplication',
+            name='applicant_record',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='loan_applications', to='applicants.applicant', to_field='userID'),
+        ),
+        migrations.AddIndex(
+            model_name='emischedule',
+            index=models.Index(fields=['loan_application', 'month'], name='emischedule_loan_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['status', '-LoanRegDate', '-id'], name='loanapp_status_regdate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['applicant_record', '-LoanRegDate', '-id'], name='loanapp_applicant_regdate_idx'),
+        ),
+    ]
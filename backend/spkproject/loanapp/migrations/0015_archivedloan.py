@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 21:29
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applicants', '0029_soft_delete'),
+        ('loanapp', '0014_index_pack'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedLoan',
+            fields=[
+                ('loan_pk', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('loanID', models.CharField(blank=True, max_length=10, null=True, unique=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending Approval'), ('MANAGER_APPROVED', 'Manager Approved (Awaiting Admin)'), ('INFO_REQUESTED', 'Information Requested'), ('APPROVED', 'Approved (Final)'), ('ACTIVE', 'Active / Ongoing'), ('PAID', 'Paid / Closed'), ('REJECTED', 'Rejected'), ('CANCELLED', 'Cancelled by Applicant'), ('OVERDUE', 'Overdue')], max_length=30)),
+                ('LoanRegDate', models.DateField()),
+                ('closed_at', models.DateTimeField()),
+                ('version', models.PositiveIntegerField()),
+                ('archived_at', models.DateTimeField()),
+                ('loan', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('nominees', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('emi_schedule', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('body', models.TextField()),
+                ('applicant_record', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_loans', to='applicants.applicant', to_field='userID')),
+            ],
+        ),
+    ]
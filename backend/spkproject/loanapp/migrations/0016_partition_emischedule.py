@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-18 21:52
+
+from django.db import migrations
+
+from loanapp.partitions import partition_table, unpartition_table
+
+
+def partition_emischedule(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        partition_table(schema_editor)
+
+
+def unpartition_emischedule(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        unpartition_table(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loanapp', '0015_archivedloan'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_emischedule, unpartition_emischedule),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.1.7 on 2026-10-18 21:43
+
+import core.money
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loanapp', '0016_partition_emischedule'),
+    ]
+
+    operations = [
+        core.money.AlterFieldToPaise(
+            model_name='emischedule',
+            name='emiTotalMonth',
+            field=core.money.PaiseField(default=0, max_digits=10),
+        ),
+        core.money.AlterFieldToPaise(
+            model_name='emischedule',
+            name='interest',
+            field=core.money.PaiseField(default=0, max_digits=10),
+        ),
+        core.money.AlterFieldToPaise(
+            model_name='emischedule',
+            name='paymentAmount',
+            field=core.money.PaiseField(default=0, max_digits=10),
+        ),
+        core.money.AlterFieldToPaise(
+            model_name='emischedule',
+            name='pendingAmount',
+            field=core.money.PaiseField(default=0, max_digits=10),
+        ),
+        core.money.AlterFieldToPaise(
+            model_name='emischedule',
+            name='principalPaid',
+            field=core.money.PaiseField(default=0, max_digits=10),
+        ),
+        core.money.AlterFieldToPaise(
+            model_name='emischedule',
+            name='remainingBalance',
+            field=core.money.PaiseField(default=0, max_digits=10),
+        ),
+        core.money.AlterFieldToPaise(
+            model_name='loanapplication',
+            name='amount',
+            field=core.money.PaiseField(max_digits=10),
+        ),
+        core.money.AlterFieldToPaise(
+            model_name='loanapplication',
+            name='outstanding_amount',
+            field=core.money.PaiseField(default=0, editable=False, max_digits=12),
+        ),
+        core.money.AlterFieldToPaise(
+            model_name='loanapplication',
+            name='total_paid',
+            field=core.money.PaiseField(default=0, editable=False, max_digits=12),
+        ),
+        core.money.AlterFieldToPaise(
+            model_name='loanapplication',
+            name='total_scheduled',
+            field=core.money.PaiseField(default=0, editable=False, max_digits=12),
+        ),
+    ]
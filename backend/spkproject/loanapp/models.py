@@ -1,11 +1,191 @@
 
-from django.db import models,connection
+from datetime import timedelta
+from decimal import Decimal
+from django.db import models,connection,transaction
+from django.db.models import Count, Exists, F, Max, Min, OuterRef, Prefetch, Q, Subquery, Sum, Value, prefetch_related_objects
+from django.db.models.functions import Cast, Coalesce, Greatest, Least, Lower, Substr
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone 
 
+from core.id_allocator import allocate_id, allocate_ids
+from core.fields import PhoneNumberField
+from core.money import PaiseField
+from core.mixins import FieldTrackerMixin, row_touched
+from .cache import invalidate_all_loans
 
+BALANCE_SUMMARY_FIELDS = [
+    'total_scheduled', 'total_paid', 'outstanding_amount',
+    'next_due_month', 'next_due_date', 'overdue_installments',
+]
 
-class LoanApplication(models.Model):
+
+def _balance_summary_aggregates(today):
+    """ Aggregate expressions (over EMISchedule rows) behind the loan balance summary. """
+    unpaid = Q(paymentAmount__lt=F('emiTotalMonth')) # Whole paise: short by at least one paisa
+    # A payment covers its installment's interest first; the rest repays principal
+    principal_repaid = Least(
+        Greatest(F('paymentAmount') - F('interest'), Value(0)), F('principalPaid'), output_field=PaiseField(),
+    )
+    return {
+        'total_scheduled': Sum('emiTotalMonth'),
+        'total_paid': Sum('paymentAmount'),
+        'principal_scheduled': Sum('principalPaid'),
+        'principal_repaid': Sum(principal_repaid),
+        'next_due_month': Min('month', filter=unpaid),
+        'next_due_date': Min('emiStartDate', filter=unpaid),
+        'overdue_installments': Count('id', filter=unpaid & Q(emiStartDate__lt=today)),
+    }
+
+
+def _apply_balance_summary(loan, totals):
+    """ Copies aggregate results onto a LoanApplication instance (not saved). """
+    loan.total_scheduled = totals.get('total_scheduled') or Decimal('0.00')
+    loan.total_paid = totals.get('total_paid') or Decimal('0.00')
+    principal_scheduled = totals.get('principal_scheduled') or Decimal('0.00')
+    loan.outstanding_amount = max(principal_scheduled - (totals.get('principal_repaid') or Decimal('0.00')), Decimal('0.00'))
+    loan.next_due_month = totals.get('next_due_month')
+    loan.next_due_date = totals.get('next_due_date')
+    loan.overdue_installments = totals.get('overdue_installments') or 0
+
+
+LOAN_DETAIL_RELATIONS = ('nominees', 'emiSchedule')
+
+# Closed loans; they move to ArchivedLoan once old enough (see loanapp.archive)
+CLOSED_LOAN_STATUSES = ('PAID', 'REJECTED', 'CANCELLED')
+
+
+def loan_detail_prefetches(relations=None):
+    """
+    Related rows LoanApplicationSerializer renders: nominees, and EMIs (in month order)
+    with their processor. `relations` limits them, e.g. to what ?fields= asked for.
+    """
+    prefetches = {
+        'nominees': 'nominees',
+        'emiSchedule': Prefetch(
+            'emiSchedule', queryset=EMISchedule.objects.select_related('payment_processed_by').order_by('month')
+        ),
+    }
+    return [prefetches[name] for name in LOAN_DETAIL_RELATIONS if relations is None or name in relations]
+
+
+def _version_bump():
+    """ UPDATE values that mark loans as changed for ETag purposes (see LoanApplication.version). """
+    return {'version': F('version') + 1, 'updated_at': timezone.now()}
+
+
+def _loans_changed(count):
+    """ Bulk UPDATEs send no signals; drop the cached loan renderings (see loanapp.cache). """
+    if count:
+        invalidate_all_loans()
+    return count
+
+
+def _lock_loans(loan_ids):
+    """
+    Row-locks loans (in pk order) until the end of the transaction, so writers to
+    their EMIs queue up and each balance summary aggregates the others' committed rows.
+    Returns {pk: version} as read under the lock.
+    """
+    return dict(LoanApplication.objects.select_for_update().filter(pk__in=loan_ids).order_by('pk').values_list('pk', 'version'))
+
+
+def _past_due_emis(today):
+    """ Unpaid installments whose due date is before `today`, correlated to the outer loan. """
+    return EMISchedule.objects.filter(
+        loan_application_id=OuterRef('pk'),
+        emiStartDate__lt=today,
+        paymentAmount__lt=F('emiTotalMonth'),
+    )
+
+
+class LoanApplicationQuerySet(models.QuerySet):
+    def with_details(self, relations=None):
+        """
+        Loads everything LoanApplicationSerializer reads in three queries, however many
+        loans, nominees or EMIs there are: loans + applicant, nominees, EMIs + processor.
+        Pass `relations` to prefetch only some of LOAN_DETAIL_RELATIONS.
+        """
+        return self.select_related('applicant_record').prefetch_related(*loan_detail_prefetches(relations))
+
+    def mark_overdue(self, today=None):
+        """ ACTIVE -> OVERDUE for loans with a past-due unpaid EMI. One UPDATE ... WHERE EXISTS. """
+        today = today or timezone.localdate()
+        updated = self.filter(status='ACTIVE').filter(Exists(_past_due_emis(today))).update(status='OVERDUE', **_version_bump())
+        return _loans_changed(updated)
+
+    def cure_overdue(self, today=None):
+        """ OVERDUE -> ACTIVE for loans that no longer have a past-due unpaid EMI. """
+        today = today or timezone.localdate()
+        updated = self.filter(status='OVERDUE').filter(~Exists(_past_due_emis(today))).update(status='ACTIVE', **_version_bump())
+        return _loans_changed(updated)
+
+    def refresh_overdue_counts(self, today=None):
+        """ Re-derives the date-dependent overdue_installments summary column in one UPDATE. """
+        today = today or timezone.localdate()
+        overdue_count = (
+            _past_due_emis(today).order_by().values('loan_application_id')
+            .annotate(total=Count('id')).values('total')
+        )
+        new_count = Coalesce(Subquery(overdue_count), 0)
+        # Only loans whose count actually moves get a new version
+        updated = self.exclude(overdue_installments=new_count).update(overdue_installments=new_count, **_version_bump())
+        return _loans_changed(updated)
+
+    def archivable(self, older_than_days=None):
+        """ Closed loans not changed for settings.LOAN_ARCHIVE_AFTER_DAYS days (or `older_than_days`). """
+        if older_than_days is None:
+            older_than_days = getattr(settings, 'LOAN_ARCHIVE_AFTER_DAYS', 365)
+        cutoff = timezone.now() - timedelta(days=older_than_days)
+        return self.filter(status__in=CLOSED_LOAN_STATUSES, updated_at__lt=cutoff)
+
+    def assign_loan_ids(self):
+        """
+        Gives every loan in the queryset that has no loanID yet a fresh one, using a
+        single block allocation and one bulk UPDATE (for batch approvals).
+        """
+        loans = list(self.filter(loanID__isnull=True).order_by('pk'))
+        if not loans:
+            return 0
+        numbers = allocate_ids(LoanApplication.LOAN_ID_PREFIX, len(loans), seed=LoanApplication._max_loan_number)
+        for loan, number in zip(loans, numbers):
+            loan.loanID = LoanApplication.format_loan_id(number)
+        LoanApplication.objects.bulk_update(loans, ['loanID'])
+        LoanApplication.objects.filter(pk__in=[loan.pk for loan in loans]).update(**_version_bump())
+        return _loans_changed(len(loans))
+
+    def refresh_balance_summaries(self, batch_size=500):
+        """
+        Recomputes the denormalized balance summary for every loan in the queryset:
+        per batch of loans, one transaction that locks them (see refresh_balance_summary),
+        runs one grouped aggregate query and writes them with one bulk UPDATE.
+        Returns the number of loans refreshed.
+        """
+        today = timezone.localdate()
+        refreshed = 0
+        loan_ids = list(self.order_by('pk').values_list('pk', flat=True))
+        for offset in range(0, len(loan_ids), batch_size):
+            batch_ids = loan_ids[offset:offset + batch_size]
+            with transaction.atomic():
+                _lock_loans(batch_ids)
+                totals_by_loan = {
+                    row['loan_application']: row
+                    for row in EMISchedule.objects.filter(loan_application_id__in=batch_ids)
+                    .values('loan_application')
+                    .annotate(**_balance_summary_aggregates(today))
+                    .order_by()
+                }
+                loans = [LoanApplication(pk=loan_id) for loan_id in batch_ids]
+                for loan in loans:
+                    _apply_balance_summary(loan, totals_by_loan.get(loan.pk, {}))
+                LoanApplication.objects.bulk_update(loans, BALANCE_SUMMARY_FIELDS)
+                LoanApplication.objects.filter(pk__in=batch_ids).update(**_version_bump())
+            refreshed += len(loans)
+        return _loans_changed(refreshed)
+
+
+
+class LoanApplication(FieldTrackerMixin, models.Model):
    
     loanID = models.CharField(max_length=10, unique=True, blank=True ,null=True, editable=False)
     
@@ -15,11 +195,12 @@ class LoanApplication(models.Model):
         null=True,
         blank=True,
         to_field='userID',
-        related_name='loan_applications'
+        related_name='loan_applications',
+        db_index=False, # Covered by loanapp_applicant_regdate_idx
     )
     first_name = models.CharField(max_length=100)
-    phone = models.CharField(max_length=15) 
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    phone = PhoneNumberField(max_length=15) 
+    amount = PaiseField(max_digits=10)
     term = models.IntegerField()
     termType = models.CharField(max_length=10) # Consider choices if there's a fixed set (e.g., 'Months', 'Years')
     interestRate = models.FloatField() # For financial data, DecimalField is often preferred for precision over FloatField
@@ -52,48 +233,98 @@ class LoanApplication(models.Model):
     )
     manager_remarks = models.TextField(blank=True, null=True)
     admin_remarks = models.TextField(blank=True, null=True)
+
+    # --- Balance summary (denormalized from EMISchedule, see refresh_balance_summary) ---
+    total_scheduled = PaiseField(max_digits=12, default=0, editable=False)
+    total_paid = PaiseField(max_digits=12, default=0, editable=False)
+    outstanding_amount = PaiseField(max_digits=12, default=0, editable=False) # Principal not yet repaid
+    next_due_month = models.IntegerField(null=True, blank=True, editable=False)
+    next_due_date = models.DateField(null=True, blank=True, editable=False)
+    overdue_installments = models.IntegerField(default=0, editable=False)
+
+    # Bumped on every change to the loan, its nominees or its EMIs (ETag source, see core.conditional)
+    version = models.PositiveIntegerField(default=1, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    version_field = 'version'
+
+    objects = LoanApplicationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the loan list (see core.pagination)
+            models.Index(fields=['-LoanRegDate', '-id'], name='loanapp_regdate_id_idx'),
+            # ?status= lists, mark_overdue / cure_overdue
+            models.Index(fields=['status', '-LoanRegDate', '-id'], name='loanapp_status_regdate_idx'),
+            # An applicant's loans newest first: latest-loan annotations, open-loan check, self-service list
+            models.Index(fields=['applicant_record', '-LoanRegDate', '-id'], name='loanapp_applicant_regdate_idx'),
+            # validate-applicant (phone + case-insensitive name, newest first) as an
+            # index-only scan; also serves the ?phone= filter. first_name is included
+            # because PostgreSQL only plans index-only scans on expressions whose
+            # columns are all in the index.
+            models.Index(
+                F('phone'), Lower('first_name'), F('LoanRegDate').desc(), F('id').desc(),
+                name='loanapp_phone_name_idx', include=['first_name'],
+            ),
+        ]
     
+    def refresh_balance_summary(self):
+        """
+        Recomputes the balance summary from this loan's EMIs with one aggregate query
+        and writes it with one UPDATE. Call it inside the same transaction as any
+        change to the schedule.
+
+        The loan row is locked first: two payments on different EMIs of one loan
+        would otherwise both aggregate before either commits, and the later UPDATE
+        would keep the other payment out of the totals.
+        """
+        with transaction.atomic(savepoint=False):
+            locked_version = _lock_loans([self.pk]).get(self.pk)
+            totals = self.emiSchedule.aggregate(**_balance_summary_aggregates(timezone.localdate()))
+            _apply_balance_summary(self, totals)
+            # The schedule changed, so this also moves the loan's version
+            bump = _version_bump()
+            LoanApplication.objects.filter(pk=self.pk).update(
+                **{field_name: getattr(self, field_name) for field_name in BALANCE_SUMMARY_FIELDS}, **bump
+            )
+        self.updated_at = bump['updated_at']
+        self._snapshot([self._meta.get_field(name) for name in BALANCE_SUMMARY_FIELDS + ['updated_at']])
+        if locked_version is None:
+            self._expire_version()
+        else:
+            self.version = locked_version + 1 # Exact: nobody else can write the row while it is locked
+            self._snapshot([self._meta.get_field('version')])
+        row_touched.send(sender=LoanApplication, instance=self)
+
+    def prefetch_details(self):
+        """ (Re)loads nominees and EMIs into the prefetch cache, e.g. after they were rewritten. """
+        self._prefetched_objects_cache = {}
+        prefetch_related_objects([self], *loan_detail_prefetches())
+
     
+    LOAN_ID_PREFIX = "SPK"
+
+    @classmethod
+    def format_loan_id(cls, number):
+        return f"{cls.LOAN_ID_PREFIX}{str(number).zfill(3)}" # SPK001 ... SPK999, SPK1000 ...
+
+    @classmethod
+    def _max_loan_number(cls):
+        """ Highest numeric suffix already issued; only used to seed the ID counter. """
+        prefix = cls.LOAN_ID_PREFIX
+        return cls.objects.filter(loanID__regex=rf'^{prefix}[0-9]+$').annotate(
+            loan_number=Cast(Substr('loanID', len(prefix) + 1), models.BigIntegerField())
+        ).aggregate(Max('loan_number'))['loan_number__max']
+
     def _generate_loan_id(self):
-       
         if not self.loanID: # loanID illaati mattum generate pannu
-            prefix = "SPK"
-            
-            last_loan = LoanApplication.objects.filter(loanID__startswith=prefix).order_by('loanID').last()
-            next_number = 1
-            if last_loan and last_loan.loanID:
-                try:
-                    
-                    numeric_part_str = last_loan.loanID[len(prefix):]
-                    if numeric_part_str.isdigit():
-                        next_number = int(numeric_part_str) + 1
-                except ValueError:
-                   
-                    pass 
-            
-            if next_number < 1000:
-                self.loanID = f"{prefix}{str(next_number).zfill(3)}"
-            else:
-                self.loanID = f"{prefix}{next_number}"
-            
-            while LoanApplication.objects.filter(loanID=self.loanID).exclude(pk=self.pk).exists():
-                next_number += 1
-                if next_number < 1000:
-                    self.loanID = f"{prefix}{str(next_number).zfill(3)}"
-                else:
-                    self.loanID = f"{prefix}{next_number}"
+            self.loanID = self.format_loan_id(allocate_id(self.LOAN_ID_PREFIX, seed=self._max_loan_number))
 
-    
     def save(self, *args, **kwargs):
         
         is_newly_approved_or_activated = False
-        if self.pk: # Object already exists in DB
-            try:
-                old_instance = LoanApplication.objects.get(pk=self.pk)
-                if old_instance.status not in ['APPROVED', 'ACTIVE'] and self.status in ['APPROVED', 'ACTIVE']:
-                    is_newly_approved_or_activated = True
-            except LoanApplication.DoesNotExist:
-                pass # Should not happen if self.pk exists
+        if self.pk and self.has_changed('status'): # Compared against the loaded value, no re-read
+            if self.get_original('status') not in ['APPROVED', 'ACTIVE'] and self.status in ['APPROVED', 'ACTIVE']:
+                is_newly_approved_or_activated = True
 
         
         if (not self.pk and self.status in ['APPROVED', 'ACTIVE'] and not self.loanID) or \
@@ -110,7 +341,7 @@ class LoanApplication(models.Model):
 class Nominee(models.Model):
     loan_application = models.ForeignKey(LoanApplication, related_name='nominees', on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
-    phone = models.CharField(max_length=15) # Consider validators
+    phone = PhoneNumberField(max_length=15)
     email = models.EmailField(blank=True, null=True) # Nominee email might be optional
     relationship = models.CharField(max_length=100)
     address = models.TextField()
@@ -124,18 +355,22 @@ class Nominee(models.Model):
     def __str__(self):
         return self.name
 
-class EMISchedule(models.Model):
-    loan_application = models.ForeignKey(LoanApplication, related_name='emiSchedule', on_delete=models.CASCADE)
+class EMISchedule(FieldTrackerMixin, models.Model):
+    # Stored in yearly partitions on emiStartDate, see loanapp/partitions.py
+    loan_application = models.ForeignKey(
+        LoanApplication, related_name='emiSchedule', on_delete=models.CASCADE,
+        db_index=False, # Covered by emischedule_loan_month_idx
+    )
     month = models.IntegerField() # Or DateField for the specific month/year
     emiStartDate = models.DateField()
-    emiTotalMonth = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
-    interest = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
-    principalPaid = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
-    remainingBalance = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
+    emiTotalMonth = PaiseField(max_digits=10, default=0)
+    interest = PaiseField(max_digits=10, default=0)
+    principalPaid = PaiseField(max_digits=10, default=0)
+    remainingBalance = PaiseField(max_digits=10, default=0)
     
     # Payment fields
-    paymentAmount = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
-    pendingAmount = models.DecimalField(max_digits=10, decimal_places=2, default=0.0) 
+    paymentAmount = PaiseField(max_digits=10, default=0)
+    pendingAmount = PaiseField(max_digits=10, default=0) 
     payment_processed_by = models.ForeignKey(
         settings.AUTH_USER_MODEL, 
         on_delete=models.SET_NULL,
@@ -144,7 +379,62 @@ class EMISchedule(models.Model):
         related_name='processed_emis'
     )
     payment_processed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # A loan's schedule in month order (prefetches, payments by month, overdue checks)
+            models.Index(fields=['loan_application', 'month'], name='emischedule_loan_month_idx'),
+        ]
     
     def __str__(self):
         processed_by_info = f" (Processed by: {self.payment_processed_by.username})" if self.payment_processed_by else ""
-        return f"EMI {self.month} for {self.loan_application.loanID}{processed_by_info}"
\ No newline at end of file
+        return f"EMI {self.month} for {self.loan_application.loanID}{processed_by_info}"
+
+class LoanSnapshot(models.Model):
+    """
+    The loan's full API representation (LoanApplicationSerializer, nominees and EMIs
+    included) as rendered JSON text, so the payment-counter lookup can send it without
+    loading or serializing anything. Valid only while `version` equals the loan's
+    version; see loanapp.snapshots.
+    """
+    loan_application = models.OneToOneField(
+        LoanApplication, related_name='snapshot', on_delete=models.CASCADE, primary_key=True
+    )
+    version = models.PositiveIntegerField() # LoanApplication.version it was rendered from
+    body = models.TextField() # JSON, media URLs relative to the site root
+    rendered_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Snapshot of loan {self.loan_application_id} (v{self.version})"
+
+
+class ArchivedLoan(models.Model):
+    """
+    A closed loan moved out of the hot tables together with its nominees, EMIs and
+    snapshot (loanapp.archive). The rows are kept as serialized documents, so a
+    restore puts them back unchanged under their original ids; `body` is the loan's
+    rendered detail, which retrieve serves for archived loans.
+    """
+    loan_pk = models.PositiveIntegerField(primary_key=True) # LoanApplication.id, kept for lookups and restore
+    loanID = models.CharField(max_length=10, unique=True, blank=True, null=True)
+    applicant_record = models.ForeignKey(
+        'applicants.Applicant',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        to_field='userID',
+        related_name='archived_loans',
+    )
+    status = models.CharField(max_length=30, choices=LoanApplication.LOAN_STATUS_CHOICES)
+    LoanRegDate = models.DateField()
+    closed_at = models.DateTimeField() # The loan's last change before it was archived
+    version = models.PositiveIntegerField() # LoanApplication.version, for ETags
+    archived_at = models.DateTimeField()
+    loan = models.JSONField(encoder=DjangoJSONEncoder) # django.core.serializers 'python' documents
+    nominees = models.JSONField(encoder=DjangoJSONEncoder, default=list)
+    emi_schedule = models.JSONField(encoder=DjangoJSONEncoder, default=list)
+    body = models.TextField() # JSON, media URLs relative to the site root
+
+    def __str__(self):
+        return f"Archived loan {self.loanID or self.loan_pk} [{self.status}]"
@@ -0,0 +1,215 @@
+# loanapp/partitions.py
+"""
+Yearly range partitions of the EMI schedule table on emiStartDate (PostgreSQL).
+
+Since migration 0016, loanapp_emischedule is a partitioned table with one
+partition per calendar year of due dates (loanapp_emischedule_y2026, ...) and
+loanapp_emischedule_default for dates outside them. Queries that bound
+emiStartDate (overdue checks, due lists) only read the partitions of those
+years, and a year of old installments can be detached (a catalog change, no
+DELETE, no vacuum) and then dropped. See `manage.py emi_partitions`.
+
+Partitions for the coming years (settings.EMI_PARTITION_YEARS_AHEAD) are created
+ahead of time by `emi_partitions --create-ahead`, meant to run periodically. Rows
+that landed in the default partition move into the partition of their year when
+it is created.
+
+PostgreSQL requires the partition key in unique constraints, so the primary key
+is (id, emiStartDate). Ids still come from a single sequence, which keeps `id`
+alone unique and the model's pk.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import connection as default_connection, transaction
+
+TABLE = 'loanapp_emischedule'
+PARTITION_KEY = 'emiStartDate'
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+def partition_name(year):
+    return f'{TABLE}_y{year}'
+
+
+def year_bounds(year):
+    """ FOR VALUES FROM / TO literals of a year's partition (dates, so safe to inline). """
+    return f"'{datetime.date(year, 1, 1).isoformat()}'", f"'{datetime.date(year + 1, 1, 1).isoformat()}'"
+
+
+def years_ahead(today=None):
+    """ This year and the next EMI_PARTITION_YEARS_AHEAD years. """
+    year = (today or datetime.date.today()).year
+    return list(range(year, year + getattr(settings, 'EMI_PARTITION_YEARS_AHEAD', 2) + 1))
+
+
+def _quote(connection, name):
+    return connection.ops.quote_name(name)
+
+
+def is_partitioned(connection=default_connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))", [TABLE])
+        return cursor.fetchone()[0]
+
+
+def list_partitions(connection=default_connection):
+    """ [(name, bounds, estimated rows)] of the attached partitions. """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), greatest(c.reltuples, 0)::bigint "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname",
+            [TABLE],
+        )
+        return cursor.fetchall()
+
+
+def detached_partitions(connection=default_connection):
+    """ Names of yearly partition tables that exist but are not attached. """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relname FROM pg_class WHERE relname LIKE %s AND relkind = 'r' AND NOT relispartition "
+            "AND relnamespace = current_schema()::regnamespace ORDER BY relname",
+            [f'{TABLE}\\_y%'],
+        )
+        return [name for name, in cursor.fetchall()]
+
+
+def years_in_default(connection=default_connection):
+    """ Years of the rows sitting in the default partition. """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT extract(year FROM {_quote(connection, PARTITION_KEY)})::integer "
+            f"FROM {_quote(connection, DEFAULT_PARTITION)}"
+        )
+        return sorted(year for year, in cursor.fetchall())
+
+
+def create_partitions(years, connection=default_connection):
+    """
+    Creates the yearly partitions missing for `years` (not those detached), moving the
+    rows of those years out of the default partition. Returns the names created.
+    """
+    quote = lambda name: _quote(connection, name)
+    existing = {name for name, _, _ in list_partitions(connection)} | set(detached_partitions(connection))
+    created = []
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        for year in sorted(set(years)):
+            name = partition_name(year)
+            if name in existing:
+                continue
+            start, end = year_bounds(year)
+            # CREATE ... PARTITION OF would fail on the default partition's rows of this
+            # year: fill a plain table with them and attach it instead
+            cursor.execute(f"CREATE TABLE {quote(name)} (LIKE {quote(TABLE)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {quote(DEFAULT_PARTITION)} "
+                f"WHERE {quote(PARTITION_KEY)} >= {start} AND {quote(PARTITION_KEY)} < {end} RETURNING *) "
+                f"INSERT INTO {quote(name)} SELECT * FROM moved"
+            )
+            cursor.execute(f"ALTER TABLE {quote(TABLE)} ATTACH PARTITION {quote(name)} FOR VALUES FROM ({start}) TO ({end})")
+            created.append(name)
+    return created
+
+
+def _foreign_keys(cursor, table):
+    cursor.execute("SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'", [table])
+    return cursor.fetchall()
+
+
+def detach_partition(year, connection=default_connection):
+    """
+    Detaches a year's partition. Its rows leave the EMI schedule at once and stay in
+    a plain table (without foreign keys, so it blocks no loan deletes) until it is
+    attached again or dropped.
+    """
+    quote = lambda name: _quote(connection, name)
+    name = partition_name(year)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {quote(TABLE)} DETACH PARTITION {quote(name)}")
+        for constraint, _ in _foreign_keys(cursor, name):
+            cursor.execute(f"ALTER TABLE {quote(name)} DROP CONSTRAINT {quote(constraint)}")
+
+
+def attach_partition(year, connection=default_connection):
+    """ Attaches a detached year's table again; its rows are checked against the bounds and foreign keys. """
+    start, end = year_bounds(year)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"ALTER TABLE {_quote(connection, TABLE)} ATTACH PARTITION {_quote(connection, partition_name(year))} "
+            f"FOR VALUES FROM ({start}) TO ({end})"
+        )
+
+
+def analyze(connection=default_connection):
+    """ Autovacuum analyzes the partitions but never the parent, whose statistics plan joins over it. """
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {_quote(connection, TABLE)}")
+
+
+def drop_partition(year, connection=default_connection):
+    """ Drops a detached year's table. """
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE {_quote(connection, partition_name(year))}")
+
+
+def _rebuild(schema_editor, years=None):
+    """
+    Copies the EMI table into a new one, partitioned by year when `years` is given
+    (plus the default partition), swaps it in and recreates the sequence position,
+    primary key, indexes and foreign keys.
+    """
+    connection = schema_editor.connection
+    quote = lambda name: _quote(connection, name)
+    new_table = f'{TABLE}_rebuild'
+    with connection.cursor() as cursor:
+        foreign_keys = _foreign_keys(cursor, TABLE)
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s AND indexname <> %s",
+            [TABLE, f'{TABLE}_pkey'],
+        )
+        indexes = [definition for definition, in cursor.fetchall()]
+
+        partitioning = f" PARTITION BY RANGE ({quote(PARTITION_KEY)})" if years is not None else ''
+        cursor.execute(f"CREATE TABLE {quote(new_table)} (LIKE {quote(TABLE)} INCLUDING DEFAULTS INCLUDING IDENTITY){partitioning}")
+        if years is not None:
+            for year in sorted(set(years)):
+                start, end = year_bounds(year)
+                cursor.execute(
+                    f"CREATE TABLE {quote(partition_name(year))} PARTITION OF {quote(new_table)} FOR VALUES FROM ({start}) TO ({end})"
+                )
+            cursor.execute(f"CREATE TABLE {quote(DEFAULT_PARTITION)} PARTITION OF {quote(new_table)} DEFAULT")
+
+        # Rows first, indexes and constraints after: one build each instead of per-row upkeep
+        cursor.execute(f"INSERT INTO {quote(new_table)} SELECT * FROM {quote(TABLE)}")
+        cursor.execute(f"DROP TABLE {quote(TABLE)}")
+        cursor.execute(f"ALTER TABLE {quote(new_table)} RENAME TO {quote(TABLE)}")
+        cursor.execute(f"ALTER SEQUENCE {quote(f'{new_table}_id_seq')} RENAME TO {quote(f'{TABLE}_id_seq')}")
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), coalesce(max(id), 0) + 1, false) FROM {quote(TABLE)}", [TABLE]
+        )
+        key = ['id', PARTITION_KEY] if years is not None else ['id']
+        cursor.execute(
+            f"ALTER TABLE {quote(TABLE)} ADD CONSTRAINT {quote(f'{TABLE}_pkey')} PRIMARY KEY ({', '.join(map(quote, key))})"
+        )
+        for definition in indexes:
+            cursor.execute(definition)
+        for constraint, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {quote(TABLE)} ADD CONSTRAINT {quote(constraint)} {definition}")
+    analyze(connection)
+
+
+def partition_table(schema_editor):
+    """ Turns the EMI table into yearly partitions covering its rows and the years ahead. """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT extract(year FROM {_quote(schema_editor.connection, PARTITION_KEY)})::integer FROM {TABLE}"
+        )
+        years = {year for year, in cursor.fetchall()}
+    _rebuild(schema_editor, years | set(years_ahead()))
+
+
+def unpartition_table(schema_editor):
+    """ Back to a plain table; rows of detached partitions are not brought back. """
+    _rebuild(schema_editor)
@@ -1,6 +1,8 @@
 # loanapp/serializers.py
 from rest_framework import serializers
-from .models import LoanApplication, Nominee, EMISchedule
+from .models import LoanApplication, Nominee, EMISchedule, LOAN_DETAIL_RELATIONS
+from core.fieldsets import SparseFieldsetSerializerMixin
+from core.money import MoneyField
 from applicants.models import Applicant  # Assuming 'applicants.Applicant.all_objects' exists if you have a custom manager
 from decimal import Decimal
 
@@ -11,12 +13,12 @@ class NomineeSerializer(serializers.ModelSerializer):
         exclude = ['loan_application']
 
 class EMIScheduleSerializer(serializers.ModelSerializer):
-    paymentAmount = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, default=Decimal('0.00'))
-    pendingAmount = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, default=Decimal('0.00'))
-    interest = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, default=Decimal('0.00'))
-    principalPaid = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, default=Decimal('0.00'))
-    remainingBalance = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, default=Decimal('0.00'))
-    emiTotalMonth = serializers.DecimalField(max_digits=10, decimal_places=2, required=True) # This should align with your model (DecimalField)
+    paymentAmount = MoneyField(max_digits=10, required=False, default=Decimal('0.00'))
+    pendingAmount = MoneyField(max_digits=10, required=False, default=Decimal('0.00'))
+    interest = MoneyField(max_digits=10, required=False, default=Decimal('0.00'))
+    principalPaid = MoneyField(max_digits=10, required=False, default=Decimal('0.00'))
+    remainingBalance = MoneyField(max_digits=10, required=False, default=Decimal('0.00'))
+    emiTotalMonth = MoneyField(max_digits=10, required=True) # Stored as integer paise (core.money.PaiseField)
     
     payment_processed_by_username = serializers.CharField(source='payment_processed_by.username', read_only=True, allow_null=True)
     
@@ -35,7 +37,7 @@ class EMIScheduleSerializer(serializers.ModelSerializer):
         # However, the view logic is what matters for setting it.
         read_only_fields = ('payment_processed_by_username', 'payment_processed_at') 
 
-class LoanApplicationSerializer(serializers.ModelSerializer):
+class LoanApplicationSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     nominees = NomineeSerializer(many=True, read_only=True)
     emiSchedule = EMIScheduleSerializer(many=True, read_only=True)
 
@@ -62,13 +64,29 @@ class LoanApplicationSerializer(serializers.ModelSerializer):
             'admin_remarks',  'startDate',
             'status',
             'status_display', 
+            'total_scheduled', 'total_paid', 'outstanding_amount',
+            'next_due_month', 'next_due_date', 'overdue_installments',
             'nominees',
             'emiSchedule'
         ]
+        expandable_fields = LOAN_DETAIL_RELATIONS # Left out (and not prefetched) unless requested, see core.fieldsets
         read_only_fields = [
             'id', 
             'loanID', 
             'applicant_userID_display', 
             'LoanRegDate', 
-            'status_display'  
-        ]
\ No newline at end of file
+            'status_display',
+            'total_scheduled', 'total_paid', 'outstanding_amount',
+            'next_due_month', 'next_due_date', 'overdue_installments',
+        ]
+
+class EMIPaymentSerializer(serializers.Serializer):
+    """ Input for recording a payment against a single installment. """
+    emi_id = serializers.IntegerField(required=False)
+    month = serializers.IntegerField(required=False, min_value=1)
+    amount = MoneyField(max_digits=10, min_value=Decimal('0.00'))
+
+    def validate(self, data):
+        if data.get('emi_id') is None and data.get('month') is None:
+            raise serializers.ValidationError("Either 'emi_id' or 'month' is required.")
+        return data
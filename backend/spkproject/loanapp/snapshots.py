@@ -0,0 +1,89 @@
+# loanapp/snapshots.py
+"""
+Pre-rendered loan documents (LoanSnapshot) for validate-applicant.
+
+Loan writes in LoanApplicationViewSet re-render the snapshot inside their own
+transaction, from the instance they already loaded for the response. Other writes
+(bulk status updates, the admin, schedule rebuilds) only move the loan's version;
+the stale snapshot is then re-rendered by the next lookup, or ahead of time by
+`manage.py refresh_loan_snapshots`.
+
+Snapshots are rendered without a request, so file URLs in them are relative to the
+site root; absolute_file_urls() qualifies them for the request they are served to.
+"""
+import json
+import re
+
+from django.conf import settings
+from django.db import models
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .models import LoanApplication, LoanSnapshot, Nominee
+from .serializers import LoanApplicationSerializer
+
+
+def render_snapshot(loan):
+    """ JSON bytes of the full representation; nominees and EMIs should be prefetched. """
+    return JSONRenderer().render(LoanApplicationSerializer(loan, context={'request': None}).data)
+
+
+def save_snapshots(loans):
+    """ Renders and upserts the snapshots of these loans in one query. Returns {loan pk: body}. """
+    now = timezone.now()
+    snapshots = [
+        LoanSnapshot(loan_application_id=loan.pk, version=loan.version, body=render_snapshot(loan).decode('utf-8'), rendered_at=now)
+        for loan in loans
+    ]
+    LoanSnapshot.objects.bulk_create(
+        snapshots, update_conflicts=True,
+        unique_fields=['loan_application'], update_fields=['version', 'body', 'rendered_at'],
+    )
+    return {snapshot.loan_application_id: snapshot.body for snapshot in snapshots}
+
+
+def save_snapshot(loan):
+    return save_snapshots([loan])[loan.pk]
+
+
+def absolute_file_urls(body, request):
+    """
+    The snapshot `body` with its nominee file URLs made absolute for this request, as
+    the serializer renders them when it has the request.
+    """
+    file_fields = [field.name for field in Nominee._meta.fields if isinstance(field, models.FileField)]
+    # Compact JSONRenderer output: "field":"<MEDIA_URL>..."; other string values are left alone
+    pattern = re.compile('("(?:%s)":")%s' % ('|'.join(file_fields), re.escape(settings.MEDIA_URL)))
+    base = json.dumps(request.build_absolute_uri(settings.MEDIA_URL))[1:-1]
+    return pattern.sub(lambda match: match.group(1) + base, body)
+
+
+def stale_loans():
+    """ Loans without a snapshot of their current version. """
+    return LoanApplication.objects.filter(Q(snapshot__isnull=True) | ~Q(snapshot__version=F('version')))
+
+
+def get_snapshot(loan_pk):
+    """
+    (loan status, loanID, JSON body) for a loan, re-rendering its snapshot first if it is
+    missing or stale; None if the loan does not exist. One query when the snapshot is current.
+    """
+    row = LoanApplication.objects.filter(pk=loan_pk).values(
+        'version', 'status', 'loanID', 'snapshot__version', 'snapshot__body'
+    ).first()
+    if row is None:
+        return None
+    if row['snapshot__version'] == row['version']:
+        return row['status'], row['loanID'], row['snapshot__body']
+
+    loan = LoanApplication.objects.with_details().filter(pk=loan_pk).first()
+    if loan is None:
+        return None
+    return loan.status, loan.loanID, save_snapshot(loan)
+
+
+def render_with_snapshot(payload, key, body):
+    """ JSON bytes of `payload` with the pre-rendered `body` spliced in under `key`. """
+    envelope = JSONRenderer().render(payload)
+    return b''.join([envelope[:-1], b',' if payload else b'', JSONRenderer().render(key), b':', body.encode('utf-8'), b'}'])
@@ -1,3 +1,862 @@
-from django.test import TestCase
+import json
+import threading
+from io import StringIO
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F, Sum
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from applicants.models import Applicant
+from core.models import IdSequence
+from core.money import paise, to_paise
+from . import partitions
+from .archive import archive_closed_loans
+from .models import BALANCE_SUMMARY_FIELDS, ArchivedLoan, LoanApplication, Nominee, EMISchedule
+from .amortization import INTEREST_TYPE_FLAT, build_emi_schedule, build_emi_schedules
+from .serializers import LoanApplicationSerializer
+
+LOANS_URL = '/api/loan-applications/loan-applications/'
+
+
+class LoanTestCase(TestCase):
+    """ A superuser client, a staff user who processes payments and three applicants to hang loans on. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('budget-admin', 'budget-admin@example.com', 'pass')
+        cls.processor = User.objects.create_user('budget-staff', 'budget-staff@example.com', 'pass')
+        cls.applicants = [
+            Applicant.objects.create(
+                first_name=f'Budget{i}', last_name='Test', email=f'budget{i}@example.com', phone=f'90000000{i:02d}',
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear() # Response caches (loanapp.cache) outlive each test's rolled back rows
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _make_loan(self, applicant, status='ACTIVE', term=6, nominees=2):
+        loan = LoanApplication.objects.create(
+            applicant_record=applicant, first_name=applicant.first_name, phone=applicant.phone,
+            amount=Decimal('12000.00'), term=term, termType='months', interestRate=Decimal('2'),
+            purpose='Business', repaymentSource='Salary', agreeTerms=True, agreeCreditCheck=True,
+            agreeDataSharing=True, startDate=date(2024, 1, 10), status=status,
+        )
+        Nominee.objects.bulk_create([
+            Nominee(loan_application=loan, name=f'Nominee {i}', phone='9000000000', relationship='Sibling',
+                    address='Street', idProofType='Aadhar', idProofNumber=f'N{i}')
+            for i in range(nominees)
+        ])
+        emis = build_emi_schedule(loan)
+        for emi in emis[:2]:
+            emi.paymentAmount = emi.emiTotalMonth
+            emi.pendingAmount = Decimal('0.00')
+            emi.payment_processed_by = self.processor
+        EMISchedule.objects.bulk_create(emis)
+        loan.refresh_balance_summary()
+        return loan
+
+    def _emi_payload(self, loan):
+        return [
+            {
+                'id': emi.id, 'month': emi.month, 'emiStartDate': emi.emiStartDate.isoformat(),
+                'emiTotalMonth': str(emi.emiTotalMonth), 'interest': str(emi.interest),
+                'principalPaid': str(emi.principalPaid), 'remainingBalance': str(emi.remainingBalance),
+                'paymentAmount': str(emi.emiTotalMonth), 'pendingAmount': '0.00',
+            }
+            for emi in loan.emiSchedule.order_by('month')
+        ]
+
+    def _create_payload(self, applicant, nominees):
+        return {
+            'applicant_record': str(applicant.userID), 'first_name': applicant.first_name, 'phone': applicant.phone,
+            'amount': '10000.00', 'term': 12, 'termType': 'months', 'interestRate': '2',
+            'purpose': 'Business', 'repaymentSource': 'Salary', 'agreeTerms': True, 'agreeCreditCheck': True,
+            'agreeDataSharing': True, 'startDate': '2024-01-10', 'status': 'PENDING',
+            'nominees_payload': json.dumps([
+                {'name': f'Nominee {i}', 'phone': '9000000000', 'relationship': 'Sibling', 'address': 'Street',
+                 'idProofType': 'Aadhar', 'idProofNumber': f'N{i}'}
+                for i in range(nominees)
+            ]),
+        }
+
+
+class LoanApplicationQueryBudgetTests(LoanTestCase):
+    """
+    LoanApplicationViewSet must run a fixed number of queries per request, however many
+    loans, nominees and EMIs are involved. Budgets are for a superuser (no group lookups)
+    and are documented on the viewset; update both together.
+    """
+
+    def test_list_budget_does_not_grow_with_rows(self):
+        self._make_loan(self.applicants[0])
+        with self.assertNumQueries(3):
+            response = self.client.get(LOANS_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+
+        self._make_loan(self.applicants[1], term=12, nominees=3)
+        self._make_loan(self.applicants[2], term=24, nominees=1)
+        with self.assertNumQueries(3):
+            response = self.client.get(LOANS_URL)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(response.data['results'][0]['emiSchedule'][0]['payment_processed_by_username'], 'budget-staff')
+
+    def test_list_keyset_pages_are_stable(self):
+        # Same LoanRegDate for every loan, so the id tiebreaker decides page boundaries
+        loans = [self._make_loan(applicant, nominees=1) for applicant in self.applicants]
+        expected = [loan.pk for loan in sorted(loans, key=lambda loan: loan.pk, reverse=True)]
+
+        with self.assertNumQueries(3):
+            first = self.client.get(LOANS_URL, {'page_size': 2})
+        self.assertEqual([row['id'] for row in first.data['results']], expected[:2])
+        self.assertIsNone(first.data['previous'])
+
+        second = self.client.get(first.data['next'])
+        self.assertEqual([row['id'] for row in second.data['results']], expected[2:])
+        self.assertIsNone(second.data['next'])
+
+        back = self.client.get(second.data['previous'])
+        self.assertEqual([row['id'] for row in back.data['results']], expected[:2])
+        self.assertEqual(self.client.get(f'{LOANS_URL}?cursor=bogus').status_code, 404)
+
+    def test_retrieve_budget(self):
+        loan = self._make_loan(self.applicants[0], term=24, nominees=3)
+        with self.assertNumQueries(3):
+            response = self.client.get(f'{LOANS_URL}{loan.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['month'] for row in response.data['emiSchedule']], list(range(1, 25)))
+        # Repeat: only the loan row itself (permissions, ETag), the body comes from the cache
+        with self.assertNumQueries(1):
+            repeat = self.client.get(f'{LOANS_URL}{loan.pk}/')
+        self.assertEqual(repeat.data, response.data)
+
+    def test_create_budget_does_not_grow_with_nominees_or_emis(self):
+        with self.assertNumQueries(13):
+            response = self.client.post(LOANS_URL, self._create_payload(self.applicants[0], 1), format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(len(response.data['nominees']), 1)
+        self.assertEqual(len(response.data['emiSchedule']), 12)
+
+        with self.assertNumQueries(13):
+            response = self.client.post(LOANS_URL, self._create_payload(self.applicants[1], 4), format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(len(response.data['nominees']), 4)
+        self.assertEqual(Decimal(response.data['total_scheduled']), sum(
+            Decimal(row['emiTotalMonth']) for row in response.data['emiSchedule']
+        ))
+
+    def test_update_budget_does_not_grow_with_emis(self):
+        for applicant, term in ((self.applicants[0], 6), (self.applicants[1], 24)):
+            loan = self._make_loan(applicant, term=term)
+            payload = {'remarks': 'Paid in full', 'emiSchedule': self._emi_payload(loan)}
+            with self.assertNumQueries(15):
+                response = self.client.patch(f'{LOANS_URL}{loan.pk}/', payload, format='json')
+            self.assertEqual(response.status_code, 200, response.data)
+            self.assertEqual(response.data['status'], 'PAID')
+            self.assertEqual(response.data['remarks'], 'Paid in full')
+            self.assertEqual(Decimal(response.data['outstanding_amount']), Decimal('0.00'))
+
+    def test_update_without_schedule_does_not_reload(self):
+        loan = self._make_loan(self.applicants[0], term=12)
+        with self.assertNumQueries(8):
+            response = self.client.patch(f'{LOANS_URL}{loan.pk}/', {'remarks': 'Checked'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(len(response.data['emiSchedule']), 12)
+
+    def test_validate_applicant_budget(self):
+        loan = self._make_loan(self.applicants[0], term=24, nominees=3)
+        url = f'{LOANS_URL}validate-applicant/'
+        payload = {'first_name': self.applicants[0].first_name.lower(), 'phone': self.applicants[0].phone}
+        # Created outside the views, so there is no snapshot yet: lookup, loan, render (3), upsert
+        with self.assertNumQueries(6):
+            response = self.client.post(url, payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['actionable_payment'])
+        self.assertEqual(len(data['application']['emiSchedule']), 24)
+        self.assertEqual(data['application']['id'], loan.pk)
+
+        # Repeat lookups at the payment counter never reach the database
+        with self.assertNumQueries(0):
+            repeat = self.client.post(url, payload, format='json')
+        self.assertEqual(repeat.json(), data)
+
+        # A payment re-renders the snapshot in its own transaction; the next lookup just reads it
+        self.client.post(f'{LOANS_URL}{loan.pk}/payments/', {'month': 24, 'amount': '100.00'}, format='json')
+        with self.assertNumQueries(2):
+            response = self.client.post(url, payload, format='json')
+        self.assertEqual(
+            Decimal(response.json()['application']['total_paid']),
+            Decimal(data['application']['total_paid']) + Decimal('100.00'),
+        )
+
+        # Bulk updates only move the version; the stale snapshot is re-rendered on read
+        LoanApplication.objects.filter(pk=loan.pk).update(status='OVERDUE', version=F('version') + 1)
+        cache.clear()
+        self.assertEqual(self.client.post(url, payload, format='json').json()['application']['status'], 'OVERDUE')
+
+
+class LoanSnapshotTests(LoanTestCase):
+    """ Stored loan snapshots (loanapp.snapshots) and the single transaction that keeps them in step with the loan. """
+
+    def test_snapshot_file_urls_are_absolute(self):
+        loan = self._make_loan(self.applicants[2], nominees=1)
+        loan.nominees.update(profile_photo='uploads/images/nominee/photo.jpg')
+        LoanApplication.objects.filter(pk=loan.pk).update(remarks='/media/typed by hand', version=F('version') + 1)
+        retrieved = self.client.get(f'{LOANS_URL}{loan.pk}/').data
+        self.assertEqual(retrieved['nominees'][0]['profile_photo'], 'http://testserver/media/uploads/images/nominee/photo.jpg')
+
+        # The snapshot is rendered without a request; serving it qualifies the URLs as retrieve does
+        payload = {'first_name': self.applicants[2].first_name, 'phone': self.applicants[2].phone}
+        application = self.client.post(f'{LOANS_URL}validate-applicant/', payload, format='json').json()['application']
+        self.assertEqual(application['nominees'], json.loads(json.dumps(retrieved['nominees'])))
+        self.assertEqual(application['remarks'], '/media/typed by hand')
+        self.assertIsNone(application['nominees'][0]['id_proof_file'])
+
+    def test_rejected_update_writes_nothing(self):
+        loan = self._make_loan(self.applicants[0], term=6)
+        url = f'{LOANS_URL}{loan.pk}/'
+        self.assertEqual(self.client.patch(url, {'remarks': 'Checked'}, format='json').status_code, 200)
+        stored = LoanApplication.objects.values('remarks', 'version', 'snapshot__version', 'snapshot__body').get(pk=loan.pk)
+
+        # The loan fields are valid; the nominees or EMIs sent with them are not
+        invalid_nominees = json.dumps([{'name': 'No phone'}])
+        invalid_emis = self._emi_payload(loan)
+        del invalid_emis[0]['emiTotalMonth']
+        for payload in ({'nominees_payload': invalid_nominees}, {'emiSchedule': invalid_emis}):
+            response = self.client.patch(url, dict(payload, remarks='Rejected'), format='json')
+            self.assertEqual(response.status_code, 400, payload)
+            self.assertEqual(
+                LoanApplication.objects.values('remarks', 'version', 'snapshot__version', 'snapshot__body').get(pk=loan.pk),
+                stored,
+            )
+
+        # A failure while writing the schedule rolls back the loan save before it
+        with mock.patch('loanapp.views.LoanApplicationViewSet._sync_emi_schedule', side_effect=DatabaseError):
+            response = self.client.patch(url, {'remarks': 'Rejected', 'emiSchedule': self._emi_payload(loan)}, format='json')
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(
+            LoanApplication.objects.values('remarks', 'version', 'snapshot__version', 'snapshot__body').get(pk=loan.pk),
+            stored,
+        )
+        self.assertEqual(loan.nominees.count(), 2)
+
+
+class LoanPhoneNormalizationTests(LoanTestCase):
+    """ Loan phone numbers are stored and looked up in one normalized form (core.fields.PhoneNumberField). """
+
+    def test_phone_numbers_are_normalized(self):
+        loan = self._make_loan(self.applicants[1])
+        loan.phone = '+91 90000-00001'
+        loan.save()
+        self.assertEqual(loan.phone, '9000000001')
+        self.assertEqual(LoanApplication.objects.get(pk=loan.pk).phone, '9000000001')
+
+        # Lookups normalize too, whatever format the counter types in
+        response = self.client.post(
+            f'{LOANS_URL}validate-applicant/', {'first_name': 'BUDGET1', 'phone': '090000 00001'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['application']['id'], loan.pk)
+        self.assertEqual(self.client.get(LOANS_URL, {'phone': '+919000000001'}).data['results'][0]['id'], loan.pk)
+
+
+class LoanListFieldsetTests(LoanTestCase):
+    """ Sparse fieldsets (?fields= / ?expand=) and ?view=compact on the loan list (core.fieldsets). """
+
+    def test_sparse_fieldsets_skip_nested_queries(self):
+        for applicant in self.applicants:
+            self._make_loan(applicant)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(LOANS_URL, {'fields': 'id,loanID,status'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'loanID', 'status'})
+
+        with self.assertNumQueries(2):
+            response = self.client.get(LOANS_URL, {'fields': 'id', 'expand': 'nominees'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'nominees'})
+        self.assertEqual(len(response.data['results'][0]['nominees']), 2)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(LOANS_URL, {'expand': 'emiSchedule'})
+        self.assertNotIn('nominees', response.data['results'][0])
+        self.assertIn('outstanding_amount', response.data['results'][0])
+
+    def test_compact_list_is_one_query(self):
+        for applicant in self.applicants:
+            self._make_loan(applicant)
+        with self.assertNumQueries(1):
+            response = self.client.get(LOANS_URL, {'view': 'compact', 'page_size': 2})
+        row = response.data['results'][0]
+        self.assertEqual(row['applicant_record'], self.applicants[2].userID)
+        self.assertEqual(row['amount'], '12000.00')
+        self.assertNotIn('nominees', row)
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(
+            set(self.client.get(LOANS_URL, {'view': 'compact', 'fields': 'loanID,status'}).data['results'][0]),
+            {'loanID', 'status', 'LoanRegDate', 'id'},  # Sort keys always come along for the cursor
+        )
+
+
+class LoanConditionalRequestTests(LoanTestCase):
+    """ Loan ETags (core.conditional): 304 on If-None-Match, 412 on a stale If-Match, and what moves them. """
+
+    def test_conditional_retrieve_and_update(self):
+        loan = self._make_loan(self.applicants[0])
+        url = f'{LOANS_URL}{loan.pk}/'
+        etag = self.client.get(url)['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # A payment changes an EMI only, yet the loan's ETag must move
+        self.client.post(f'{url}payments/', {'month': 3, 'amount': '100.00'}, format='json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        stale = self.client.patch(url, {'remarks': 'Late'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(stale.status_code, 412)
+        fresh = self.client.patch(url, {'remarks': 'Late'}, format='json', HTTP_IF_MATCH=response['ETag'])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=fresh['ETag']).status_code, 304)
+
+    def test_direct_child_writes_move_the_etag(self):
+        # Admin edits, shell fixes: nominee / EMI rows saved or deleted outside the loan views
+        loan = self._make_loan(self.applicants[0])
+        url = f'{LOANS_URL}{loan.pk}/'
+        emi = loan.emiSchedule.get(month=3)
+        emi.paymentAmount = Decimal('100.00')
+        nominee = loan.nominees.first()
+        for write in (emi.save, nominee.delete, emi.delete):
+            etag = self.client.get(url)['ETag']
+            write()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data['nominees']), 1)
+        self.assertNotIn(3, [row['month'] for row in response.data['emiSchedule']])
+
+
+class MoneyStorageTests(LoanTestCase):
+    """ Amounts stored as integer paise (core.money) while the API keeps rupees. """
+
+    def test_money_is_stored_as_integer_paise(self):
+        loan = self._make_loan(self.applicants[0], term=12)
+        loan.refresh_from_db()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT amount, total_scheduled FROM loanapp_loanapplication WHERE id = %s', [loan.pk])
+            self.assertEqual(cursor.fetchone(), (1200000, to_paise(loan.total_scheduled)))
+        self.assertEqual(str(loan.amount), '12000.00')
+
+        # Raw integers for array math, adding up to what the Decimal side sees
+        emi_paise = list(loan.emiSchedule.order_by('month').values_list(paise('emiTotalMonth'), flat=True))
+        self.assertTrue(all(isinstance(value, int) for value in emi_paise))
+        self.assertEqual(sum(emi_paise), to_paise(loan.total_scheduled))
+        self.assertEqual(loan.emiSchedule.aggregate(total=Sum('emiTotalMonth'))['total'], loan.total_scheduled)
+        self.assertTrue(LoanApplication.objects.filter(pk=loan.pk, outstanding_amount__gte=Decimal('0.01')).exists())
+
+        # The API keeps two-decimal rupees and the old max_digits bound
+        self.assertEqual(self.client.get(f'{LOANS_URL}{loan.pk}/').data['amount'], '12000.00')
+        serializer = LoanApplicationSerializer(loan, data={'amount': '100000000.00'}, partial=True)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('amount', serializer.errors)
+
+
+class LoanArchiveTests(LoanTestCase):
+    """ Closed loans moving to ArchivedLoan (loanapp.archive) and back. """
+
+    def test_closed_loans_archive_and_restore(self):
+        closed = self._make_loan(self.applicants[1], status='PAID')
+        active = self._make_loan(self.applicants[2])
+        closed.nominees.update(id_proof_file='uploads/images/nominee/idprooffile/proof.pdf')
+        closed.touch()
+        detail = self.client.get(f'{LOANS_URL}{closed.pk}/').json()
+        LoanApplication.objects.filter(pk__in=[closed.pk, active.pk]).update(updated_at=timezone.now() - timedelta(days=400))
+
+        self.assertEqual(archive_closed_loans(), 1)
+        self.assertFalse(LoanApplication.objects.filter(pk=closed.pk).exists())
+        self.assertFalse(EMISchedule.objects.filter(loan_application_id=closed.pk).exists())
+        self.assertTrue(LoanApplication.objects.filter(pk=active.pk).exists())
+
+        # retrieve falls back to the archived rendering with one query for the archive row
+        with self.assertNumQueries(2):
+            response = self.client.get(f'{LOANS_URL}{closed.pk}/')
+        self.assertEqual(response.status_code, 200)
+        archived = json.loads(response.content)
+        self.assertEqual((archived['loanID'], len(archived['emiSchedule'])), (detail['loanID'], len(detail['emiSchedule'])))
+        self.assertEqual(archived['nominees'], detail['nominees']) # Media URLs absolute, as on the live loan
+        self.assertEqual(self.client.get(f'{LOANS_URL}{closed.pk}/', {'fields': 'id,status'}).json(), {'id': closed.pk, 'status': 'PAID'})
+
+        response = self.client.post(f'{LOANS_URL}{closed.pk}/restore-archived/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ArchivedLoan.objects.exists())
+        restored = LoanApplication.objects.get(pk=closed.pk)
+        self.assertEqual((restored.LoanRegDate, restored.version), (closed.LoanRegDate, closed.version))
+        self.assertEqual(restored.emiSchedule.count(), len(detail['emiSchedule']))
+
+
+@skipUnless(connection.vendor == 'postgresql', "Range partitioning is PostgreSQL only")
+class EMIPartitionTests(LoanTestCase):
+    """ Yearly partitions of the EMI schedule (loanapp.partitions), PostgreSQL only. """
+
+    def test_emi_schedule_is_partitioned_by_due_year(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE') # Deferred FK checks of this test's rows would block ALTER TABLE
+        if not partitions.is_partitioned(): # Test database built without migrations: run 0016's conversion
+            with connection.schema_editor() as schema_editor:
+                partitions.partition_table(schema_editor)
+        loan = self._make_loan(self.applicants[0], status='PAID', term=24) # Due dates 2024-02 .. 2026-01
+
+        def placement():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT tableoid::regclass::text, count(*) FROM loanapp_emischedule WHERE loan_application_id = %s GROUP BY 1',
+                    [loan.pk],
+                )
+                return dict(cursor.fetchall())
+
+        # The years before the migration's partitions wait in the default partition
+        self.assertEqual(placement(), {partitions.DEFAULT_PARTITION: 23, partitions.partition_name(2026): 1})
+        self.assertEqual(partitions.create_partitions([2024, 2025, 2026]), [partitions.partition_name(2024), partitions.partition_name(2025)])
+        self.assertEqual(placement(), {partitions.partition_name(2024): 11, partitions.partition_name(2025): 12, partitions.partition_name(2026): 1})
+
+        # Due-date ranges only read the partitions of their years
+        sql, params = EMISchedule.objects.filter(emiStartDate__range=(date(2025, 3, 1), date(2025, 3, 31))).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {sql}', params)
+            plan = ' '.join(line for line, in cursor.fetchall())
+        self.assertIn(partitions.partition_name(2025), plan)
+        self.assertNotIn(partitions.partition_name(2024), plan)
+
+        partitions.detach_partition(2024)
+        self.assertEqual(loan.emiSchedule.count(), 13)
+        partitions.attach_partition(2024)
+        self.assertEqual(loan.emiSchedule.count(), 24)
+
+
+class EMIScheduleEngineTests(SimpleTestCase):
+    """ loanapp.amortization against schedules worked out by hand. """
+
+    def _loan(self, amount='1000.00', term=3, rate=2, start=date(2024, 1, 10)):
+        return LoanApplication(amount=Decimal(amount), term=term, termType='months', interestRate=rate, startDate=start)
+
+    def _rows(self, emis, *field_names):
+        return [tuple(str(getattr(emi, name)) for name in field_names) for emi in emis]
+
+    def test_first_due_date_is_the_5th_of_next_month(self):
+        emis = build_emi_schedule(self._loan(start=date(2024, 1, 10)))
+        self.assertEqual([emi.emiStartDate for emi in emis], [date(2024, 2, 5), date(2024, 3, 5), date(2024, 4, 5)])
+        self.assertEqual([emi.month for emi in emis], [1, 2, 3])
+        # The 28th still counts as an early start
+        self.assertEqual(build_emi_schedule(self._loan(start=date(2024, 2, 28)))[0].emiStartDate, date(2024, 3, 5))
+
+    def test_starts_after_the_28th_skip_a_month(self):
+        schedules = build_emi_schedules([
+            self._loan(start=date(2024, 1, 29)), self._loan(start=date(2024, 12, 31), term=2),
+        ])
+        self.assertEqual([emi.emiStartDate for emi in schedules[0]], [date(2024, 3, 5), date(2024, 4, 5), date(2024, 5, 5)])
+        self.assertEqual([emi.emiStartDate for emi in schedules[1]], [date(2025, 2, 5), date(2025, 3, 5)])
+
+    def test_diminishing_interest(self):
+        # 1000.00 over 3: principal 333.33 / 333.33 / 333.34, 2% of the opening balance
+        # (1000.00, 666.67, 333.34) each month
+        emis = build_emi_schedule(self._loan())
+        self.assertEqual(self._rows(emis, 'principalPaid', 'interest', 'emiTotalMonth', 'remainingBalance', 'pendingAmount'), [
+            ('333.33', '20.00', '353.33', '666.67', '353.33'),
+            ('333.33', '13.33', '346.66', '333.34', '346.66'),
+            ('333.34', '6.67', '340.01', '0.00', '340.01'),
+        ])
+
+    def test_flat_interest(self):
+        # Total interest of the diminishing plan, 1000.00 * 2% * (3 + 1) / 2 = 40.00,
+        # spread evenly with the remainder paisa in the last installment
+        emis = build_emi_schedule(self._loan(), interest_type=INTEREST_TYPE_FLAT)
+        self.assertEqual(self._rows(emis, 'principalPaid', 'interest', 'emiTotalMonth', 'remainingBalance'), [
+            ('333.33', '13.33', '346.66', '666.67'),
+            ('333.33', '13.33', '346.66', '333.34'),
+            ('333.34', '13.34', '346.68', '0.00'),
+        ])
+
+    def test_remainders_go_to_the_last_installment(self):
+        emis = build_emi_schedule(self._loan(amount='100.00', term=7, rate=0))
+        self.assertEqual([str(emi.principalPaid) for emi in emis], ['14.28'] * 6 + ['14.32'])
+        self.assertEqual(sum(emi.principalPaid for emi in emis), Decimal('100.00'))
+        self.assertEqual(emis[-1].remainingBalance, Decimal('0.00'))
+
+    def test_interest_rounds_half_up_on_paise(self):
+        # 0.7% of 25.00 is exactly 17.5 paise; float math makes it 17.4999... and rounds down
+        self.assertEqual(build_emi_schedule(self._loan(amount='25.00', term=1, rate=0.7))[0].interest, Decimal('0.18'))
+        # 1.5% of 0.10 is 0.15 paise: rounds to nothing
+        self.assertEqual(build_emi_schedule(self._loan(amount='0.10', term=1, rate=1.5))[0].interest, Decimal('0.00'))
+        flat = build_emi_schedule(self._loan(amount='25.00', term=1, rate=0.7), interest_type=INTEREST_TYPE_FLAT)
+        self.assertEqual(flat[0].interest, Decimal('0.18'))
+
+
+class LoanCreateTests(LoanTestCase):
+    """ perform_create: the loan, its nominees and its EMIs are written all together or not at all. """
+
+    def _assert_nothing_written(self):
+        self.assertFalse(LoanApplication.objects.exists())
+        self.assertFalse(Nominee.objects.exists())
+        self.assertFalse(EMISchedule.objects.exists())
+
+    def test_invalid_rows_fail_with_one_report(self):
+        payload = self._create_payload(self.applicants[0], 3)
+        nominees = json.loads(payload['nominees_payload'])
+        del nominees[1]['name']
+        nominees[2]['email'] = 'not-an-email'
+        payload['nominees_payload'] = json.dumps(nominees)
+        payload['emi_schedule_payload'] = json.dumps([
+            {'month': 1, 'emiStartDate': '2024-02-05', 'emiTotalMonth': '900.00'},
+            {'month': 2, 'emiStartDate': 'soon', 'emiTotalMonth': '900.00'},
+            {'month': 3, 'emiStartDate': '2024-04-05'},
+        ])
+
+        response = self.client.post(LOANS_URL, payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        # Every bad row is reported, at its index, in the one response
+        self.assertEqual([sorted(errors) for errors in response.data['nominees']], [[], ['name'], ['email']])
+        self.assertEqual([sorted(errors) for errors in response.data['emiSchedule']], [[], ['emiStartDate'], ['emiTotalMonth']])
+        self._assert_nothing_written()
+
+        payload['emi_schedule_payload'] = 'not json'
+        response = self.client.post(LOANS_URL, payload, format='json')
+        self.assertEqual(set(response.data), {'nominees', 'emi_schedule_payload'})
+        self._assert_nothing_written()
+
+    def test_failed_write_rolls_back_the_loan(self):
+        # Valid payload, but the EMI insert fails after the loan and nominees were written
+        with mock.patch.object(EMISchedule.objects, 'bulk_create', side_effect=DatabaseError('insert failed')):
+            response = self.client.post(LOANS_URL, self._create_payload(self.applicants[0], 2), format='json')
+        self.assertEqual(response.status_code, 500)
+        self._assert_nothing_written()
+
+        response = self.client.post(LOANS_URL, self._create_payload(self.applicants[0], 2), format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((Nominee.objects.count(), EMISchedule.objects.count()), (2, 12))
+
+
+class LoanScheduleSyncTests(LoanTestCase):
+    """ PATCH with emiSchedule applies the incoming list to the stored rows as a diff (_sync_emi_schedule). """
+
+    def _stored_payload(self, loan):
+        """ The schedule as stored, i.e. a PATCH that changes nothing. """
+        return [
+            {
+                'id': emi.id, 'month': emi.month, 'emiStartDate': emi.emiStartDate.isoformat(),
+                'emiTotalMonth': str(emi.emiTotalMonth), 'interest': str(emi.interest),
+                'principalPaid': str(emi.principalPaid), 'remainingBalance': str(emi.remainingBalance),
+                'paymentAmount': str(emi.paymentAmount), 'pendingAmount': str(emi.pendingAmount),
+            }
+            for emi in loan.emiSchedule.order_by('month')
+        ]
+
+    def _rows_by_month(self, loan):
+        return {emi.month: emi for emi in loan.emiSchedule.all()}
+
+    def test_only_changed_rows_are_written(self):
+        loan = self._make_loan(self.applicants[0], term=6)
+        before = self._rows_by_month(loan)
+        payload = self._stored_payload(loan)
+        payload[2]['paymentAmount'] = payload[2]['emiTotalMonth'] # Month 3 paid
+        payload[2]['pendingAmount'] = '0.00'
+        payload[3]['pendingAmount'] = '1.00' # Month 4: a correction, not a payment
+        del payload[4]['id'] # Month 5 matched by its month instead
+
+        response = self.client.patch(f'{LOANS_URL}{loan.pk}/', {'emiSchedule': payload}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        after = self._rows_by_month(loan)
+
+        # Every row keeps its primary key; untouched rows are not written at all
+        self.assertEqual({month: emi.pk for month, emi in after.items()}, {month: emi.pk for month, emi in before.items()})
+        for month in (1, 2, 5, 6):
+            self.assertEqual(after[month].updated_at, before[month].updated_at, f'month {month}')
+        self.assertGreater(after[3].updated_at, before[3].updated_at)
+        self.assertGreater(after[4].updated_at, before[4].updated_at)
+
+        # Only a changed paymentAmount re-stamps who processed it, and when
+        self.assertEqual((after[3].payment_processed_by, after[3].paymentAmount), (self.user, after[3].emiTotalMonth))
+        self.assertIsNotNone(after[3].payment_processed_at)
+        self.assertEqual((after[4].pendingAmount, after[4].payment_processed_by), (Decimal('1.00'), None))
+        self.assertIsNone(after[4].payment_processed_at)
+        self.assertEqual(after[1].payment_processed_by, self.processor) # Sent unchanged: not taken over by the editor
+
+        # Clearing a payment clears its processor
+        payload[0]['paymentAmount'] = '0.00'
+        self.client.patch(f'{LOANS_URL}{loan.pk}/', {'emiSchedule': payload}, format='json')
+        self.assertIsNone(loan.emiSchedule.get(month=1).payment_processed_by)
+        self.assertEqual(loan.emiSchedule.get(month=2).payment_processed_by, self.processor)
+
+    def test_missing_rows_are_deleted_and_new_ones_inserted(self):
+        loan = self._make_loan(self.applicants[0], term=6)
+        before = self._rows_by_month(loan)
+        payload = self._stored_payload(loan)[:5] # Month 6 dropped
+        payload.append(dict(payload[-1], id=None, month=7, emiStartDate='2024-08-05', paymentAmount='50.00'))
+
+        response = self.client.patch(f'{LOANS_URL}{loan.pk}/', {'emiSchedule': payload}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        after = self._rows_by_month(loan)
+        self.assertEqual(sorted(after), [1, 2, 3, 4, 5, 7])
+        self.assertEqual({month: after[month].pk for month in range(1, 6)}, {month: before[month].pk for month in range(1, 6)})
+        self.assertNotIn(after[7].pk, {emi.pk for emi in before.values()})
+        self.assertEqual(after[7].payment_processed_by, self.user)
+
+
+class LoanPaymentTests(LoanTestCase):
+    """ POST /loan-applications/{pk}/payments/ (record_payment). """
+
+    def _pay(self, loan, **payload):
+        return self.client.post(f'{LOANS_URL}{loan.pk}/payments/', payload, format='json')
+
+    def test_payment_by_month_and_by_emi_id(self):
+        loan = self._make_loan(self.applicants[0], term=6)
+        month_3 = loan.emiSchedule.get(month=3)
+
+        response = self._pay(loan, month=3, amount='100.00')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['installment']['id'], month_3.pk)
+        self.assertEqual(Decimal(response.data['installment']['pendingAmount']), month_3.emiTotalMonth - Decimal('100.00'))
+        month_3.refresh_from_db()
+        self.assertEqual((month_3.paymentAmount, month_3.payment_processed_by), (Decimal('100.00'), self.user))
+
+        month_4 = loan.emiSchedule.get(month=4)
+        response = self._pay(loan, emi_id=month_4.pk, month=1, amount='50.00') # emi_id wins over month
+        self.assertEqual(response.data['installment']['month'], 4)
+
+        # The totals come from the refreshed balance summary
+        loan.refresh_from_db()
+        self.assertEqual(loan.total_paid, sum(emi.paymentAmount for emi in loan.emiSchedule.all()))
+        self.assertEqual(response.data['loan'], {
+            'id': loan.pk, 'loanID': loan.loanID, 'status': 'ACTIVE', 'status_display': 'Active / Ongoing',
+            'total_due': loan.total_scheduled, 'total_paid': loan.total_paid, 'outstanding': loan.outstanding_amount,
+        })
+
+        # A zero amount undoes the payment and its processor
+        self._pay(loan, month=3, amount='0.00')
+        month_3.refresh_from_db()
+        self.assertEqual((month_3.paymentAmount, month_3.payment_processed_by, month_3.payment_processed_at), (Decimal('0.00'), None, None))
+
+    def test_paying_the_last_installment_marks_the_loan_paid(self):
+        loan = self._make_loan(self.applicants[0], term=4) # Months 1 and 2 already paid
+        self._pay(loan, month=3, amount=str(loan.emiSchedule.get(month=3).emiTotalMonth))
+        last = loan.emiSchedule.get(month=4)
+        response = self._pay(loan, emi_id=last.pk, amount=str(last.emiTotalMonth))
+
+        self.assertEqual(response.data['loan']['status'], 'PAID')
+        self.assertEqual(response.data['loan']['total_paid'], response.data['loan']['total_due'])
+        self.assertEqual(response.data['loan']['outstanding'], Decimal('0.00'))
+        loan.refresh_from_db()
+        self.assertEqual(loan.status, 'PAID')
+        self.assertIn('Automatically marked as PAID', loan.admin_remarks)
+
+    def test_invalid_payments(self):
+        loan = self._make_loan(self.applicants[0], term=6)
+        self.assertEqual(set(self._pay(loan, amount='10.00').data), {'non_field_errors'}) # Neither emi_id nor month
+        self.assertEqual(set(self._pay(loan, month=3, amount='-1.00').data), {'amount'})
+        self.assertEqual(set(self._pay(loan, month=0, amount='1.00').data), {'month'})
+        self.assertEqual(self._pay(loan, month=3).status_code, 400)
+        self.assertEqual(self._pay(loan, month=99, amount='1.00').status_code, 404)
+        other = self._make_loan(self.applicants[1], term=6)
+        self.assertEqual(self._pay(loan, emi_id=other.emiSchedule.first().pk, amount='1.00').status_code, 404)
+        for bad_pk in ('abc', other.pk + 1000):
+            response = self.client.post(f'{LOANS_URL}{bad_pk}/payments/', {'month': 3, 'amount': '1.00'}, format='json')
+            self.assertEqual(response.status_code, 404, bad_pk)
+
+        # Only loans that are running take payments
+        pending = self._make_loan(self.applicants[2], status='PENDING', term=6)
+        response = self._pay(pending, month=3, amount='10.00')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Pending Approval', response.data['detail'])
+        self.assertEqual(pending.emiSchedule.get(month=3).paymentAmount, Decimal('0.00'))
+
+
+class LoanBalanceSummaryTests(LoanTestCase):
+    """ The denormalized balance summary on LoanApplication (refresh_balance_summary). """
+
+    def _pay(self, loan, month, amount):
+        loan.emiSchedule.filter(month=month).update(paymentAmount=Decimal(amount))
+        loan.refresh_balance_summary()
+
+    def test_outstanding_amount_is_principal_not_yet_repaid(self):
+        # 12000.00 over 6 at 2%: 2000.00 principal per month, months 1 and 2 paid in full
+        loan = self._make_loan(self.applicants[0], term=6)
+        self.assertEqual((loan.total_scheduled, loan.outstanding_amount), (Decimal('12840.00'), Decimal('8000.00')))
+
+        # Month 3 owes 160.00 interest (2% of 8000.00): it is covered first, the rest repays principal
+        self._pay(loan, 3, '1160.00')
+        self.assertEqual(loan.outstanding_amount, Decimal('7000.00'))
+        self._pay(loan, 4, '100.00') # Less than the interest due: no principal repaid
+        self.assertEqual(loan.outstanding_amount, Decimal('7000.00'))
+        self._pay(loan, 3, '9999.00') # Overpaying one installment repays only its own principal
+        self.assertEqual(loan.outstanding_amount, Decimal('6000.00'))
+        self.assertEqual(loan.total_paid, sum(emi.paymentAmount for emi in loan.emiSchedule.all()))
+        self.assertEqual((loan.next_due_month, loan.overdue_installments), (4, 3))
+
+        for month in range(4, 7):
+            self._pay(loan, month, str(loan.emiSchedule.get(month=month).emiTotalMonth))
+        loan.refresh_from_db()
+        self.assertEqual((loan.outstanding_amount, loan.next_due_month, loan.overdue_installments), (Decimal('0.00'), None, 0))
+
+    def test_rebuild_matches_incremental_summary(self):
+        loans = [self._make_loan(applicant, term=term) for applicant, term in zip(self.applicants, (3, 6, 12))]
+        self._pay(loans[1], 3, '500.00')
+        expected = {loan.pk: [str(getattr(loan, name)) for name in BALANCE_SUMMARY_FIELDS] for loan in loans}
+        LoanApplication.objects.update(total_scheduled=0, total_paid=0, outstanding_amount=0, next_due_month=None)
+
+        self.assertEqual(LoanApplication.objects.refresh_balance_summaries(batch_size=2), 3)
+        for loan in LoanApplication.objects.all():
+            self.assertEqual([str(getattr(loan, name)) for name in BALANCE_SUMMARY_FIELDS], expected[loan.pk])
+
+
+@skipUnless(connection.vendor == 'postgresql', "Needs row locks (SELECT ... FOR UPDATE)")
+class LoanBalanceSummaryLockTests(TransactionTestCase):
+    """ Concurrent writers to one loan's EMIs, each in its own committed transaction. """
+
+    def test_concurrent_payments_both_reach_the_summary(self):
+        applicant = Applicant.objects.create(first_name='Lock', last_name='Test', email='lock@example.com', phone='9200000000')
+        loan = LoanApplication.objects.create(
+            applicant_record=applicant, first_name='Lock', phone=applicant.phone, amount=Decimal('6000.00'),
+            term=6, termType='months', interestRate=2, purpose='Business', repaymentSource='Salary',
+            startDate=date(2024, 1, 10), status='ACTIVE',
+        )
+        EMISchedule.objects.bulk_create(build_emi_schedule(loan))
+        loan.refresh_balance_summary()
+        first, second = loan.emiSchedule.filter(month__in=[1, 2]).order_by('month')
+        paid_second = threading.Event()
+
+        def pay_second():
+            try:
+                with transaction.atomic():
+                    EMISchedule.objects.filter(pk=second.pk).update(paymentAmount=second.emiTotalMonth)
+                    paid_second.set()
+                    LoanApplication.objects.get(pk=loan.pk).refresh_balance_summary()
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            EMISchedule.objects.filter(pk=first.pk).update(paymentAmount=first.emiTotalMonth)
+            loan.refresh_balance_summary()
+            other = threading.Thread(target=pay_second)
+            other.start()
+            self.assertTrue(paid_second.wait(5))
+            # Without the loan lock it would aggregate now, without the first payment,
+            # and write that stale total once this transaction commits
+            other.join(0.5)
+            self.assertTrue(other.is_alive())
+        other.join(5)
+
+        loan.refresh_from_db()
+        self.assertEqual(loan.total_paid, first.emiTotalMonth + second.emiTotalMonth)
+        self.assertEqual(loan.next_due_month, 3)
+
+
+class OverdueDetectionTests(LoanTestCase):
+    """ mark_overdue / cure_overdue / refresh_overdue_counts and the nightly mark_overdue_loans command. """
+
+    # _make_loan: EMIs due on the 5th from 2024-02-05, months 1 and 2 paid
+
+    def _state(self, loan):
+        loan.refresh_from_db()
+        return loan.status, loan.overdue_installments
+
+    def test_queryset_transitions(self):
+        loan = self._make_loan(self.applicants[0], term=6)
+        loans = LoanApplication.objects.filter(pk=loan.pk)
+
+        self.assertEqual(loans.mark_overdue(date(2024, 4, 5)), 0) # Month 3 is due today, not past due
+        self.assertEqual(loans.mark_overdue(date(2024, 4, 6)), 1)
+        self.assertEqual(self._state(loan)[0], 'OVERDUE')
+        version = loan.version
+        self.assertEqual(loans.refresh_overdue_counts(date(2024, 6, 6)), 1)
+        self.assertEqual(self._state(loan), ('OVERDUE', 3)) # Months 3, 4 and 5
+        self.assertEqual(loans.refresh_overdue_counts(date(2024, 6, 6)), 0) # Unchanged counts are not rewritten
+        self.assertEqual(self._state(loan), ('OVERDUE', 3))
+        self.assertEqual(loan.version, version + 1)
+
+        self.assertEqual(loans.cure_overdue(date(2024, 6, 6)), 0)
+        loan.emiSchedule.filter(month__in=[3, 4, 5]).update(paymentAmount=F('emiTotalMonth'))
+        self.assertEqual(loans.cure_overdue(date(2024, 6, 6)), 1)
+        self.assertEqual(loans.refresh_overdue_counts(date(2024, 6, 6)), 1)
+        self.assertEqual(self._state(loan), ('ACTIVE', 0))
+
+        # A payment short by one paisa still leaves the installment overdue
+        last = loan.emiSchedule.get(month=6)
+        loan.emiSchedule.filter(pk=last.pk).update(paymentAmount=last.emiTotalMonth - Decimal('0.01'))
+        self.assertEqual(loans.mark_overdue(date(2024, 7, 6)), 1)
+
+    def test_nightly_command(self):
+        overdue = self._make_loan(self.applicants[0], term=6)
+        cured = self._make_loan(self.applicants[1], status='OVERDUE', term=2) # Both EMIs paid
+        pending = self._make_loan(self.applicants[2], status='PENDING', term=6)
+        pending_state = self._state(pending), pending.version
+        out = StringIO()
+        call_command('mark_overdue_loans', '--date', '2024-05-06', '--chunk-size', '1', stdout=out)
+
+        self.assertIn('1 loans marked OVERDUE, 1 cured back to ACTIVE, 1 overdue counts refreshed', out.getvalue())
+        self.assertEqual(self._state(overdue), ('OVERDUE', 2))
+        self.assertEqual(self._state(cured), ('ACTIVE', 0))
+        self.assertEqual((self._state(pending), pending.version), pending_state) # Only running loans are checked
+
+        # The API shows the new status at once: the bulk UPDATEs drop the cached renderings
+        self.assertEqual(self.client.get(f'{LOANS_URL}{overdue.pk}/').data['status'], 'OVERDUE')
+
+
+class LoanIdTests(LoanTestCase):
+    """ loanID allocation through the core.id_allocator counter. """
+
+    def _pending_loan(self, applicant, loan_id=None):
+        loan = self._make_loan(applicant, status='PENDING', term=2, nominees=0)
+        if loan_id:
+            LoanApplication.objects.filter(pk=loan.pk).update(loanID=loan_id)
+        return loan
+
+    def test_counter_seeded_from_numeric_maximum(self):
+        # SPK999 sorts after SPK1000 as text; the seed compares the numbers
+        self._pending_loan(self.applicants[0], 'SPK999')
+        self._pending_loan(self.applicants[1], 'SPK1000')
+        self._pending_loan(self.applicants[1], 'SPKOLD') # Not a number, ignored
+        self.assertEqual(self._make_loan(self.applicants[2], term=2, nominees=0).loanID, 'SPK1001')
+
+        # Approval through save() takes the next number
+        loan = self._pending_loan(self.applicants[2])
+        loan.status = 'APPROVED'
+        loan.save()
+        self.assertEqual(loan.loanID, 'SPK1002')
+
+        # APPROVED -> ACTIVE is no new approval (FieldTrackerMixin compares with the loaded status)
+        loan = LoanApplication.objects.get(pk=loan.pk)
+        loan.status = 'ACTIVE'
+        self.assertEqual((loan.get_original('status'), loan.has_changed('status')), ('APPROVED', True))
+        loan.save()
+        self.assertFalse(loan.has_changed('status'))
+        self.assertEqual(LoanApplication.objects.get(pk=loan.pk).loanID, 'SPK1002')
+        self.assertEqual(IdSequence.objects.get(prefix='SPK').last_value, 1002)
+
+    def test_assign_loan_ids_in_one_block(self):
+        loans = [self._pending_loan(applicant) for applicant in self.applicants]
+        numbered = LoanApplication.objects.filter(pk=loans[0].pk)
+        numbered.assign_loan_ids()
+
+        # One SELECT, the block allocation, one bulk UPDATE and one version bump, however many loans
+        with self.assertNumQueries(6):
+            self.assertEqual(LoanApplication.objects.filter(pk__in=[loan.pk for loan in loans]).assign_loan_ids(), 2)
+        self.assertEqual(
+            list(LoanApplication.objects.filter(pk__in=[loan.pk for loan in loans]).order_by('pk').values_list('loanID', flat=True)),
+            ['SPK001', 'SPK002', 'SPK003'],
+        )
+        self.assertEqual(numbered.assign_loan_ids(), 0)
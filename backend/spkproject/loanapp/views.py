@@ -4,26 +4,78 @@ from rest_framework import viewsets, status, serializers
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.filters import OrderingFilter
 from django.db import transaction
+from django.db.models.functions import Lower
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from decimal import Decimal, InvalidOperation
+import hashlib
 import json
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone # Added timezone import
 
-from .models import LoanApplication, Nominee, EMISchedule
-from .serializers import LoanApplicationSerializer, EMIScheduleSerializer, NomineeSerializer
-from applicants.models import Applicant # Ensure this path is correct
+from .models import ArchivedLoan, LoanApplication, Nominee, EMISchedule
+from .serializers import LoanApplicationSerializer, EMIScheduleSerializer, NomineeSerializer, EMIPaymentSerializer
+from .amortization import build_emi_schedule, ScheduleError, INTEREST_TYPE_DIMINISHING
+from .archive import restore_loans
+from .snapshots import absolute_file_urls, get_snapshot, render_with_snapshot, save_snapshot
 from core.permissions import IsManagerUser, IsAdminUser # Ensure this path is correct
+from core.fieldsets import CompactListMixin, requested_relations, sparse_data
+from core.conditional import ConditionalRetrieveMixin
+from core.cache import request_variant
+from .cache import loan_detail_cache, loan_lookup_cache, lookup_ident
 
 logger = logging.getLogger(__name__)
 
-class LoanApplicationViewSet(viewsets.ModelViewSet):
+LOAN_STATUS_LABELS = dict(LoanApplication.LOAN_STATUS_CHOICES)
+
+class LoanApplicationViewSet(ConditionalRetrieveMixin, CompactListMixin, viewsets.ModelViewSet):
+    """
+    Query budget per request, independent of the number of loans, nominees or EMIs
+    (counted for a superuser; other roles add their group lookups):
+      list / retrieve ...................... 3  (loans + applicant, nominees, EMIs + processor)
+      validate-applicant ................... 2  (name/phone lookup, loan + snapshot; +4 to re-render a stale one)
+      create ............................... 13 (applicant, open-loan check, bulk inserts, locked summary, prefetch, snapshot)
+      update, loan fields only ............. 8  (loan + prefetches, transaction, UPDATE of dirty columns, new version, snapshot)
+      update with emiSchedule .............. 15 (adds EMI diff, locked summary, PAID flip, response prefetch)
+    Enforced by LoanApplicationQueryBudgetTests in loanapp/tests.py.
+
+    Reads accept ?fields= / ?expand= (nested nominees/emiSchedule are then only
+    prefetched when rendered) and list accepts ?view=compact; see core.fieldsets.
+    retrieve sends ETag/Last-Modified and answers If-None-Match with a one-query 304;
+    PUT/PATCH honour If-Match (412 when stale); see core.conditional.
+
+    Rendered details are cached per loan version (loanapp.cache): a repeat retrieve
+    costs one query (the loan row, for permissions and the ETag) and a repeat
+    validate-applicant none at all. validate-applicant sends the loan's pre-rendered
+    snapshot, which every write here re-renders (loanapp.snapshots).
+
+    Closed loans moved to the archive (loanapp.archive) are still served by retrieve,
+    from their archived rendering (one query); restore-archived moves one back.
+    """
     queryset = LoanApplication.objects.all().order_by('-LoanRegDate', '-id') # Ordered by date then ID
     serializer_class = LoanApplicationSerializer
     lookup_field = 'pk'
     
-    filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['phone', 'loanID', 'applicant_record__userID', 'status']
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_fields = {
+        'phone': ['exact'],
+        'loanID': ['exact'],
+        'applicant_record__userID': ['exact'],
+        'status': ['exact'],
+        # Balance summary columns, so outstanding/overdue screens never touch the EMI table
+        'outstanding_amount': ['exact', 'gte', 'lte'],
+        'overdue_installments': ['exact', 'gte'],
+        'next_due_date': ['exact', 'gte', 'lte'],
+    }
+    ordering_fields = ['LoanRegDate', 'id', 'outstanding_amount', 'total_paid', 'next_due_date', 'overdue_installments']
+    compact_fields = (
+        'id', 'loanID', 'applicant_record', 'first_name', 'phone', 'amount', 'term', 'termType',
+        'startDate', 'LoanRegDate', 'status', 'total_scheduled', 'total_paid', 'outstanding_amount',
+        'next_due_date', 'overdue_installments',
+    )
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -40,9 +92,9 @@ class LoanApplicationViewSet(viewsets.ModelViewSet):
             self.permission_classes = [IsAuthenticated]
         elif self.action == 'create':
             self.permission_classes = [IsAuthenticated]
-        elif self.action in ['update', 'partial_update']:
+        elif self.action in ['update', 'partial_update', 'record_payment']:
             self.permission_classes = [IsManagerUser] # Staff updating payments
-        elif self.action == 'destroy':
+        elif self.action in ['destroy', 'restore_archived']:
             self.permission_classes = [IsAdminUser]
         elif self.action == 'validate_applicant_action':
             self.permission_classes = [IsAuthenticated] # Staff using the portal
@@ -56,26 +108,134 @@ class LoanApplicationViewSet(viewsets.ModelViewSet):
         if not user.is_authenticated:
             return LoanApplication.objects.none()
         
-        is_admin_user = IsAdminUser().has_permission(self.request, self)
+        # IsManagerUser already lets Admins through, so one role check covers both
         is_manager_user = IsManagerUser().has_permission(self.request, self)
         
-        if is_admin_user or is_manager_user:
-            return LoanApplication.objects.all().order_by('-LoanRegDate', '-id')
+        if is_manager_user:
+            queryset = LoanApplication.objects.all()
         else:
-            # For regular users, show their own applications (if applicable)
-            try:
-                applicant_profile = Applicant.objects.filter(email=user.email).first()
-                if applicant_profile:
-                    return LoanApplication.objects.filter(applicant_record=applicant_profile).order_by('-LoanRegDate', '-id')
-                else:
-                    return LoanApplication.objects.none()
-            except Applicant.DoesNotExist:
-                return LoanApplication.objects.none()
-            except Exception as e:
-                logger.error(f"Error fetching applicant profile for {user.username}: {e}", exc_info=True)
-                return LoanApplication.objects.none()
+            # For regular users, show the applications of their linked (active) applicant
+            # profile: one join on the indexed Applicant.user link.
+            queryset = LoanApplication.objects.filter(
+                applicant_record__user=user.pk,
+                applicant_record__is_deleted=False,
+            )
+        if self.action == 'record_payment':
+            return queryset # Only resolves the loan (scope, 404); the payment reloads what it changes
+        relations = requested_relations(self.request, LoanApplicationSerializer.Meta.expandable_fields)
+        return queryset.with_details(relations).order_by('-LoanRegDate', '-id')
+
+    def get_retrieve_data(self, instance, prefetch_lookups):
+        # Nominees and EMIs are only prefetched and serialized on a cache miss
+        build = super().get_retrieve_data
+        return loan_detail_cache.get_or_set(
+            instance.pk, lambda: dict(build(instance, prefetch_lookups)), variant=request_variant(self.request)
+        )
+
+    def get_archived_queryset(self):
+        """ Archived loans this user may read, with the same rule as get_queryset(). """
+        if IsManagerUser().has_permission(self.request, self):
+            return ArchivedLoan.objects.all()
+        return ArchivedLoan.objects.filter(
+            applicant_record__user=self.request.user.pk, applicant_record__is_deleted=False,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            loan_pk = str(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+            archived = (
+                self.get_archived_queryset().filter(pk=loan_pk).values('loan_pk', 'version', 'closed_at', 'body').first()
+                if loan_pk.isdigit() else None
+            )
+            if archived is None:
+                raise
+            return self.archived_response(request, archived)
+
+    def archived_response(self, request, archived):
+        etag_source = f"{archived['loan_pk']}:{archived['version']}:archived"
+        headers = {
+            'ETag': '"%s"' % hashlib.sha1(etag_source.encode('utf-8')).hexdigest(),
+            'Cache-Control': 'private, no-cache',
+            'Last-Modified': http_date(archived['closed_at'].timestamp()),
+        }
+        not_modified = get_conditional_response(
+            request._request, etag=headers['ETag'], last_modified=int(archived['closed_at'].timestamp()),
+        )
+        if not_modified is not None and not_modified.status_code == status.HTTP_304_NOT_MODIFIED:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        body = absolute_file_urls(archived['body'], request)
+        if not request.query_params:
+            # The stored JSON as is, apart from its media URLs
+            return HttpResponse(body, content_type='application/json', headers=headers)
+        data = sparse_data(request, json.loads(body), LoanApplicationSerializer.Meta.expandable_fields)
+        return Response(data, headers=headers)
+
+    @action(detail=True, methods=['POST'], url_path='restore-archived')
+    def restore_archived(self, request, pk=None):
+        """ Moves an archived loan back into the active tables, e.g. for a reopened dispute. """
+        if not str(pk).isdigit() or not restore_loans([int(pk)]):
+            return Response({'detail': 'No archived loan with this id.'}, status=status.HTTP_404_NOT_FOUND)
+        instance = LoanApplication.objects.with_details().get(pk=pk)
+        logger.info(f"Archived loan PK {pk} (ID: {instance.loanID}) restored by {request.user.username}")
+        return Response(self.get_serializer(instance).data)
+
+    def _load_json_list(self, key):
+        """
+        Reads a JSON-encoded list from the multipart payload.
+        Returns None when the key was not sent at all.
+        """
+        raw_value = self.request.data.get(key)
+        if raw_value is None or raw_value == '':
+            return None
+        if isinstance(raw_value, list):
+            return raw_value
+        try:
+            parsed = json.loads(raw_value)
+        except (TypeError, json.JSONDecodeError):
+            raise serializers.ValidationError({key: "Invalid JSON."})
+        if not isinstance(parsed, list) or not all(isinstance(item, dict) for item in parsed):
+            raise serializers.ValidationError({key: "Must be a list of objects."})
+        return parsed
+
+    def _validate_nominees_payload(self, nominees_data_list):
+        """ Validates every nominee in one ListSerializer pass. Returns (serializer, errors). """
+        request = self.request
+        nominee_rows = []
+        for i, nominee_data_dict in enumerate(nominees_data_list):
+            nominee_data_for_serializer = {k: v for k, v in nominee_data_dict.items() if k not in ['profile_photo', 'id_proof_file']}
+            profile_photo = request.FILES.get(f'nominee_{i}_profile_photo')
+            id_proof_file = request.FILES.get(f'nominee_{i}_id_proof_file')
+            if profile_photo:
+                nominee_data_for_serializer['profile_photo'] = profile_photo
+            if id_proof_file:
+                nominee_data_for_serializer['id_proof_file'] = id_proof_file
+            nominee_rows.append(nominee_data_for_serializer)
+
+        nominees_serializer = NomineeSerializer(data=nominee_rows, many=True)
+        if nominees_serializer.is_valid():
+            return nominees_serializer, None
+        return nominees_serializer, nominees_serializer.errors
+
+    def _validate_emi_payload(self, emi_data_list):
+        """ Validates every installment in one ListSerializer pass. Returns (serializer, errors). """
+        # Exclude processor fields for initial creation
+        emi_rows = [
+            {k: v for k, v in emi_data_dict.items() if k not in ['id', 'payment_processed_by', 'payment_processed_by_username', 'payment_processed_at']}
+            for emi_data_dict in emi_data_list
+        ]
+        emi_serializer = EMIScheduleSerializer(data=emi_rows, many=True)
+        if emi_serializer.is_valid():
+            return emi_serializer, None
+        return emi_serializer, emi_serializer.errors
 
     def perform_create(self, serializer):
+        """
+        Validates the loan, its nominees and its EMI schedule up front, then writes
+        everything inside one transaction with bulk inserts. Any invalid row fails the
+        whole request with a single error report.
+        """
         request = self.request
         applicant_user_id_obj = serializer.validated_data.get('applicant_record')
 
@@ -89,67 +249,75 @@ class LoanApplicationViewSet(viewsets.ModelViewSet):
                     "detail": "You already have an unresolved loan application. "
                               "It must be fully paid or resolved before applying for a new one."
                 })
-        
-        loan_instance = serializer.save()
 
-        nominees_payload_str = request.data.get('nominees_payload')
-        if nominees_payload_str:
-            try:
-                nominees_data_list = json.loads(nominees_payload_str)
-                if isinstance(nominees_data_list, list):
-                    for i, nominee_data_dict in enumerate(nominees_data_list):
-                        if isinstance(nominee_data_dict, dict):
-                            profile_photo_key = f'nominee_{i}_profile_photo'
-                            id_proof_key = f'nominee_{i}_id_proof_file'
-                            
-                            files_for_nominee = {}
-                            if request.FILES.get(profile_photo_key):
-                                files_for_nominee['profile_photo'] = request.FILES.get(profile_photo_key)
-                            if request.FILES.get(id_proof_key):
-                                files_for_nominee['id_proof_file'] = request.FILES.get(id_proof_key)
-                            
-                            nominee_data_for_serializer = {k:v for k,v in nominee_data_dict.items() if k not in ['profile_photo', 'id_proof_file']}
-                            nominee_data_for_serializer.update(files_for_nominee)
-
-                            nom_serializer = NomineeSerializer(data=nominee_data_for_serializer)
-                            if nom_serializer.is_valid():
-                                Nominee.objects.create(loan_application=loan_instance, **nom_serializer.validated_data)
-                            else:
-                                logger.warning(f"Nominee creation validation error for loan {loan_instance.pk}, item {i}: {nom_serializer.errors}")
-                                # Consider raising an error to stop the whole process if a nominee is invalid
-                                # raise serializers.ValidationError({"nominees": f"Invalid data for nominee {i+1}: {nom_serializer.errors}"})
-            except json.JSONDecodeError:
-                 logger.error(f"CREATE: Invalid JSON for nominees_payload for loan {loan_instance.pk if loan_instance else 'new'}", exc_info=True)
-                 # Decide if this should fail the entire creation
-            except Exception as e:
-                logger.error(f"CREATE: Error processing nominees for loan {loan_instance.pk if loan_instance else 'new'}: {e}", exc_info=True)
-      
-        emi_payload_str = request.data.get('emi_schedule_payload')
-        if emi_payload_str:
-            try:
-                emi_data_list = json.loads(emi_payload_str)
-                if isinstance(emi_data_list, list):
-                    for emi_data_dict in emi_data_list:
-                        if isinstance(emi_data_dict, dict):
-                            # Exclude processor fields for initial creation
-                            data_for_emi_creation = {k:v for k,v in emi_data_dict.items() if k not in ['payment_processed_by', 'payment_processed_by_username', 'payment_processed_at']}
-                            emi_creation_serializer = EMIScheduleSerializer(data=data_for_emi_creation)
-                            if emi_creation_serializer.is_valid():
-                                EMISchedule.objects.create(loan_application=loan_instance, **emi_creation_serializer.validated_data)
-                            else:
-                                logger.error(f"EMI data validation error (Create) for loan {loan_instance.pk}: {emi_creation_serializer.errors}")
-                                # Consider raising an error
-            except json.JSONDecodeError:
-                logger.error(f"CREATE: Invalid JSON for emi_schedule_payload for loan {loan_instance.pk if loan_instance else 'new'}", exc_info=True)
-            except Exception as e:
-                logger.error(f"CREATE: Error creating EMI for loan {loan_instance.pk if loan_instance else 'new'}: {e}", exc_info=True)
+        errors = {}
+        nominees_serializer = None
+        emi_serializer = None
+        try:
+            nominees_data_list = self._load_json_list('nominees_payload')
+        except serializers.ValidationError as e:
+            errors.update(e.detail)
+            nominees_data_list = None
+        try:
+            emi_data_list = self._load_json_list('emi_schedule_payload')
+        except serializers.ValidationError as e:
+            errors.update(e.detail)
+            emi_data_list = None
+
+        if nominees_data_list:
+            nominees_serializer, nominee_errors = self._validate_nominees_payload(nominees_data_list)
+            if nominee_errors:
+                errors['nominees'] = nominee_errors
+        if emi_data_list:
+            emi_serializer, emi_errors = self._validate_emi_payload(emi_data_list)
+            if emi_errors:
+                errors['emiSchedule'] = emi_errors
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        with transaction.atomic():
+            loan_instance = serializer.save()
+
+            if nominees_serializer is not None:
+                Nominee.objects.bulk_create([
+                    Nominee(loan_application=loan_instance, **nominee_data)
+                    for nominee_data in nominees_serializer.validated_data
+                ])
+
+            if emi_serializer is not None:
+                emi_rows = [
+                    EMISchedule(loan_application=loan_instance, **emi_data)
+                    for emi_data in emi_serializer.validated_data
+                ]
+            else:
+                # No client-computed schedule sent: build it on the server from the loan terms
+                interest_type = request.data.get('interestType') or INTEREST_TYPE_DIMINISHING
+                try:
+                    emi_rows = build_emi_schedule(loan_instance, interest_type=interest_type)
+                except ScheduleError as e:
+                    logger.warning(f"CREATE: Could not build EMI schedule for loan {loan_instance.pk}: {e}")
+                    emi_rows = []
+            if emi_rows:
+                EMISchedule.objects.bulk_create(emi_rows)
+                loan_instance.refresh_balance_summary()
+
+            # Loaded once, for the snapshot here and for the response in create()
+            loan_instance.prefetch_details()
+            save_snapshot(loan_instance)
+
+        logger.info(
+            f"CREATE: Loan {loan_instance.pk} saved with "
+            f"{len(nominees_serializer.validated_data) if nominees_serializer is not None else 0} nominees and {len(emi_rows)} EMIs."
+        )
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         try:
             serializer.is_valid(raise_exception=True)
             self.perform_create(serializer)
-            final_loan_instance = LoanApplication.objects.get(pk=serializer.instance.pk)
+            # The saved instance is already current (loanID, balance summary) and its
+            # nominees and EMIs were loaded by perform_create().
+            final_loan_instance = serializer.instance
             response_serializer = self.get_serializer(final_loan_instance)
             headers = self.get_success_headers(response_serializer.data)
             logger.info(f"Loan application PK {final_loan_instance.pk} (ID: {final_loan_instance.loanID}) created by {request.user.username}")
@@ -161,6 +329,108 @@ class LoanApplicationViewSet(viewsets.ModelViewSet):
             logger.error(f"Loan App Create Unexpected Error by {request.user.username}: {e}", exc_info=True)
             return Response({"detail": "An unexpected error occurred while creating the loan application."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    EMI_SYNC_FIELDS = [
+        'month', 'emiStartDate', 'emiTotalMonth', 'interest', 'principalPaid',
+        'remainingBalance', 'paymentAmount', 'pendingAmount',
+    ]
+
+    def _sync_emi_schedule(self, instance, incoming_ids, validated_rows, user_making_update):
+        """
+        Applies an incoming EMI list to the stored schedule as a diff: rows are matched
+        by id (falling back to month), only rows whose values changed are written with
+        bulk_update, and only genuinely new or missing rows are inserted or deleted.
+        """
+        existing_rows = list(instance.emiSchedule.all())
+        existing_by_id = {emi.id: emi for emi in existing_rows}
+        existing_by_month = {emi.month: emi for emi in existing_rows}
+        matched_ids = set()
+        to_update, to_create = [], []
+        now = timezone.now()
+
+        for raw_id, emi_data in zip(incoming_ids, validated_rows):
+            emi = None
+            try:
+                emi = existing_by_id.get(int(raw_id)) if raw_id not in (None, '') else None
+            except (TypeError, ValueError):
+                emi = None
+            if emi is None or emi.id in matched_ids:
+                emi = existing_by_month.get(emi_data.get('month'))
+            if emi is not None and emi.id in matched_ids:
+                emi = None
+
+            if emi is None:
+                new_emi = EMISchedule(loan_application=instance, **emi_data)
+                if new_emi.paymentAmount and new_emi.paymentAmount > Decimal('0.00'):
+                    new_emi.payment_processed_by = user_making_update
+                    new_emi.payment_processed_at = now
+                to_create.append(new_emi)
+                continue
+
+            matched_ids.add(emi.id)
+            changed = False
+            for field_name in self.EMI_SYNC_FIELDS:
+                if field_name in emi_data and getattr(emi, field_name) != emi_data[field_name]:
+                    if field_name == 'paymentAmount':
+                        # Only a changed payment re-stamps who processed it
+                        if emi_data[field_name] > Decimal('0.00'):
+                            emi.payment_processed_by = user_making_update
+                            emi.payment_processed_at = now
+                        else:
+                            emi.payment_processed_by = None
+                            emi.payment_processed_at = None
+                    setattr(emi, field_name, emi_data[field_name])
+                    changed = True
+            if changed:
+                emi.updated_at = now # bulk_update does not apply auto_now
+                to_update.append(emi)
+
+        stale_ids = [emi.id for emi in existing_rows if emi.id not in matched_ids]
+        if stale_ids:
+            # No per-row delete signals: the summary refresh that follows moves the version once
+            stale_emis = EMISchedule.objects.filter(id__in=stale_ids)
+            stale_emis._raw_delete(stale_emis.db)
+        if to_update:
+            EMISchedule.objects.bulk_update(
+                to_update, self.EMI_SYNC_FIELDS + ['payment_processed_by', 'payment_processed_at', 'updated_at']
+            )
+        if to_create:
+            EMISchedule.objects.bulk_create(to_create)
+
+        return {
+            'updated': len(to_update),
+            'created': len(to_create),
+            'deleted': len(stale_ids),
+            'unchanged': len(matched_ids) - len(to_update),
+        }
+
+    def _emi_totals(self, instance):
+        """ Total due / paid / outstanding principal for a loan, read from its balance summary. """
+        return {
+            'total_due': instance.total_scheduled,
+            'total_paid': instance.total_paid,
+            'outstanding': instance.outstanding_amount,
+        }
+
+    def _mark_paid_if_settled(self, instance, totals=None):
+        """
+        Flips the loan to PAID when the payments recorded against its schedule cover
+        the total due. Totals come from the balance summary, so refresh_balance_summary()
+        must have run after the last EMI change. Returns True if the status was changed.
+        """
+        if instance.status in ['PAID', 'REJECTED', 'CANCELLED']:
+            return False
+        totals = totals or self._emi_totals(instance)
+        total_emi_amount_due = totals['total_due']
+        total_amount_paid_by_user = totals['total_paid']
+
+        if total_emi_amount_due > Decimal('0.00') and (total_amount_paid_by_user >= (total_emi_amount_due - Decimal('0.005'))):
+            instance.status = 'PAID'
+            instance.admin_remarks = f"{instance.admin_remarks or ''}\nAutomatically marked as PAID due to full repayment.".strip()
+            instance.save(update_fields=['status', 'admin_remarks']) # Save only these changed fields
+            logger.info(f"Loan PK {instance.pk} (ID: {instance.loanID}) automatically marked as PAID.")
+            return True
+        return False
+
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', True)
         instance = self.get_object() # LoanApplication instance
@@ -185,112 +455,154 @@ class LoanApplicationViewSet(viewsets.ModelViewSet):
                 # allowed_transitions = {'PENDING': ['MANAGER_APPROVED', 'REJECTED'], ...}
                 # if original_status not in allowed_transitions or status_from_payload not in allowed_transitions[original_status]:
                 #     return Response({"error": f"Cannot transition from {original_status} to {status_from_payload}."}, status.HTTP_400_BAD_REQUEST)
-            
-            self.perform_update(loan_app_serializer) # Saves LoanApplication instance
-            instance.refresh_from_db() # Get the latest, including any status changes from perform_update
-
         except serializers.ValidationError as e:
             logger.warning(f"Loan App Main Update Validation Error for PK {instance.pk} by {user_making_update.username}: {e.detail}")
             return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as e: # Catch other errors during main loan app update
-            logger.error(f"Loan App Main Update Unexpected Error for PK {instance.pk} by {user_making_update.username}: {e}", exc_info=True)
-            return Response({"detail": "An unexpected error occurred during loan application update."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # --- Nominee update logic (if payload present) ---
+        # --- Nominee and EMI payloads are validated before anything is written ---
+        nominees_serializer = None
         nominees_payload_str_update = request.data.get('nominees_payload')
         if nominees_payload_str_update is not None: # Allows empty string/list to clear nominees
             try:
-                new_nominees_data_list = json.loads(nominees_payload_str_update) if nominees_payload_str_update else []
-                if isinstance(new_nominees_data_list, list):
-                    with transaction.atomic():
-                        instance.nominees.all().delete() 
-                        for i, nominee_data_dict in enumerate(new_nominees_data_list):
-                            if isinstance(nominee_data_dict, dict):
-                                # (Simplified - use NomineeSerializer for validation as in perform_create)
-                                profile_photo_key = f'nominee_{i}_profile_photo' # Adjust key based on frontend
-                                id_proof_key = f'nominee_{i}_id_proof_file' # Adjust key
-                                nominee_data_dict['profile_photo'] = request.FILES.get(profile_photo_key)
-                                nominee_data_dict['id_proof_file'] = request.FILES.get(id_proof_key)
-                                # ... (handle files and use NomineeSerializer)
-                                Nominee.objects.create(loan_application=instance, **nominee_data_dict)
-            except Exception as e:
-                logger.error(f"UPDATE: Error processing nominees for loan {instance.pk}: {e}", exc_info=True)
-                # Decide if this should cause the update to fail
-                # return Response({"detail": "Error processing nominee data."}, status=status.HTTP_400_BAD_REQUEST)
-
-
-        # --- EMI Schedule Update Logic ---
-        loan_status_was_updated_to_paid_this_request = False
-        updated_emi_schedule_data_payload = request.data.get('emiSchedule')
+                new_nominees_data_list = self._load_json_list('nominees_payload') or []
+            except serializers.ValidationError as e:
+                return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+            nominees_serializer, nominee_errors = self._validate_nominees_payload(new_nominees_data_list)
+            if nominee_errors:
+                logger.warning(f"UPDATE: Nominee validation error for loan {instance.pk}: {nominee_errors}")
+                return Response({"detail": "Invalid nominee data.", "nominees": nominee_errors}, status=status.HTTP_400_BAD_REQUEST)
 
+        emi_serializer = None
+        updated_emi_schedule_data_payload = request.data.get('emiSchedule')
         if updated_emi_schedule_data_payload is not None: # Allows empty list to clear EMIs
             if not isinstance(updated_emi_schedule_data_payload, list):
                 return Response({"detail": "emiSchedule must be a list of objects."}, status=status.HTTP_400_BAD_REQUEST)
             
-            try:
-                with transaction.atomic():
-                    instance.emiSchedule.all().delete() # Simple approach: delete all and recreate
-
-                    for idx, emi_item_data_from_payload in enumerate(updated_emi_schedule_data_payload):
-                        if not isinstance(emi_item_data_from_payload, dict):
-                            # This case should ideally be caught by frontend or a more robust outer validation
-                            logger.warning(f"EMI item at index {idx} is not a dict. Skipping.")
-                            continue 
-
-                        # Exclude fields that backend should control during payment processing
-                        data_for_emi_serializer = {k:v for k,v in emi_item_data_from_payload.items() 
-                                                   if k not in ['id', 'payment_processed_by', 'payment_processed_by_username', 'payment_processed_at']}
-                        
-                        emi_creation_serializer = EMIScheduleSerializer(data=data_for_emi_serializer)
-                        if emi_creation_serializer.is_valid():
-                            validated_data_for_save = emi_creation_serializer.validated_data
-                            
-                            # Check paymentAmount from the original payload item to decide on processor
-                            payment_amount_decimal = Decimal(str(emi_item_data_from_payload.get('paymentAmount', '0.00'))) # Ensure string conversion for Decimal
-
-                            if payment_amount_decimal > Decimal('0.00'):
-                                validated_data_for_save['payment_processed_by'] = user_making_update
-                                validated_data_for_save['payment_processed_at'] = timezone.now()
-                            else:
-                                validated_data_for_save['payment_processed_by'] = None
-                                validated_data_for_save['payment_processed_at'] = None
-                            
-                            EMISchedule.objects.create(
-                                loan_application=instance,
-                                **validated_data_for_save
-                            )
-                        else:
-                            logger.error(f"EMI data validation error (Update) for loan {instance.pk}, item {idx}: {emi_creation_serializer.errors}")
-                            return Response({"detail": f"Invalid EMI data at index {idx}: {emi_creation_serializer.errors}"}, status=status.HTTP_400_BAD_REQUEST)
-                    
-                    logger.info(f"EMI schedule processed for loan PK {instance.pk} with {len(updated_emi_schedule_data_payload)} items.")
+            if not all(isinstance(item, dict) for item in updated_emi_schedule_data_payload):
+                return Response({"detail": "emiSchedule must be a list of objects."}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Exclude fields that backend should control during payment processing
+            emi_rows = [
+                {k: v for k, v in emi_item.items() if k not in ['id', 'payment_processed_by', 'payment_processed_by_username', 'payment_processed_at']}
+                for emi_item in updated_emi_schedule_data_payload
+            ]
+            emi_serializer = EMIScheduleSerializer(data=emi_rows, many=True)
+            if not emi_serializer.is_valid():
+                logger.error(f"EMI data validation error (Update) for loan {instance.pk}: {emi_serializer.errors}")
+                return Response({"detail": "Invalid EMI data.", "emiSchedule": emi_serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        # One transaction for the loan, its nominees / EMIs and the snapshot: an error in
+        # any step leaves all of them as they were
+        try:
+            with transaction.atomic():
+                self.perform_update(loan_app_serializer) # Saves LoanApplication instance (in-memory copy stays current)
+
+                if nominees_serializer is not None:
+                    old_nominees = instance.nominees.all()
+                    old_nominees._raw_delete(old_nominees.db) # No per-row signals, touch() below covers them
+                    Nominee.objects.bulk_create([
+                        Nominee(loan_application=instance, **nominee_data)
+                        for nominee_data in nominees_serializer.validated_data
+                    ])
+                    instance.touch() # Nominees are part of the loan's representation (and ETag)
 
+                if emi_serializer is not None:
+                    incoming_ids = [emi_item.get('id') for emi_item in updated_emi_schedule_data_payload]
+                    counts = self._sync_emi_schedule(instance, incoming_ids, emi_serializer.validated_data, user_making_update)
+                    logger.info(
+                        f"EMI schedule synced for loan PK {instance.pk}: {counts['updated']} updated, "
+                        f"{counts['created']} created, {counts['deleted']} deleted, {counts['unchanged']} unchanged."
+                    )
+
+                    instance.refresh_balance_summary()
                     # Auto-set to PAID if applicable, only if not already in a terminal state
-                    if instance.status not in ['PAID', 'REJECTED', 'CANCELLED']:
-                        all_emis_for_loan = instance.emiSchedule.all() # Re-fetch after creation
-                        total_emi_amount_due = sum(e.emiTotalMonth for e in all_emis_for_loan if e.emiTotalMonth is not None)
-                        total_amount_paid_by_user = sum(e.paymentAmount for e in all_emis_for_loan if e.paymentAmount is not None)
-
-                        # Using a small tolerance for floating point comparisons might be safer if emiTotalMonth can have many decimal places
-                        if total_emi_amount_due > Decimal('0.00') and (total_amount_paid_by_user >= (total_emi_amount_due - Decimal('0.005'))):
-                            instance.status = 'PAID'
-                            instance.admin_remarks = f"{instance.admin_remarks or ''}\nAutomatically marked as PAID due to full repayment.".strip()
-                            instance.save(update_fields=['status', 'admin_remarks']) # Save only these changed fields
-                            loan_status_was_updated_to_paid_this_request = True
-                            logger.info(f"Loan PK {instance.pk} (ID: {instance.loanID}) automatically marked as PAID.")
-            except Exception as e: # Catch errors during EMI processing
-                logger.error(f"Error processing/updating EMI schedule for loan {instance.pk}: {e}", exc_info=True)
-                return Response({"detail": "An error occurred while processing the EMI schedule."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        if loan_status_was_updated_to_paid_this_request:
-            instance.refresh_from_db() # Ensure the instance for response has the 'PAID' status
+                    self._mark_paid_if_settled(instance)
+
+                if nominees_serializer is not None or emi_serializer is not None:
+                    # Status and balance summary are already current on the instance; only the
+                    # rewritten nominees / EMIs need reloading for the response.
+                    instance.prefetch_details()
+                save_snapshot(instance) # From the same loaded rows as the response
+        except Exception as e:
+            logger.error(f"Loan App Update Unexpected Error for PK {instance.pk} by {user_making_update.username}: {e}", exc_info=True)
+            return Response({"detail": "An unexpected error occurred during loan application update."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        final_loan_application_instance = LoanApplication.objects.get(pk=instance.pk) # Fetch latest for response
-        response_serializer = self.get_serializer(final_loan_application_instance) # Use the viewset's serializer
-        logger.info(f"Loan application PK {instance.pk} (ID: {instance.loanID}) updated by {user_making_update.username}. Final status for response: {final_loan_application_instance.status}")
+        response_serializer = self.get_serializer(instance) # Use the viewset's serializer
+        logger.info(f"Loan application PK {instance.pk} (ID: {instance.loanID}) updated by {user_making_update.username}. Final status for response: {instance.status}")
         return Response(response_serializer.data)
 
 
+    @action(detail=True, methods=['POST'], url_path='payments')
+    def record_payment(self, request, pk=None):
+        """
+        Records a payment against one installment, e.g.
+        POST /loan-applications/{pk}/payments/ {"month": 3, "amount": "1500.00"}
+
+        `amount` is the total paid for that installment (same meaning as paymentAmount
+        on the LoanPayment screen). Only the targeted EMISchedule row is locked and
+        written, plus the loan's balance summary.
+        """
+        loan = self.get_object() # Scoped by get_queryset(); unknown or malformed pks are a 404
+        payment_serializer = EMIPaymentSerializer(data=request.data)
+        if not payment_serializer.is_valid():
+            return Response(payment_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        payment_data = payment_serializer.validated_data
+        amount = payment_data['amount']
+
+        emi_lookup = {'loan_application_id': loan.pk}
+        if payment_data.get('emi_id') is not None:
+            emi_lookup['id'] = payment_data['emi_id']
+        else:
+            emi_lookup['month'] = payment_data['month']
+
+        try:
+            with transaction.atomic():
+                try:
+                    emi = EMISchedule.objects.select_for_update().get(**emi_lookup)
+                except EMISchedule.DoesNotExist:
+                    return Response({"detail": "Installment not found for this loan."}, status=status.HTTP_404_NOT_FOUND)
+
+                emi.loan_application = loan
+                if not (loan.status in ['ACTIVE', 'OVERDUE'] or (loan.status == 'APPROVED' and loan.loanID)):
+                    return Response(
+                        {"detail": f"Payments cannot be recorded for a loan with status {loan.get_status_display()}."},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+                emi.paymentAmount = amount
+                emi.pendingAmount = max(emi.emiTotalMonth - amount, Decimal('0.00'))
+                if amount > Decimal('0.00'):
+                    emi.payment_processed_by = request.user
+                    emi.payment_processed_at = timezone.now()
+                else:
+                    emi.payment_processed_by = None
+                    emi.payment_processed_at = None
+                emi.save(update_fields=['paymentAmount', 'pendingAmount', 'payment_processed_by', 'payment_processed_at'])
+
+                loan.refresh_balance_summary()
+                totals = self._emi_totals(loan)
+                self._mark_paid_if_settled(loan, totals)
+                loan.prefetch_details()
+                save_snapshot(loan)
+        except Exception as e:
+            logger.error(f"Error recording payment for loan {pk} ({emi_lookup}) by {request.user.username}: {e}", exc_info=True)
+            return Response({"detail": "An error occurred while recording the payment."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        logger.info(f"Payment of {amount} recorded on EMI {emi.month} of loan PK {loan.pk} (ID: {loan.loanID}) by {request.user.username}.")
+        return Response({
+            "installment": EMIScheduleSerializer(emi).data,
+            "loan": {
+                "id": loan.pk,
+                "loanID": loan.loanID,
+                "status": loan.status,
+                "status_display": loan.get_status_display(),
+                "total_due": totals['total_due'],
+                "total_paid": totals['total_paid'],
+                "outstanding": totals['outstanding'],
+            },
+        }, status=status.HTTP_200_OK)
+
+
     @action(detail=False, methods=['POST'], url_path='validate-applicant')
     def validate_applicant_action(self, request):
         first_name = request.data.get('first_name', '').strip()
@@ -302,42 +614,49 @@ class LoanApplicationViewSet(viewsets.ModelViewSet):
                 "application": None, "actionable_payment": False
             }, status=status.HTTP_400_BAD_REQUEST)
         try:
-            application = LoanApplication.objects.filter(
-                first_name__iexact=first_name, 
-                phone=phone,
-            ).order_by('-LoanRegDate', '-id').first()
+            # Repeat lookups at the payment counter are served from loanapp.cache without a query
+            loan_pk = loan_lookup_cache.get_or_set(
+                lookup_ident(first_name, phone),
+                lambda: LoanApplication.objects.alias(first_name_lower=Lower('first_name')).filter(
+                    first_name_lower=first_name.lower(), # Matches loanapp_phone_name_idx, unlike __iexact
+                    phone=phone, # Normalized by PhoneNumberField
+                ).order_by('-LoanRegDate', '-id').values_list('pk', flat=True).first(),
+            )
+            # The loan's pre-rendered snapshot (loanapp.snapshots), sent as is
+            snapshot = loan_detail_cache.get_or_set(loan_pk, lambda: get_snapshot(loan_pk), variant='snapshot') if loan_pk is not None else None
 
-            if not application:
+            if not snapshot:
                  logger.info(f"Validation: No application found for name='{first_name}', phone='{phone}'")
                  return Response({
                      "valid": False, "message": "No loan application found for the provided details.",
                      "application": None, "actionable_payment": False
                  }, status=status.HTTP_404_NOT_FOUND)
 
-            serializer = self.get_serializer(application) # Serializer now includes status_display and processed_by in EMIs
+            app_status, loan_id, application_json = snapshot
             response_data = {
                 "valid": True, 
-                "application": serializer.data,
                 "actionable_payment": False, # Default
                 "message": ""
             }
+            status_display_from_app = LOAN_STATUS_LABELS.get(app_status, app_status)
 
-            app_status = application.status
-            status_display_from_app = application.get_status_display()
-
-            if app_status in ['ACTIVE', 'OVERDUE'] or (app_status == 'APPROVED' and application.loanID):
+            if app_status in ['ACTIVE', 'OVERDUE'] or (app_status == 'APPROVED' and loan_id):
                 response_data["actionable_payment"] = True
                 response_data["message"] = f"Loan details fetched (Status: {status_display_from_app}). Ready for payment."
             elif app_status == 'PAID':
                 response_data["message"] = f"This loan (Status: {status_display_from_app}) has been fully paid."
-            elif app_status in ['PENDING', 'MANAGER_APPROVED', 'INFO_REQUESTED'] or (app_status == 'APPROVED' and not application.loanID):
-                add_msg = "Loan ID generation is pending. " if (app_status == 'APPROVED' and not application.loanID) else ""
+            elif app_status in ['PENDING', 'MANAGER_APPROVED', 'INFO_REQUESTED'] or (app_status == 'APPROVED' and not loan_id):
+                add_msg = "Loan ID generation is pending. " if (app_status == 'APPROVED' and not loan_id) else ""
                 response_data["message"] = f"Loan application found (Status: {status_display_from_app}). {add_msg}Not yet ready for payment processing."
             else: # REJECTED, CANCELLED
                 response_data["message"] = f"Loan application found (Status: {status_display_from_app}). No payment action applicable for this loan."
             
-            logger.info(f"Validation for: name='{first_name}', phone='{phone}'. Loan PK: {application.pk}, Status: {app_status}. Actionable: {response_data['actionable_payment']}. Message: {response_data['message']}")
-            return Response(response_data, status=status.HTTP_200_OK)
+            logger.info(f"Validation for: name='{first_name}', phone='{phone}'. Loan PK: {loan_pk}, Status: {app_status}. Actionable: {response_data['actionable_payment']}. Message: {response_data['message']}")
+            # "application" is the stored JSON, spliced in without parsing or serializing it
+            return HttpResponse(
+                render_with_snapshot(response_data, "application", absolute_file_urls(application_json, request)),
+                content_type='application/json', status=status.HTTP_200_OK,
+            )
         
         except Exception as e:
             logger.error(f"Error during LoanApplication validation for name='{first_name}', phone='{phone}': {e}", exc_info=True)
@@ -1,8 +1,10 @@
 from django.db import models
 
+from core.fields import PhoneNumberField
+
 class LoanRequest(models.Model):
     name = models.CharField(max_length=255)
-    phone = models.CharField(max_length=15)
+    phone = PhoneNumberField(max_length=15)
     loan_purpose = models.CharField(max_length=50)
     loan_amount = models.DecimalField(max_digits=10, decimal_places=2)
     date = models.DateField(null=True)
@@ -4,7 +4,7 @@ from .models import LoanRequest
 from .serializers import LoanRequestSerializer 
 
 class LoanrequestListCreateView(generics.ListCreateAPIView):
-    queryset = LoanRequest.objects.all()
+    queryset = LoanRequest.objects.order_by('-id') # Newest first; keyset pagination runs on the primary key
     serializer_class = LoanRequestSerializer
 
 class LoanrequestRetrieveUpdateView(generics.RetrieveUpdateDestroyAPIView):
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 22:24
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The table as it existed before this app had migrations; databases that already
+    # have it record this one with `migrate property_management --fake-initial`.
+
+    initial = True
+
+    dependencies = [
+        ('applicants', '0023_remove_applicant_loan_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyDetails',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('property_type', models.IntegerField(choices=[(1, 'Residential'), (2, 'Commercial'), (3, 'Industrial'), (4, 'Agricultural'), (5, 'Plot')], default=1)),
+                ('property_address', models.TextField(default='Unknown Address')),
+                ('property_value', models.DecimalField(decimal_places=2, default=0.0, max_digits=15, validators=[django.core.validators.MinValueValidator(0)])),
+                ('property_age', models.PositiveIntegerField(default=0)),
+                ('property_ownership', models.IntegerField(choices=[(1, 'Owned'), (2, 'Mortgaged')], default=1)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('remarks', models.TextField(blank=True, null=True)),
+                ('applicant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='applicants.applicant')),
+            ],
+        ),
+    ]
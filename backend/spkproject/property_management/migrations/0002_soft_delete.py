@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-18 22:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property_management', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertydetails',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='propertydetails',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['applicant'], name='property_mgmt_live_idx'),
+        ),
+    ]
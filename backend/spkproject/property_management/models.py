@@ -1,8 +1,9 @@
 from django.db import models
 from django.core.validators import MinValueValidator
 from applicants.models import Applicant
+from core.softdelete import SoftDeleteModel, SoftDeleteQuerySet, live_index
 
-class PropertyDetails(models.Model):
+class PropertyDetails(SoftDeleteModel):
     PROPERTY_OWNERSHIP_CHOICES = [
         (1, 'Owned'),
         (2, 'Mortgaged'),
@@ -47,25 +48,22 @@ class PropertyDetails(models.Model):
         null=False,
         blank=False
     )
-    is_deleted = models.BooleanField(
-        default=False,
-        null=False,
-        blank=False
-    )
     remarks = models.TextField(
         null=True,
         blank=True
     )
 
+    objects = SoftDeleteQuerySet.as_manager() # Every record; .active() for the live ones
+
+    class Meta:
+        indexes = [
+            # Active properties of an applicant (.active())
+            live_index('applicant', name='property_mgmt_live_idx'),
+        ]
+
     def delete(self, *args, **kwargs):
         """Soft delete instead of permanent deletion"""
-        self.is_deleted = True
-        self.save(update_fields=['is_deleted'])
-
-    def restore(self):
-        """Restore a soft-deleted record"""
-        self.is_deleted = False
-        self.save(update_fields=['is_deleted'])
+        self.soft_delete()
 
     def __str__(self):
         return f"{self.get_property_type_display()} - {self.get_property_ownership_display()} by {self.applicant}"
\ No newline at end of file
@@ -5,4 +5,5 @@ class PropertyDetailsSerializer(serializers.ModelSerializer):
     class Meta:
         model = PropertyDetails
         fields = '__all__'
+        read_only_fields = ['deleted_at']
 
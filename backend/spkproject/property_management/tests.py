@@ -1,3 +1,64 @@
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from applicants.models import Applicant
+
+from .models import PropertyDetails
+
+BULK_URL = '/api/property-details/property-details/bulk-{}/'
+
+
+class PropertyBulkActionTests(TestCase):
+    """ bulk-delete / bulk-restore (core.bulk) on property details, through the app's own migrations. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('property-admin', 'property-admin@example.com', 'pass')
+        applicant = Applicant.objects.create(
+            first_name='Property', last_name='Owner', email='property-owner@example.com', phone='9130000000',
+        )
+        cls.properties = PropertyDetails.objects.bulk_create([PropertyDetails(applicant=applicant) for _ in range(2)])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_delete_and_restore(self):
+        ids = [prop.pk for prop in self.properties]
+        response = self.client.post(BULK_URL.format('delete'), {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['counts'], {'deleted': 2})
+        self.assertFalse(PropertyDetails.objects.active().exists())
+        self.assertFalse(PropertyDetails.objects.filter(deleted_at__isnull=True).exists())
+
+        # The list still shows every record, deleted or not
+        self.assertEqual(len(self.client.get('/api/property-details/property-details/').data['results']), 2)
+
+        response = self.client.post(BULK_URL.format('restore'), {'ids': ids[:1]}, format='json')
+        self.assertEqual(response.data['counts'], {'restored': 1})
+        self.assertEqual(list(PropertyDetails.objects.active().values_list('pk', flat=True)), ids[:1])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Plans are checked on PostgreSQL')
+class PropertyLiveIndexTests(TestCase):
+    """ .active() lookups by applicant read the partial index over live rows. """
+
+    def test_active_properties_use_live_index(self):
+        applicants = Applicant.objects.bulk_create([
+            Applicant(first_name=f'Live{i}', last_name='Index', email=f'live{i}@example.com', phone=f'91400{i:05d}')
+            for i in range(50)
+        ])
+        properties = PropertyDetails.objects.bulk_create([
+            PropertyDetails(applicant=applicant) for applicant in applicants for _ in range(4)
+        ])
+        PropertyDetails.objects.filter(pk__in=[prop.pk for prop in properties[::2]]).bulk_soft_delete()
 
-# Create your tests here.
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off') # Tiny tables would otherwise be scanned whole
+            cursor.execute('ANALYZE property_management_propertydetails')
+        plan = PropertyDetails.objects.active().filter(applicant=applicants[10]).explain()
+        self.assertIn('property_mgmt_live_idx', plan)
@@ -1,7 +1,9 @@
 from rest_framework import viewsets
+
+from core.bulk import BulkSoftDeleteMixin
 from .models import PropertyDetails
 from .serializers import PropertyDetailsSerializer
 
-class PropertyDetailsViewSet(viewsets.ModelViewSet):
-    queryset = PropertyDetails.objects.all()
+class PropertyDetailsViewSet(BulkSoftDeleteMixin, viewsets.ModelViewSet):
+    queryset = PropertyDetails.objects.order_by('-id') # Newest first; keyset pagination runs on the primary key
     serializer_class = PropertyDetailsSerializer
@@ -274,13 +274,53 @@ CORS_ALLOW_METHODS = ['GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS']
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.ClaimsJWTAuthentication', # JWTAuthentication that reads user/role claims, see core/authentication.py
         'rest_framework.authentication.SessionAuthentication', # Good for browsable API
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated', # Default to require login for APIs
-    )
+    ),
+    # Keyset pagination on every list endpoint, see core/pagination.py
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': 50, # Default rows per page; clients may ask for more with ?page_size=
 }
+API_MAX_PAGE_SIZE = 500 # Upper bound for ?page_size=
+
+# Shared tier of the response caches (core/cache.py). Set REDIS_URL (and install
+# the `redis` package) so all workers share entries and invalidations; without it
+# each process keeps its own in-memory cache, which is what tests use.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'spk-default',
+        }
+    }
+RESPONSE_CACHE_TIMEOUT = 600 # Seconds a cached payload lives in the shared tier
+RESPONSE_CACHE_LOCAL_ENTRIES = 512 # Per-process LRU size, per cache namespace
+
+# Phone numbers are stored in canonical form, see core.fields.normalize_phone
+PHONE_COUNTRY_CODE = '91' # Domestic numbers are kept without it
+PHONE_NATIONAL_DIGITS = 10
+
+# Largest list of ids one bulk soft-delete / restore request may carry, see core/bulk.py
+BULK_ACTION_MAX_IDS = 5000
+
+# Closed loans (PAID/REJECTED/CANCELLED) unchanged for this many days move to the
+# archive table (manage.py archive_loans, see loanapp/archive.py)
+LOAN_ARCHIVE_AFTER_DAYS = 365
+LOAN_ARCHIVE_BATCH_SIZE = 200 # Loans moved per transaction
+
+# loanapp_emischedule is partitioned by year of emiStartDate; partitions exist this
+# many years ahead (manage.py emi_partitions --create-ahead, see loanapp/partitions.py)
+EMI_PARTITION_YEARS_AHEAD = 2
 # settings.py (after REST_FRAMEWORK block)
 
 from datetime import timedelta
@@ -310,6 +350,9 @@ SIMPLE_JWT = {
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
     "TOKEN_TYPE_CLAIM": "token_type",
     "TOKEN_USER_CLASS": "rest_framework_simplejwt.models.TokenUser",
+    # Put role, groups, employee_id and a permissions version into issued tokens
+    "TOKEN_OBTAIN_SERIALIZER": "core.serializers.ClaimsTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "core.serializers.ClaimsTokenRefreshSerializer",
 
     "JTI_CLAIM": "jti",
 